@@ -1,95 +1,137 @@
 # autism.py
 import streamlit as st
-import pandas as pd
-import numpy as np
-import joblib
+import os
+import uuid
+import weakref
 from datetime import datetime
-import time
 import plotly.graph_objects as go
 
+from panic_predictor import InferenceEngine, RollingWindow
+from panic_predictor.alerts import DEFAULT_RULES, AlertEngine, FileSink, WebhookSink
+from panic_predictor.analytics import generate_synthetic_data
+from panic_predictor.artifact import load_or_export
+from panic_predictor.attribution import ActivityAttributor
+from panic_predictor.charts import LiveCharts, live_charts
+from panic_predictor.features import feature_row
+from panic_predictor.forecast import Forecaster
+from panic_predictor.metrics import REGISTRY, serve_metrics, timer
+from panic_predictor.realtime import Monitor, MonitorScheduler, get_heart_rate
+from panic_predictor.registry import DEFAULT_MODEL, ModelRegistry
+from panic_predictor.retrain import LabelCollector, Retrainer
+from panic_predictor.server import ScoringClient
+from panic_predictor.store import ColumnStore
+
 # --- Load Pre-trained Model and Scaler ---
+# The pickled forest is converted once into a memory-mapped artifact, so later
+# starts skip joblib/sklearn entirely
+MODEL_ARTIFACT = 'panic_attack_model'
+
 @st.cache_resource
-def load_model_and_scaler():
+def load_engine():
+    # With PANIC_SCORING_URL set, scoring goes to a running panic_predictor.server
+    scoring_url = os.environ.get('PANIC_SCORING_URL')
+    if scoring_url:
+        return ScoringClient(scoring_url)
     try:
-        rf_model = joblib.load('panic_attack_rf_model.pkl')
-        scaler = joblib.load('scaler.pkl')
-        return rf_model, scaler
+        forest, manifest = load_or_export(MODEL_ARTIFACT, 'panic_attack_rf_model.pkl', 'scaler.pkl')
+        # With PANIC_MODEL_REGISTRY set, patients are scored by their assigned
+        # models; the global forest becomes the registry's default
+        registry_root = os.environ.get('PANIC_MODEL_REGISTRY')
+        if registry_root:
+            registry = ModelRegistry(registry_root)
+            if registry.current_version(DEFAULT_MODEL) is None:
+                registry.publish(DEFAULT_MODEL, forest, source=manifest.get('source'))
+            registry.warmup()
+            return InferenceEngine.from_registry(registry)
+        return InferenceEngine(forest, None)
     except FileNotFoundError as e:
         st.error(f"Error loading files: {e}. Please ensure 'panic_attack_rf_model.pkl' and 'scaler.pkl' are in the repository.")
-        return None, None
+        return None
 
-rf_model, scaler = load_model_and_scaler()
-if rf_model is None or scaler is None:
+engine = load_engine()
+if engine is None:
     st.stop()
 
-# Define features
-features = ['heart_rate', 'hour', 'minute', 'hr_rolling_mean', 'hr_rolling_std', 'hr_change']
-
-# --- Real-Time Data Preparation ---
-def prepare_realtime_data(current_hr, history, scaler, features, activity_risk):
-    history.append(current_hr)
-    if len(history) > 10:
-        history.pop(0)
-    
-    hr_mean = np.mean(history)
-    hr_std = np.std(history)
-    hr_change = current_hr - (history[-2] if len(history) > 1 else current_hr)
-    current_time = datetime.now()
-    
-    data_point = pd.DataFrame({
-        'heart_rate': [current_hr],
-        'hour': [current_time.hour],
-        'minute': [current_time.minute],
-        'hr_rolling_mean': [hr_mean],
-        'hr_rolling_std': [hr_std],
-        'hr_change': [hr_change]
-    }, columns=features)
-    
-    activities = activity_risk.index.tolist()
-    activity_weights = activity_risk.values / activity_risk.sum()
-    current_activity = np.random.choice(activities, p=activity_weights)
-    
-    return scaler.transform(data_point), current_activity
-
-# --- Simulated Heart Rate ---
-def get_heart_rate():
-    hr = np.random.normal(80, 15)
-    return max(40, min(160, hr))
+# Columnar history store, imported from panic_attack_data.csv on first run
+STORE_PATH = 'panic_attack_store'
 
 # --- Load and Analyze Historical Data ---
 @st.cache_data
 def load_and_analyze_data():
-    expected_columns = ['timestamp', 'heart_rate', 'panic_attack', 'activity']
-    try:
-        data = pd.read_csv('panic_attack_data.csv', parse_dates=['timestamp'])
-        if not all(col in data.columns for col in expected_columns):
-            raise FileNotFoundError("CSV missing required columns, regenerating...")
-    except FileNotFoundError:
-        timestamps = pd.date_range(start="2025-01-01", periods=1000, freq="1min")
-        heart_rates = np.random.normal(80, 15, 1000).clip(40, 160)
-        panic_attacks = np.random.choice([0, 1], size=1000, p=[0.95, 0.05])
-        activities = np.random.choice(
-            ['Social Interaction', 'Loud Environment', 'Routine Change', 'Screen Time', 'Quiet Rest'],
-            size=1000,
-            p=[0.25, 0.20, 0.20, 0.20, 0.15]
-        )
-        data = pd.DataFrame({
-            'timestamp': timestamps,
-            'heart_rate': heart_rates,
-            'panic_attack': panic_attacks,
-            'activity': activities
-        })
-        for i in range(1, len(data)):
-            if data.loc[i-1, 'activity'] in ['Social Interaction', 'Loud Environment', 'Routine Change']:
-                data.loc[i, 'panic_attack'] = np.random.choice([0, 1], p=[0.85, 0.15]) if data.loc[i, 'panic_attack'] == 0 else 1
-        data.to_csv('panic_attack_data.csv', index=False)
+    if os.path.exists(os.path.join(STORE_PATH, 'manifest.json')):
+        store = ColumnStore(STORE_PATH)
+    else:
+        try:
+            store = ColumnStore.import_csv('panic_attack_data.csv', STORE_PATH)
+        except (FileNotFoundError, ValueError):
+            data = generate_synthetic_data(1000)
+            data.to_csv('panic_attack_data.csv', index=False)
+            store = ColumnStore(STORE_PATH)
+            store.append_frame(data)
     
-    data['hour'] = data['timestamp'].dt.hour
-    hourly_risk = data.groupby('hour')['panic_attack'].mean() * 100
-    activity_risk = data.groupby('activity')['panic_attack'].mean() * 100
-    return hourly_risk, activity_risk
+    # Risk tables are persistent counters in the store manifest, so this
+    # does not grow with the size of the history
+    # NumPy arrays rather than pandas Series, so pandas stays unloaded on a warm start
+    return store.risk.hourly_rates(), store.risk.activity_rates(), ActivityAttributor(store.risk)
 
-hourly_risk, activity_risk = load_and_analyze_data()
+(risk_hours, hourly_risk), (risk_activities, activity_risk), attributor = load_and_analyze_data()
+
+# --- Forecasting Model ---
+# Optional multi-horizon model from `python -m panic_predictor.forecast train`
+FORECAST_MODEL = 'panic_forecast.joblib'
+
+@st.cache_resource
+def load_forecaster():
+    if not os.path.exists(FORECAST_MODEL):
+        return None
+    return Forecaster.from_file(FORECAST_MODEL)
+
+# --- Alerting ---
+@st.cache_resource
+def get_alerts():
+    # Hysteresis / minimum-duration / cooldown rules so the status does not
+    # flip on every noisy reading. PANIC_ALERT_LOG and PANIC_ALERT_WEBHOOK
+    # add a JSON-lines event log and a webhook notification.
+    sinks = []
+    if os.environ.get('PANIC_ALERT_LOG'):
+        sinks.append(FileSink(os.environ['PANIC_ALERT_LOG']))
+    if os.environ.get('PANIC_ALERT_WEBHOOK'):
+        sinks.append(WebhookSink(os.environ['PANIC_ALERT_WEBHOOK']))
+    return AlertEngine(DEFAULT_RULES, sinks)
+
+# --- Background Scheduler ---
+@st.cache_resource
+def get_scheduler():
+    # One scheduler thread per server process, shared by every browser session
+    return MonitorScheduler(engine, attributor, forecaster=load_forecaster(), alerts=get_alerts())
+
+# --- Online Retraining ---
+# One label store per patient (browser session), so rolling features and
+# reported panics never mix wearers
+LABELS_PATH = 'panic_attack_labels'
+
+@st.cache_resource
+def get_label_collector():
+    # With PANIC_RETRAIN_INTERVAL (seconds) set and a model registry in use,
+    # readings and reported panics are stored and the default model is
+    # retrained in a background process, then swapped in without a restart
+    interval = os.environ.get('PANIC_RETRAIN_INTERVAL')
+    registry = getattr(engine, 'registry', None)
+    if not interval or registry is None:
+        return None
+    Retrainer(registry, LABELS_PATH, os.path.join(registry.root, 'retrain'), float(interval)).start()
+    return LabelCollector(LABELS_PATH)
+
+collector = get_label_collector()
+
+# --- Metrics Endpoint ---
+@st.cache_resource
+def start_metrics_endpoint():
+    # With PANIC_METRICS_PORT set, stage timings are scraped from /metrics
+    port = os.environ.get('PANIC_METRICS_PORT')
+    return serve_metrics(int(port)) if port else None
+
+start_metrics_endpoint()
 
 # --- Custom CSS with Improved Text Colors and Transitions ---
 st.markdown("""
@@ -261,19 +303,19 @@ st.markdown("Monitor heart rate and predict panic attack triggers!", unsafe_allo
 
 # Initialize session state
 if 'history' not in st.session_state:
-    st.session_state.history = []
-if 'hr_data' not in st.session_state:
-    st.session_state.hr_data = []
-if 'proba_data' not in st.session_state:
-    st.session_state.proba_data = []
-if 'timestamps' not in st.session_state:
-    st.session_state.timestamps = []
+    st.session_state.history = RollingWindow()
 if 'manual_proba' not in st.session_state:
     st.session_state.manual_proba = 0.0
-if 'hrv_data' not in st.session_state:
-    st.session_state.hrv_data = []
-if 'activity_data' not in st.session_state:
-    st.session_state.activity_data = []
+if 'chart_stream' not in st.session_state:
+    st.session_state.chart_stream = LiveCharts()
+if 'monitor' not in st.session_state:
+    st.session_state.monitor = get_scheduler().add(Monitor(str(uuid.uuid4()), source=get_heart_rate))
+    if collector is not None:
+        # Store and release this session's label buffer once the session is gone
+        weakref.finalize(st.session_state.monitor, collector.forget, st.session_state.monitor.monitor_id)
+# Pick up a refreshed attribution table without restarting the scheduler
+get_scheduler().attributor = attributor
+st.session_state.monitor.collector = collector
 
 # Threshold for prediction
 threshold = 0.3
@@ -283,12 +325,17 @@ with st.container():
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.subheader("📏 Manual Input")
     manual_hr = st.number_input("Enter Heart Rate (BPM)", min_value=40.0, max_value=160.0, value=80.0, step=1.0, label_visibility="collapsed")
+    activity_tag = st.selectbox("Current Activity", ["Unknown"] + list(attributor.activities))
+    activity_tag = None if activity_tag == "Unknown" else activity_tag
+    st.session_state.monitor.activity_tag = activity_tag
     
     col1, col2 = st.columns([1, 1])
     with col1:
         if st.button("Predict"):
-            X_manual, current_activity = prepare_realtime_data(manual_hr, st.session_state.history, scaler, features, activity_risk)
-            prediction_proba = rf_model.predict_proba(X_manual)[0, 1]
+            with timer('features'):
+                X_manual = feature_row(manual_hr, st.session_state.history)
+            prediction_proba = engine.predict_features(X_manual)[0]
+            current_activity = attributor.likely_cause(datetime.now().hour, activity_tag)
             st.session_state.manual_proba = prediction_proba
             prediction = 1 if prediction_proba >= threshold else 0
             
@@ -302,6 +349,10 @@ with st.container():
             )
     with col2:
         st.metric("Probability", value=f"{st.session_state.manual_proba * 100:.2f}%")
+    if collector is not None:
+        if st.button("🚨 Report Panic"):
+            labelled = collector.confirm(st.session_state.monitor.monitor_id)
+            st.success(f"Panic recorded; {labelled} recent readings labelled for retraining.")
     st.markdown('</div>', unsafe_allow_html=True)
 
 # Time and Activity-Based Predictions
@@ -313,12 +364,12 @@ with st.container():
     with col1:
         fig_hourly_risk = go.Figure()
         fig_hourly_risk.add_trace(go.Bar(
-            x=hourly_risk.index,
-            y=hourly_risk.values,
+            x=risk_hours,
+            y=hourly_risk,
             marker_color='#6B9EFF',
             opacity=0.85,
             hoverinfo='y+text',
-            text=[f"{risk:.1f}%" for risk in hourly_risk.values]
+            text=[f"{risk:.1f}%" for risk in hourly_risk]
         ))
         fig_hourly_risk.update_layout(
             title="Risk by Hour (%)",
@@ -335,12 +386,12 @@ with st.container():
     with col2:
         fig_activity_risk = go.Figure()
         fig_activity_risk.add_trace(go.Bar(
-            x=activity_risk.index,
-            y=activity_risk.values,
+            x=risk_activities,
+            y=activity_risk,
             marker_color='#5A89C2',
             opacity=0.85,
             hoverinfo='y+text',
-            text=[f"{risk:.1f}%" for risk in activity_risk.values]
+            text=[f"{risk:.1f}%" for risk in activity_risk]
         ))
         fig_activity_risk.update_layout(
             title="Risk by Activity (%)",
@@ -356,8 +407,8 @@ with st.container():
         st.plotly_chart(fig_activity_risk, use_container_width=True)
     
     st.markdown('<p class="high-risk-text">**High-Risk Triggers:**</p>', unsafe_allow_html=True)
-    high_risk_hours = hourly_risk[hourly_risk > hourly_risk.mean()].index.tolist()
-    high_risk_activities = activity_risk[activity_risk > activity_risk.mean()].index.tolist()
+    high_risk_hours = risk_hours[hourly_risk > hourly_risk.mean()].tolist()
+    high_risk_activities = risk_activities[activity_risk > activity_risk.mean()].tolist()
     
     if high_risk_hours:
         st.markdown(f'<p class="high-risk-text">- **Times**: {", ".join([f"{h}:00" for h in high_risk_hours])}</p>', unsafe_allow_html=True)
@@ -386,147 +437,72 @@ with st.container():
 with st.container():
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.subheader("⏱️ Real-Time Simulation")
+    monitor = st.session_state.monitor
     
-    col1, col2 = st.columns(2)
+    col1, col2, col3, col4 = st.columns([1, 1, 1, 3])
     with col1:
-        hr_chart = st.empty()
-        hrv_chart = st.empty()
+        if st.button("Start"):
+            monitor.start()
     with col2:
-        radial_chart = st.empty()
-        proba_trend_chart = st.empty()
-    status = st.empty()
+        if st.button("Pause"):
+            monitor.pause()
+    with col3:
+        if st.button("Stop"):
+            monitor.stop()
+    with col4:
+        interval = st.slider("Update interval (s)", min_value=0.2, max_value=5.0, value=5.0, step=0.1)
+        if interval != monitor.interval:
+            monitor.set_interval(interval)
     
-    if st.button("Start"):
-        status.markdown('<div class="loader"></div>', unsafe_allow_html=True)
-        time.sleep(1)
-        iteration = 0  # Counter for unique keys
+    # Readings are produced by the background scheduler; this fragment only
+    # polls the monitor's buffer, and stops polling while it is paused/stopped
+    @st.fragment(run_every=monitor.interval if monitor.running else None)
+    def render_realtime():
+        # Only readings appended since the last run are sent to the browser
+        ack = st.session_state.get('live_charts')
+        with timer('render'):
+            live_charts(st.session_state.chart_stream.payload(monitor, ack, threshold), key='live_charts')
+        status = st.empty()
         
-        while True:
-            hr = get_heart_rate()
-            X_realtime, current_activity = prepare_realtime_data(hr, st.session_state.history, scaler, features, activity_risk)
-            prediction_proba = rf_model.predict_proba(X_realtime)[0, 1]
-            prediction = 1 if prediction_proba >= threshold else 0
-            
-            # Update session state
-            timestamp = datetime.now().strftime("%H:%M:%S")
-            st.session_state.hr_data.append(hr)
-            st.session_state.proba_data.append(prediction_proba * 100)
-            st.session_state.timestamps.append(timestamp)
-            st.session_state.hrv_data.append(np.std(st.session_state.hr_data[-10:]) if len(st.session_state.hr_data) >= 2 else 0)
-            st.session_state.activity_data.append(current_activity)
-            
-            if len(st.session_state.hr_data) > 10:
-                st.session_state.hr_data.pop(0)
-                st.session_state.proba_data.pop(0)
-                st.session_state.timestamps.pop(0)
-                st.session_state.hrv_data.pop(0)
-                st.session_state.activity_data.pop(0)
-            
-            likely_cause = current_activity if prediction else "None"
-            iteration += 1  # Increment counter for unique keys
-            
-            fig_hr = go.Figure()
-            fig_hr.add_trace(go.Scatter(
-                x=st.session_state.timestamps,
-                y=st.session_state.hr_data,
-                mode='lines+markers',
-                name='Heart Rate',
-                line=dict(color='#6B9EFF', width=4),
-                marker=dict(size=12, color='#3F6DAA', line=dict(width=2, color='#1A2E44')),
-                opacity=0.8,
-                hoverinfo='y+text',
-                text=[f"{hr:.1f} BPM" for hr in st.session_state.hr_data]
-            ))
-            fig_hr.update_layout(
-                title="Heart Rate (BPM)",
-                xaxis_title="Time",
-                yaxis_title="BPM",
-                plot_bgcolor='rgba(255, 255, 255, 0.9)',
-                paper_bgcolor='rgba(0, 0, 0, 0)',
-                font=dict(color='#1A2E44'),
-                height=300,
-                transition={'duration': 600, 'easing': 'cubic-in-out'}
-            )
-            hr_chart.plotly_chart(fig_hr, use_container_width=True, key=f"hr_chart_{iteration}")
-            
-            fig_hrv = go.Figure()
-            fig_hrv.add_trace(go.Bar(
-                x=st.session_state.timestamps,
-                y=st.session_state.hrv_data,
-                name='HRV',
-                marker_color='#5A89C2',
-                opacity=0.85,
-                hoverinfo='y+text',
-                text=[f"{hrv:.2f}" for hrv in st.session_state.hrv_data]
-            ))
-            fig_hrv.update_layout(
-                title="Heart Rate Variability (Std Dev)",
-                xaxis_title="Time",
-                yaxis_title="HRV",
-                plot_bgcolor='rgba(255, 255, 255, 0.9)',
-                paper_bgcolor='rgba(0, 0, 0, 0)',
-                font=dict(color='#1A2E44'),
-                height=300,
-                transition={'duration': 600, 'easing': 'cubic-in-out'}
-            )
-            hrv_chart.plotly_chart(fig_hrv, use_container_width=True, key=f"hrv_chart_{iteration}")
-            
-            fig_radial = go.Figure()
-            fig_radial.add_trace(go.Barpolar(
-                r=[prediction_proba * 100],
-                theta=[0],
-                width=[360],
-                marker=dict(
-                    color=["#FF6B6B" if prediction else "#4CAF50"],
-                    line=dict(color="#1A2E44", width=2)
-                ),
-                opacity=0.85,
-            ))
-            fig_radial.update_layout(
-                title="Panic Risk (%)",
-                polar=dict(
-                    radialaxis=dict(range=[0, 100], showticklabels=False),
-                    angularaxis=dict(showticklabels=False)
-                ),
-                height=300,
-                showlegend=False,
-                transition={'duration': 600, 'easing': 'cubic-in-out'}
-            )
-            radial_chart.plotly_chart(fig_radial, use_container_width=True, key=f"radial_chart_{iteration}")
-            
-            fig_proba_trend = go.Figure()
-            fig_proba_trend.add_trace(go.Scatter(
-                x=st.session_state.timestamps,
-                y=st.session_state.proba_data,
-                mode='lines+markers',
-                name='Probability',
-                line=dict(color='#FF6B6B' if prediction else '#4CAF50', width=3),
-                marker=dict(size=10, color='#1A2E44'),
-                opacity=0.8,
-                hoverinfo='y+text',
-                text=[f"{p:.1f}% ({act})" for p, act in zip(st.session_state.proba_data, st.session_state.activity_data)]
-            ))
-            fig_proba_trend.update_layout(
-                title="Panic Probability Trend (%)",
-                xaxis_title="Time",
-                yaxis_title="Probability",
-                plot_bgcolor='rgba(255, 255, 255, 0.9)',
-                paper_bgcolor='rgba(0, 0, 0, 0)',
-                font=dict(color='#1A2E44'),
-                height=300,
-                transition={'duration': 600, 'easing': 'cubic-in-out'}
-            )
-            proba_trend_chart.plotly_chart(fig_proba_trend, use_container_width=True, key=f"proba_trend_chart_{iteration}")
-            
-            status.markdown(
-                f'<span style="color: {"#FF6B6B" if prediction else "#4CAF50"}; font-size: 24px; font-weight: bold;" class="status-pulse">'
-                f'HR: {hr:.1f} | {"⚠️ Risk" if prediction else "✅ Safe"}</span><br>'
-                f'<span style="color: #1A2E44; font-size: 16px;">Likely Cause: {likely_cause}</span>',
-                unsafe_allow_html=True
-            )
-            
-            time.sleep(5)
+        latest = monitor.latest()
+        if latest is None:
+            if monitor.running:
+                status.markdown('<div class="loader"></div>', unsafe_allow_html=True)
+            return
+        
+        hr = latest['hr']
+        # The risk badge follows the alert state, not the single latest reading
+        prediction = 1 if monitor.alerting else 0
+        likely_cause = latest['activity'] if prediction else "None"
+        
+        forecast = monitor.forecast
+        forecast_html = ""
+        if forecast:
+            forecast_html = '<br><span style="color: #1A2E44; font-size: 16px;">Forecast: ' + " | ".join(
+                f"+{h} min {p * 100:.0f}%" for h, p in forecast.items()
+            ) + '</span>'
+        
+        status.markdown(
+            f'<span style="color: {"#FF6B6B" if prediction else "#4CAF50"}; font-size: 24px; font-weight: bold;" class="status-pulse">'
+            f'HR: {hr:.1f} | {"⚠️ Risk" if prediction else "✅ Safe"}</span><br>'
+            f'<span style="color: #1A2E44; font-size: 16px;">Likely Cause: {likely_cause}</span>'
+            f'{forecast_html}',
+            unsafe_allow_html=True
+        )
+    
+    render_realtime()
     st.markdown('</div>', unsafe_allow_html=True)
 
+# Performance Panel
+with st.expander("📊 Performance", expanded=False):
+    stages = REGISTRY.summary()
+    if stages:
+        st.dataframe(stages, hide_index=True, use_container_width=True)
+    else:
+        st.caption("No timings recorded yet.")
+    counters = {name: counter.value for name, counter in sorted(REGISTRY.counters.items())}
+    if counters:
+        st.caption(" | ".join(f"{name}: {value}" for name, value in counters.items()))
+
 # Footer
 st.markdown('<div class="footer">Developed with ❤️ by [Your Name] | Powered by Streamlit & xAI</div>', unsafe_allow_html=True)
@@ -0,0 +1,63 @@
+# benchmarks/cold_start.py
+# Cold-start time of a fresh interpreter that loads the model and scores one
+# row: the joblib pickle path against the memory-mapped artifact path.
+#   python benchmarks/cold_start.py [--runs 5]
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PICKLE_SCRIPT = """
+import warnings; warnings.filterwarnings('ignore')
+import joblib, numpy as np
+model = joblib.load('panic_attack_rf_model.pkl')
+scaler = joblib.load('scaler.pkl')
+model.predict_proba(scaler.transform(np.array([[80.0, 12, 30, 80.0, 5.0, 0.0]])))
+"""
+
+ARTIFACT_SCRIPT = """
+import numpy as np
+from panic_predictor.artifact import load_artifact
+forest, _ = load_artifact({path!r})
+forest.predict_proba(np.array([[80.0, 12, 30, 80.0, 5.0, 0.0]]))
+"""
+
+
+def run(script, runs):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', script], cwd=ROOT, env=env, check=True)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model')
+        subprocess.run(
+            [sys.executable, '-W', 'ignore', '-m', 'panic_predictor.artifact', '--out', path],
+            cwd=ROOT, env=dict(os.environ, PYTHONPATH=ROOT), check=True, stdout=subprocess.DEVNULL
+        )
+        baseline = run('pass', args.runs)
+        t_pickle = run(PICKLE_SCRIPT, args.runs)
+        t_artifact = run(ARTIFACT_SCRIPT.format(path=path), args.runs)
+
+    print(f"interpreter only   {baseline * 1e3:8.1f} ms")
+    print(f"joblib pickle      {t_pickle * 1e3:8.1f} ms  (+{(t_pickle - baseline) * 1e3:.1f})")
+    print(f"mmap artifact      {t_artifact * 1e3:8.1f} ms  (+{(t_artifact - baseline) * 1e3:.1f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+# benchmarks/conftest.py
+# Shared, seeded fixtures for the pytest-benchmark suite. Everything runs
+# headless: nothing here imports Streamlit or autism.py.
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SEED = 42
+CSV_SIZES = [
+    1_000,
+    pytest.param(1_000_000, marks=pytest.mark.large),
+    pytest.param(10_000_000, marks=pytest.mark.large),
+]
+
+
+def pytest_addoption(parser):
+    parser.addoption('--run-large', action='store_true', help="include the 1M/10M-row benchmarks")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--run-large'):
+        return
+    skip = pytest.mark.skip(reason="needs --run-large")
+    for item in items:
+        if 'large' in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(autouse=True)
+def seeded():
+    # Every benchmark starts from the same global NumPy state
+    np.random.seed(SEED)
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(SEED)
+
+
+@pytest.fixture(scope='session')
+def rf_model():
+    import joblib
+    return joblib.load(os.path.join(ROOT, 'panic_attack_rf_model.pkl'))
+
+
+@pytest.fixture(scope='session')
+def scaler():
+    import joblib
+    return joblib.load(os.path.join(ROOT, 'scaler.pkl'))
+
+
+@pytest.fixture(scope='session')
+def forest(rf_model, scaler):
+    from panic_predictor.forest import FlatForest
+    return FlatForest.from_sklearn(rf_model, scaler)
+
+
+@pytest.fixture(scope='session')
+def activity_risk():
+    from panic_predictor.analytics import RiskTable, generate_synthetic_data
+    return RiskTable.from_frame(generate_synthetic_data(1000, seed=SEED)).activity_risk()
+
+
+@pytest.fixture(scope='session')
+def raw_features():
+    # Raw (unscaled) feature rows in realistic ranges, largest batch size
+    rng = np.random.default_rng(SEED)
+    n = 10_000
+    hr = rng.normal(80, 15, n).clip(40, 160)
+    return np.column_stack([
+        hr,
+        rng.integers(0, 24, n),
+        rng.integers(0, 60, n),
+        hr + rng.normal(0, 3, n),
+        rng.gamma(2.0, 4.0, n),
+        rng.normal(0, 10, n),
+    ])
+
+
+@pytest.fixture(scope='session')
+def synthetic_csv(tmp_path_factory):
+    # Writes each requested size once per session
+    from panic_predictor.analytics import generate_synthetic_data
+    cache = {}
+
+    def make(n):
+        if n not in cache:
+            path = tmp_path_factory.mktemp('csv') / f'panic_attack_data_{n}.csv'
+            generate_synthetic_data(n, seed=SEED).to_csv(path, index=False)
+            cache[n] = str(path)
+        return cache[n]
+    return make
@@ -0,0 +1,54 @@
+# benchmarks/forest_latency.py
+# Latency of sklearn predict_proba (scaler.transform + forest) against
+# FlatForest on raw features, at batch sizes 1, 64 and 10k.
+#   python benchmarks/forest_latency.py
+import os
+import sys
+import time
+import warnings
+
+import joblib
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from panic_predictor.features import scale_features, scaler_params  # noqa: E402
+from panic_predictor.forest import FlatForest  # noqa: E402
+
+
+def random_features(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.normal(80, 15, n).clip(40, 160), rng.integers(0, 24, n), rng.integers(0, 60, n),
+        rng.normal(80, 5, n), rng.gamma(3, 4, n), rng.normal(0, 20, n),
+    ])
+
+
+def median_time(fn, min_repeats=5, budget=1.0):
+    times = []
+    start = time.perf_counter()
+    while len(times) < min_repeats or time.perf_counter() - start < budget:
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return float(np.median(times))
+
+
+def main():
+    warnings.filterwarnings('ignore')
+    model = joblib.load('panic_attack_rf_model.pkl')
+    scaler = joblib.load('scaler.pkl')
+    mean, scale = scaler_params(scaler)
+    forest = FlatForest.from_sklearn(model, scaler)
+
+    print(f"{'batch':>7} {'sklearn':>12} {'FlatForest':>12} {'speedup':>8}  max |diff|")
+    for n in (1, 64, 10_000):
+        X = random_features(n)
+        ref = model.predict_proba(scale_features(X, mean, scale))
+        diff = np.abs(forest.predict_proba(X) - ref).max()
+        t_sklearn = median_time(lambda: model.predict_proba(scaler.transform(X)))
+        t_flat = median_time(lambda: forest.predict_proba(X))
+        print(f"{n:>7} {t_sklearn * 1e3:>10.3f}ms {t_flat * 1e3:>10.3f}ms {t_sklearn / t_flat:>7.1f}x  {diff:.2e}")
+
+
+if __name__ == '__main__':
+    main()
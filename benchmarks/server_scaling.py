@@ -0,0 +1,113 @@
+# benchmarks/server_scaling.py
+# Throughput of the pre-forked scoring server with 1 worker against N workers.
+# Two paths are measured for every pool size:
+#   direct  ScoringServer.score from several threads, no HTTP: worker scaling
+#   http    POST /score from client processes: adds the single router process
+#           (JSON decode, routing, JSON encode), which caps the total
+#   python benchmarks/server_scaling.py [--workers 1 4] [--batch 256] [--seconds 5]
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PATIENTS = 10_000
+
+
+def batches(seed, batch, count=64):
+    rng = np.random.default_rng(seed)
+    return [([f'p{i}' for i in rng.integers(0, PATIENTS, batch)], rng.normal(80, 15, batch))
+            for _ in range(count)]
+
+
+def drive_direct(server, batch, seconds, threads):
+    def loop(seed):
+        work, done, i = batches(seed, batch), 0, 0
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            ids, hrs = work[i % len(work)]
+            server.score(ids, hrs)
+            done += batch
+            i += 1
+        return done
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        total = sum(pool.map(loop, range(threads)))
+    return total / (time.perf_counter() - start)
+
+
+def _client(url, batch, seconds, seed, out):
+    from panic_predictor.server import ScoringClient
+    client = ScoringClient(url)
+    work, done, i = batches(seed, batch), 0, 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        ids, hrs = work[i % len(work)]
+        client.score(ids, hrs)
+        done += batch
+        i += 1
+    out.put(done)
+
+
+def drive_http(url, batch, seconds, clients):
+    ctx = multiprocessing.get_context('spawn')
+    out = ctx.Queue()
+    procs = [ctx.Process(target=_client, args=(url, batch, seconds, seed, out)) for seed in range(clients)]
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    total = sum(out.get() for _ in procs)
+    elapsed = time.perf_counter() - start
+    for p in procs:
+        p.join()
+    return total / elapsed
+
+
+def measure(forest, workers, batch, seconds, clients):
+    from panic_predictor.server import ScoringServer
+    server = ScoringServer(forest, workers, port=0).start()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    while server._httpd is None:
+        time.sleep(0.01)
+    try:
+        direct = drive_direct(server, batch, seconds, clients)
+        http = drive_http(f'http://127.0.0.1:{server._httpd.server_address[1]}', batch, seconds, clients)
+    finally:
+        server.shutdown()
+        server.close()
+    return direct, http
+
+
+def main():
+    from panic_predictor.artifact import load_or_export
+
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, cpus}))
+    parser.add_argument('--batch', type=int, default=256, help="readings per request")
+    parser.add_argument('--seconds', type=float, default=5.0, help="per measurement")
+    parser.add_argument('--clients', type=int, default=max(cpus, 2), help="concurrent callers")
+    args = parser.parse_args()
+
+    forest, _ = load_or_export(*(os.path.join(ROOT, name) for name in
+                                 ('panic_attack_model', 'panic_attack_rf_model.pkl', 'scaler.pkl')))
+    print(f"{cpus} CPUs, {args.clients} callers, {args.batch} readings per request")
+    print(f"{'workers':>7}  {'direct/s':>10}  {'speedup':>7}  {'http/s':>10}  {'speedup':>7}")
+    base = None
+    for workers in args.workers:
+        direct, http = measure(forest, workers, args.batch, args.seconds, args.clients)
+        base = base or (direct, http)
+        print(f"{workers:>7}  {direct:>10,.0f}  {direct / base[0]:>6.2f}x  {http:>10,.0f}  {http / base[1]:>6.2f}x",
+              flush=True)
+
+
+if __name__ == '__main__':
+    main()
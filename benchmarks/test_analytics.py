@@ -0,0 +1,47 @@
+# benchmarks/test_analytics.py
+# The work behind autism.load_and_analyze_data: a cold start imports the CSV
+# into the column store, a warm start reopens the store and reads its risk
+# counters.
+import itertools
+
+import pytest
+
+from conftest import CSV_SIZES
+from panic_predictor.analytics import aggregate_csv
+from panic_predictor.store import ColumnStore
+
+
+def _rounds(n):
+    return 5 if n <= 1_000 else 1
+
+
+@pytest.mark.parametrize('rows', CSV_SIZES)
+def test_load_and_analyze_cold(benchmark, synthetic_csv, tmp_path, rows):
+    csv_path = synthetic_csv(rows)
+    counter = itertools.count()
+
+    def setup():
+        return (csv_path, str(tmp_path / f'store{next(counter)}')), {}
+
+    def load(csv_path, store_path):
+        store = ColumnStore.import_csv(csv_path, store_path)
+        return store.hourly_risk(), store.activity_risk()
+
+    benchmark.pedantic(load, setup=setup, rounds=_rounds(rows))
+
+
+@pytest.mark.parametrize('rows', CSV_SIZES)
+def test_load_and_analyze_warm(benchmark, synthetic_csv, tmp_path, rows):
+    store_path = str(tmp_path / 'store')
+    ColumnStore.import_csv(synthetic_csv(rows), store_path)
+
+    def load():
+        store = ColumnStore(store_path)
+        return store.hourly_risk(), store.activity_risk()
+
+    benchmark(load)
+
+
+@pytest.mark.parametrize('rows', CSV_SIZES)
+def test_aggregate_csv(benchmark, synthetic_csv, rows):
+    benchmark.pedantic(aggregate_csv, args=(synthetic_csv(rows),), rounds=_rounds(rows))
@@ -0,0 +1,62 @@
+# benchmarks/test_charts.py
+import time
+
+import numpy as np
+import pytest
+
+from panic_predictor.charts import (
+    LiveCharts, build_realtime_figures, hr_figure, hrv_figure, proba_trend_figure, radial_figure,
+)
+from panic_predictor.realtime import Monitor
+
+POINTS = 10
+
+
+@pytest.fixture
+def monitor(rng):
+    monitor = Monitor('bench', capacity=POINTS)
+    start = time.time() - POINTS
+    for i, (hr, proba) in enumerate(zip(rng.normal(80, 15, POINTS), rng.random(POINTS))):
+        monitor.record(start + i, float(hr), float(proba), 'Screen Time')
+    return monitor
+
+
+@pytest.fixture
+def series(monitor):
+    data = monitor.snapshot()
+    x = [np.datetime64(int(t), 'ms').astype(object) for t in data['timestamps']]
+    return x, data
+
+
+def test_hr_figure(benchmark, series):
+    x, data = series
+    benchmark(hr_figure, x, data['hr'])
+
+
+def test_hrv_figure(benchmark, series):
+    x, data = series
+    benchmark(hrv_figure, x, data['hrv'])
+
+
+def test_radial_figure(benchmark):
+    benchmark(radial_figure, 0.42, 1)
+
+
+def test_proba_trend_figure(benchmark, series):
+    x, data = series
+    benchmark(proba_trend_figure, x, data['proba'] * 100, data['activity'], 1)
+
+
+def test_build_realtime_figures(benchmark, monitor):
+    benchmark(build_realtime_figures, monitor.snapshot(), 0.3)
+
+
+def test_live_charts_delta(benchmark, monitor):
+    stream = LiveCharts()
+    stream.payload(monitor, None, 0.3)
+
+    def tick():
+        monitor.record(time.time(), 85.0, 0.5, 'Screen Time')
+        return stream.payload(monitor, None, 0.3)
+
+    benchmark(tick)
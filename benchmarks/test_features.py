@@ -0,0 +1,63 @@
+# benchmarks/test_features.py
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from panic_predictor import FEATURES, RollingWindow
+from panic_predictor.engine import InferenceEngine
+from panic_predictor.features import rolling_features
+from panic_predictor.realtime import get_heart_rate
+
+
+# --- Baseline ---
+# The original per-reading path (one-row DataFrame, scaler.transform and a
+# random activity draw), kept here only as the "before" number for
+# InferenceEngine; it is not part of the package.
+
+def sample_activity(activity_risk):
+    activities = activity_risk.index.tolist()
+    activity_weights = activity_risk.values / activity_risk.sum()
+    return np.random.choice(activities, p=activity_weights)
+
+
+def prepare_realtime_data(current_hr, history, scaler, features, activity_risk):
+    history.push(current_hr)
+    current_time = datetime.now()
+    data_point = pd.DataFrame({
+        'heart_rate': [current_hr],
+        'hour': [current_time.hour],
+        'minute': [current_time.minute],
+        'hr_rolling_mean': [history.mean],
+        'hr_rolling_std': [history.std],
+        'hr_change': [history.change]
+    }, columns=features)
+    return scaler.transform(data_point), sample_activity(activity_risk)
+
+
+def test_get_heart_rate(benchmark):
+    benchmark(get_heart_rate)
+
+
+def test_prepare_realtime_data(benchmark, scaler, activity_risk):
+    history = RollingWindow()
+    for hr in np.random.normal(80, 15, 10):
+        history.push(hr)
+    benchmark(prepare_realtime_data, 85.0, history, scaler, FEATURES, activity_risk)
+
+
+def test_rolling_window_push(benchmark):
+    history = RollingWindow()
+    benchmark(history.push, 85.0)
+
+
+def test_engine_build_features_1000_patients(benchmark, forest, rng):
+    engine = InferenceEngine(forest, None)
+    patient_ids = [f'p{i}' for i in range(1000)]
+    heart_rates = rng.normal(80, 15, 1000)
+    benchmark(engine.build_features, patient_ids, heart_rates)
+
+
+def test_rolling_features_one_day(benchmark, rng):
+    heart_rates = rng.normal(80, 15, 24 * 60)
+    benchmark(rolling_features, heart_rates)
@@ -0,0 +1,26 @@
+# benchmarks/test_scoring.py
+import pytest
+
+from panic_predictor.engine import InferenceEngine
+from panic_predictor.features import scale_features, scaler_params
+
+BATCH_SIZES = [1, 10, 100, 1_000, 10_000]
+
+
+@pytest.mark.parametrize('batch', BATCH_SIZES)
+def test_rf_predict_proba(benchmark, rf_model, scaler, raw_features, batch):
+    X = scale_features(raw_features[:batch], *scaler_params(scaler))
+    benchmark(rf_model.predict_proba, X)
+
+
+@pytest.mark.parametrize('batch', BATCH_SIZES)
+def test_flat_forest_predict_proba(benchmark, forest, raw_features, batch):
+    benchmark(forest.predict_proba, raw_features[:batch])
+
+
+@pytest.mark.parametrize('batch', BATCH_SIZES)
+def test_engine_score(benchmark, forest, rng, batch):
+    engine = InferenceEngine(forest, None)
+    patient_ids = [f'p{i}' for i in range(batch)]
+    heart_rates = rng.normal(80, 15, batch)
+    benchmark(engine.score, patient_ids, heart_rates)
@@ -26,8 +26,11 @@ long lastBeat = 0;        // Timestamp of last beat
 float beatsPerMinute;
 int beatAvg;
 
+String deviceId;          // Identifies this wearer in serial frames
+
 void setup() {
     Serial.begin(115200);
+    deviceId = String((uint32_t)ESP.getEfuseMac(), HEX);
 
     // Connect to WiFi
     WiFi.begin(WIFI_SSID, WIFI_PASSWORD);
@@ -71,6 +74,9 @@ void loop() {
     // Get heart rate
     int bpm = getBPM();
 
+    // Frame for the Python ingestion service: $HR,<device>,<millis>,<bpm>,<sw>
+    Serial.printf("$HR,%s,%lu,%d,%d\n", deviceId.c_str(), millis(), bpm, sw);
+
     // Update Firebase with joystick data
     if (Firebase.setInt(firebaseData, "/joystick/x", x)) {
         Serial.println("X updated: " + String(x));
@@ -0,0 +1,4 @@
+# panic_predictor/__init__.py
+# Headless building blocks behind autism.py. Nothing in here imports Streamlit.
+from .features import FEATURES, RollingWindow
+from .engine import InferenceEngine, MicroBatcher
@@ -0,0 +1,297 @@
+# panic_predictor/alerts.py
+# Alerting on top of scored readings. Instead of flagging every reading with
+# proba >= threshold, each patient moves through a small state machine:
+#
+#   quiet --(proba >= on_threshold for min_duration s, not cooling down)--> alerting
+#   alerting --(proba < off_threshold for clear_after s)--> quiet (+ cooldown s)
+#
+# One "alert" event is emitted when an episode starts and one "clear" event
+# when it ends. State lives in NumPy arrays indexed by patient slot, and a
+# batch is evaluated in rounds that hold at most one reading per patient, so
+# the per-reading work is vectorized however many patients there are.
+# forget() and evict_idle() return slots to a free list for the next new
+# patient, so the arrays are sized by concurrent patients, not every id seen.
+import json
+import queue
+import sys
+import threading
+import urllib.request
+from collections import deque, namedtuple
+
+import numpy as np
+
+from .metrics import inc, timer
+
+AlertEvent = namedtuple('AlertEvent', ['kind', 'patient_id', 'timestamp', 'probability', 'started', 'duration'])
+AlertRules = namedtuple('AlertRules', ['on_threshold', 'off_threshold', 'min_duration', 'clear_after', 'cooldown'])
+DEFAULT_RULES = AlertRules(on_threshold=0.3, off_threshold=0.2, min_duration=10.0, clear_after=20.0, cooldown=120.0)
+
+
+def event_dict(event):
+    return event._asdict()
+
+
+# --- Sinks ---
+class MemorySink:
+    def __init__(self):
+        self.events = []
+
+    def send(self, events):
+        self.events.extend(events)
+
+
+class StreamSink:
+    # Human-readable lines, e.g. to stdout from the ingest CLI
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, events):
+        for e in events:
+            if e.kind == 'alert':
+                line = f"ALERT {e.patient_id} risk {e.probability * 100:.1f}%"
+            else:
+                line = f"CLEAR {e.patient_id} after {e.duration:.0f} s (peak {e.probability * 100:.1f}%)"
+            print(line, file=self.stream, flush=True)
+
+
+class FileSink:
+    # Appends one JSON object per event; doubles as the persistent event log
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, events):
+        lines = ''.join(json.dumps(event_dict(e)) + '\n' for e in events)
+        with self._lock, open(self.path, 'a') as f:
+            f.write(lines)
+
+
+class WebhookSink:
+    # POSTs {"events": [...]} batches from a background thread, so a slow
+    # endpoint never stalls scoring. Batches beyond max_pending are dropped.
+    def __init__(self, url, timeout=5.0, max_pending=1000):
+        self.url = url
+        self.timeout = timeout
+        self.stats = {'sent': 0, 'failed': 0, 'dropped': 0}
+        self._queue = queue.Queue(max_pending)
+        self._thread = threading.Thread(target=self._run, name='alert-webhook', daemon=True)
+        self._thread.start()
+
+    def send(self, events):
+        try:
+            self._queue.put_nowait([event_dict(e) for e in events])
+        except queue.Full:
+            self.stats['dropped'] += len(events)
+
+    def _run(self):
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                return
+            request = urllib.request.Request(
+                self.url, json.dumps({'events': batch}).encode(), {'Content-Type': 'application/json'}
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    response.read()
+                self.stats['sent'] += len(batch)
+            except OSError:
+                self.stats['failed'] += len(batch)
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        self._queue.join()
+
+    def close(self):
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+
+
+class WebhookReceiver:
+    # Local webhook endpoint for tests and demos; collects posted events
+    def __init__(self, host='127.0.0.1', port=0):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        received = self.events = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                received.extend(body.get('events', []))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self.url = f'http://{host}:{self._httpd.server_address[1]}/'
+        threading.Thread(target=self._httpd.serve_forever, name='webhook-receiver', daemon=True).start()
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+# --- Engine ---
+class AlertEngine:
+    # log keeps the most recent events in memory; pass a FileSink for a
+    # durable event log.
+
+    def __init__(self, rules=DEFAULT_RULES, sinks=(), capacity=1024, log_size=1000):
+        if rules.off_threshold > rules.on_threshold:
+            raise ValueError("off_threshold must not exceed on_threshold")
+        self.rules = rules
+        self.sinks = list(sinks)
+        self.log = deque(maxlen=log_size)
+        self.slots = {}
+        self.patient_ids = []   # by slot; None for a free slot
+        self._free = []
+        self._lock = threading.Lock()
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        def grow(name, fill, dtype):
+            old = getattr(self, name, None)
+            array = np.full(capacity, fill, dtype=dtype)
+            if old is not None:
+                array[:len(old)] = old
+            setattr(self, name, array)
+        grow('active', False, bool)
+        grow('above_since', np.nan, np.float64)   # start of the current run >= on_threshold
+        grow('below_since', np.nan, np.float64)   # start of the current run < off_threshold
+        grow('cooldown_until', -np.inf, np.float64)
+        grow('started', np.nan, np.float64)
+        grow('peak', 0.0, np.float64)
+        grow('last_seen', -np.inf, np.float64)
+
+    def slots_for(self, patient_ids):
+        # Patient ids to state slots; Python work is per distinct patient only
+        unique, inverse = np.unique(np.asarray(patient_ids, dtype=object).astype(str), return_inverse=True)
+        slot_of_unique = np.empty(len(unique), dtype=np.int64)
+        with self._lock:
+            for i, pid in enumerate(unique.tolist()):
+                slot = self.slots.get(pid)
+                if slot is None:
+                    if self._free:
+                        slot = self._free.pop()
+                        self.patient_ids[slot] = pid
+                    else:
+                        slot = len(self.patient_ids)
+                        self.patient_ids.append(pid)
+                    self.slots[pid] = slot
+                slot_of_unique[i] = slot
+            if len(self.patient_ids) > len(self.active):
+                self._allocate(max(len(self.patient_ids), 2 * len(self.active)))
+        return slot_of_unique[inverse]
+
+    def evaluate(self, patient_ids, timestamps, proba):
+        # Feeds a batch of scored readings (in time order per patient) through
+        # the state machine; returns and dispatches the resulting events
+        with timer('alerts'):
+            slots = self.slots_for(patient_ids)
+            events = self.evaluate_slots(slots, timestamps, proba)
+        if events:
+            self.log.extend(events)
+            inc('alerts_raised', sum(e.kind == 'alert' for e in events))
+            for sink in self.sinks:
+                sink.send(events)
+        return events
+
+    def evaluate_slots(self, slots, timestamps, proba):
+        slots = np.asarray(slots, dtype=np.int64)
+        n = len(slots)
+        if n == 0:
+            return []
+        timestamps = np.broadcast_to(np.asarray(timestamps, dtype=np.float64), (n,))
+        proba = np.asarray(proba, dtype=np.float64)
+        # Round r holds each patient's r-th reading in this batch
+        order = np.argsort(slots, kind='stable')
+        sorted_slots = slots[order]
+        first = np.r_[0, np.flatnonzero(np.diff(sorted_slots)) + 1]
+        occurrence = np.arange(n) - np.repeat(first, np.diff(np.r_[first, n]))
+        raised, cleared, episodes = [], [], []
+        with self._lock:
+            for r in range(int(occurrence.max()) + 1):
+                idx = order[occurrence == r]
+                a, c = self._step(slots[idx], timestamps[idx], proba[idx])
+                raised.append(idx[a])
+                cleared.append(idx[c])
+                # A later round may start the next episode, so the ending
+                # one's start and peak are taken now
+                ended = slots[idx[c]]
+                episodes.append(np.column_stack([self.started[ended], self.peak[ended]]))
+            return self._events(np.concatenate(raised), np.concatenate(cleared), np.concatenate(episodes),
+                                slots, timestamps, proba)
+
+    def _step(self, s, t, p):
+        rules = self.rules
+        high = p >= rules.on_threshold
+        low = p < rules.off_threshold
+        active = self.active[s]
+
+        above = np.where(high, np.fmin(self.above_since[s], t), np.nan)
+        below = np.where(low & active, np.fmin(self.below_since[s], t), np.nan)
+        raise_ = ~active & high & (t - above >= rules.min_duration) & (t >= self.cooldown_until[s])
+        clear = active & low & (t - below >= rules.clear_after)
+
+        self.above_since[s] = np.where(clear | raise_, np.nan, above)
+        self.below_since[s] = np.where(clear | raise_, np.nan, below)
+        self.active[s] = (active | raise_) & ~clear
+        self.peak[s] = np.where(raise_, p, np.where(active, np.maximum(self.peak[s], p), self.peak[s]))
+        self.started[s] = np.where(raise_, t, self.started[s])
+        self.cooldown_until[s] = np.where(clear, t + rules.cooldown, self.cooldown_until[s])
+        self.last_seen[s] = t
+        return raise_, clear
+
+    def _events(self, raised, cleared, episodes, slots, timestamps, proba):
+        events = []
+        for i in raised.tolist():
+            t = float(timestamps[i])
+            events.append(AlertEvent('alert', self.patient_ids[slots[i]], t, float(proba[i]), t, 0.0))
+        for i, (started, peak) in zip(cleared.tolist(), episodes.tolist()):
+            t = float(timestamps[i])
+            events.append(AlertEvent('clear', self.patient_ids[slots[i]], t, peak, started, t - started))
+        events.sort(key=lambda e: e.timestamp)
+        return events
+
+    def is_active(self, patient_id):
+        slot = self.slots.get(str(patient_id))
+        return slot is not None and bool(self.active[slot])
+
+    def active_alerts(self):
+        with self._lock:
+            return [self.patient_ids[s] for s in np.flatnonzero(self.active[:len(self.patient_ids)]).tolist()]
+
+    def forget(self, patient_id):
+        # Drops a patient's state and frees the slot; the id starts afresh if
+        # it is seen again
+        with self._lock:
+            slot = self.slots.pop(str(patient_id), None)
+            if slot is not None:
+                self._release([slot])
+
+    def evict_idle(self, before):
+        # Forgets patients with no reading since timestamp `before` and no open
+        # alert; returns their ids
+        with self._lock:
+            n = len(self.patient_ids)
+            idle = [s for s in np.flatnonzero((self.last_seen[:n] < before) & ~self.active[:n]).tolist()
+                    if self.patient_ids[s] is not None]
+            ids = [self.patient_ids[s] for s in idle]
+            for pid in ids:
+                del self.slots[pid]
+            self._release(idle)
+        return ids
+
+    def _release(self, slots):
+        for slot in slots:
+            self.patient_ids[slot] = None
+        self.active[slots] = False
+        self.above_since[slots] = self.below_since[slots] = self.started[slots] = np.nan
+        self.cooldown_until[slots] = -np.inf
+        self.peak[slots] = 0.0
+        self.last_seen[slots] = -np.inf
+        self._free.extend(slots)
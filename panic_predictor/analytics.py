@@ -0,0 +1,133 @@
+# panic_predictor/analytics.py
+# pandas is imported where it is used, so the app's warm start (risk tables
+# from the store manifest) does not pay for it.
+import numpy as np
+
+EXPECTED_COLUMNS = ['timestamp', 'heart_rate', 'panic_attack', 'activity']
+ACTIVITIES = ['Social Interaction', 'Loud Environment', 'Routine Change', 'Screen Time', 'Quiet Rest']
+ACTIVITY_WEIGHTS = [0.25, 0.20, 0.20, 0.20, 0.15]
+RISKY_ACTIVITIES = ['Social Interaction', 'Loud Environment', 'Routine Change']
+
+
+# --- Synthetic Data ---
+def generate_synthetic_data(n=1000, start="2025-01-01", seed=None):
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range(start=start, periods=n, freq="1min")
+    heart_rates = rng.normal(80, 15, n).clip(40, 160)
+    panic_attacks = (rng.random(n) < 0.05).astype(np.int64)
+    activity_codes = rng.choice(len(ACTIVITIES), size=n, p=ACTIVITY_WEIGHTS)
+
+    # A risky activity on the previous minute raises the panic chance to 15%
+    # for readings that were not already panics
+    risky = np.isin(activity_codes, [ACTIVITIES.index(a) for a in RISKY_ACTIVITIES])
+    follow = np.zeros(n, dtype=bool)
+    follow[1:] = risky[:-1] & (panic_attacks[1:] == 0)
+    panic_attacks[follow] = rng.random(int(follow.sum())) < 0.15
+
+    return pd.DataFrame({
+        'timestamp': timestamps,
+        'heart_rate': heart_rates,
+        'panic_attack': panic_attacks,
+        'activity': np.asarray(ACTIVITIES, dtype=object)[activity_codes]
+    })
+
+
+# --- Risk Aggregates ---
+class RiskTable:
+    # Panic sums and reading counts per (hour, activity). Partial tables from
+    # separate chunks or files merge by addition; the hourly and activity risk
+    # tables are marginals of it.
+
+    def __init__(self, activities=()):
+        self.activities = list(activities)
+        self.panics = np.zeros((24, len(self.activities)), dtype=np.int64)
+        self.counts = np.zeros((24, len(self.activities)), dtype=np.int64)
+
+    def activity_codes(self, activities):
+        # Map activity labels to column indices, growing the table for new
+        # labels; missing labels (None/NaN) map to -1
+        import pandas as pd
+
+        codes, uniques = pd.factorize(np.asarray(activities, dtype=object))
+        lookup = {a: i for i, a in enumerate(self.activities)}
+        new = [a for a in uniques if a not in lookup]
+        if new:
+            for a in new:
+                lookup[a] = len(self.activities)
+                self.activities.append(a)
+            pad = np.zeros((24, len(new)), dtype=np.int64)
+            self.panics = np.hstack([self.panics, pad])
+            self.counts = np.hstack([self.counts, pad])
+        mapping = np.array([lookup[a] for a in uniques] + [-1], dtype=np.int64)
+        return mapping[codes]
+
+    def add(self, hours, activity_codes, panic_attacks):
+        n_act = len(self.activities)
+        flat = np.asarray(hours, dtype=np.int64) * n_act + np.asarray(activity_codes, dtype=np.int64)
+        size = 24 * n_act
+        self.counts += np.bincount(flat, minlength=size).reshape(24, n_act)
+        self.panics += np.bincount(
+            flat, weights=np.asarray(panic_attacks, dtype=np.float64), minlength=size
+        ).astype(np.int64).reshape(24, n_act)
+
+    def add_frame(self, frame):
+        import pandas as pd
+
+        hours = pd.to_datetime(frame['timestamp']).dt.hour.to_numpy()
+        codes = self.activity_codes(frame['activity'])
+        known = codes >= 0
+        self.add(hours[known], codes[known], frame['panic_attack'].to_numpy()[known])
+
+    def merge(self, other):
+        codes = self.activity_codes(other.activities)
+        self.panics[:, codes] += other.panics
+        self.counts[:, codes] += other.counts
+        return self
+
+    @classmethod
+    def from_frame(cls, frame):
+        table = cls()
+        table.add_frame(frame)
+        return table
+
+    def hourly_rates(self):
+        # (hours, risk %) arrays for the hours that have readings
+        panics, counts = self.panics.sum(axis=1), self.counts.sum(axis=1)
+        hours = np.flatnonzero(counts)
+        return hours.astype(np.int32), panics[hours] / counts[hours] * 100
+
+    def activity_rates(self):
+        # (activity names, risk %) arrays for activities with readings, by name
+        panics, counts = self.panics.sum(axis=0), self.counts.sum(axis=0)
+        seen = np.flatnonzero(counts)
+        names = np.array(self.activities, dtype=object)[seen]
+        order = np.argsort(names.astype(str), kind='stable')
+        return names[order], (panics[seen] / counts[seen] * 100)[order]
+
+    def hourly_risk(self):
+        import pandas as pd
+
+        hours, risk = self.hourly_rates()
+        return pd.Series(risk, index=pd.Index(hours, name='hour'), name='panic_attack')
+
+    def activity_risk(self):
+        import pandas as pd
+
+        names, risk = self.activity_rates()
+        return pd.Series(risk, index=pd.Index(names, name='activity'), name='panic_attack')
+
+
+def aggregate_csv(path, chunksize=1_000_000):
+    # Streams the CSV so peak memory is bounded by chunksize, not file size
+    import pandas as pd
+
+    header = pd.read_csv(path, nrows=0).columns
+    missing = [col for col in EXPECTED_COLUMNS if col not in header]
+    if missing:
+        raise ValueError(f"CSV missing required columns: {missing}")
+    table = RiskTable()
+    for chunk in pd.read_csv(path, usecols=['timestamp', 'panic_attack', 'activity'], chunksize=chunksize):
+        table.add_frame(chunk)
+    return table
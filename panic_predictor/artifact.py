@@ -0,0 +1,178 @@
+# panic_predictor/artifact.py
+# Versioned model artifact: the flattened forest as plain .npy files plus a
+# small JSON manifest. Loading memory-maps the arrays read-only, so it takes
+# milliseconds, needs only NumPy, and every process that loads the same
+# artifact shares one copy of the pages through the OS page cache.
+# Array files are named by content hash and never rewritten in place; a
+# re-export writes new files and then swaps the manifest, so processes that
+# still have the old arrays mapped are unaffected.
+import glob
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .features import FEATURES
+from .forest import FlatForest
+
+ARTIFACT_FORMAT = 'panic-flat-forest'
+ARTIFACT_VERSION = 1
+MANIFEST = 'manifest.json'
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# --- Export ---
+def export_artifact(forest, path, scaler_mean=None, scaler_scale=None, model_version=None, source=None):
+    # scaler_mean/scaler_scale are recorded for consumers that build their own
+    # features; the forest itself already has the scaler folded in
+    os.makedirs(path, exist_ok=True)
+    previous = _referenced_files(path)
+    arrays = {}
+    for name, array in forest.arrays().items():
+        tmp = os.path.join(path, f'.{name}.{os.getpid()}.tmp.npy')
+        np.save(tmp, np.ascontiguousarray(array))
+        digest = file_sha256(tmp)
+        filename = f'{name}-{digest[:16]}.npy'
+        os.replace(tmp, os.path.join(path, filename))
+        arrays[name] = {
+            'file': filename,
+            'dtype': np.asarray(array).dtype.str,
+            'shape': list(np.shape(array)),
+            'sha256': digest,
+        }
+    manifest = {
+        'format': ARTIFACT_FORMAT,
+        'format_version': ARTIFACT_VERSION,
+        'model_version': model_version or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ'),
+        'created': datetime.now(timezone.utc).isoformat(),
+        'features': FEATURES,
+        'depth': forest.depth,
+        'n_features': forest.n_features,
+        'n_trees': forest.n_trees,
+        'scaler_folded': forest.input_mean is None,
+        'scaler': None if scaler_mean is None else {
+            'mean': np.asarray(scaler_mean, dtype=np.float64).tolist(),
+            'scale': np.asarray(scaler_scale, dtype=np.float64).tolist(),
+        },
+        'source': source or {},
+        'arrays': arrays,
+    }
+    # The manifest goes last and atomically, so a half-written artifact never loads
+    tmp = os.path.join(path, MANIFEST + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(path, MANIFEST))
+    # Arrays of the previous export are kept for readers that loaded its
+    # manifest a moment ago; anything older goes
+    keep = previous | {spec['file'] for spec in arrays.values()}
+    for stale in glob.glob(os.path.join(path, '*.npy')):
+        if os.path.basename(stale) not in keep:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    return manifest
+
+
+def _referenced_files(path):
+    try:
+        with open(os.path.join(path, MANIFEST)) as f:
+            return {spec['file'] for spec in json.load(f).get('arrays', {}).values()}
+    except (FileNotFoundError, ValueError):
+        return set()
+
+
+def export_from_pickles(model_path, scaler_path, path, model_version=None):
+    import joblib
+    from .features import scaler_params
+
+    model = joblib.load(model_path)
+    scaler = joblib.load(scaler_path)
+    mean, scale = scaler_params(scaler)
+    forest = FlatForest.from_sklearn(model, scaler)
+    source = {'model': os.path.basename(model_path), 'model_sha256': file_sha256(model_path),
+              'scaler': os.path.basename(scaler_path), 'scaler_sha256': file_sha256(scaler_path)}
+    return export_artifact(forest, path, mean, scale, model_version, source)
+
+
+# --- Load ---
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != ARTIFACT_FORMAT or manifest.get('format_version') != ARTIFACT_VERSION:
+        raise ValueError(
+            f"Unsupported model artifact {manifest.get('format')} v{manifest.get('format_version')} in {path}"
+        )
+    return manifest
+
+
+def load_artifact(path, mmap=True, verify=False):
+    manifest = read_manifest(path)
+    arrays = {}
+    for name, spec in manifest['arrays'].items():
+        file_path = os.path.join(path, spec['file'])
+        if verify and file_sha256(file_path) != spec['sha256']:
+            raise ValueError(f"Checksum mismatch for {file_path}")
+        array = np.load(file_path, mmap_mode='r' if mmap else None, allow_pickle=False)
+        # A plain ndarray view keeps the mapping but skips np.memmap's
+        # per-operation subclass overhead in the traversal loop
+        arrays[name] = array.view(np.ndarray) if mmap else array
+    return forest_from_arrays(arrays, manifest), manifest
+
+
+def forest_from_arrays(arrays, manifest):
+    return FlatForest(
+        arrays['children'], arrays['feature'], arrays['threshold'], arrays['value'], arrays['roots'],
+        manifest['depth'], manifest['n_features'], arrays['classes'],
+        arrays.get('input_mean'), arrays.get('input_scale')
+    )
+
+
+def is_current(path, model_path=None, scaler_path=None):
+    # An artifact is stale when the model or the scaler it was exported from
+    # has changed; the scaler is folded into the thresholds, so both count
+    try:
+        manifest = read_manifest(path)
+    except (FileNotFoundError, ValueError):
+        return False
+    source = manifest.get('source', {})
+    for key, source_path in (('model_sha256', model_path), ('scaler_sha256', scaler_path)):
+        if source_path is not None and os.path.exists(source_path):
+            if source.get(key) != file_sha256(source_path):
+                return False
+    return True
+
+
+def load_or_export(path, model_path='panic_attack_rf_model.pkl', scaler_path='scaler.pkl'):
+    # Fast path: mmap the artifact. Slow path (first run, or the pickle was
+    # replaced): unpickle once with joblib/sklearn and write the artifact.
+    if not is_current(path, model_path, scaler_path):
+        export_from_pickles(model_path, scaler_path, path)
+    return load_artifact(path)
+
+
+# --- Command Line ---
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export the pickled forest and scaler as a model artifact")
+    parser.add_argument('--model', default='panic_attack_rf_model.pkl')
+    parser.add_argument('--scaler', default='scaler.pkl')
+    parser.add_argument('--out', default='panic_attack_model')
+    parser.add_argument('--model-version')
+    args = parser.parse_args(argv)
+    manifest = export_from_pickles(args.model, args.scaler, args.out, args.model_version)
+    print(f"Wrote {args.out} (model_version {manifest['model_version']}, {manifest['n_trees']} trees)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# panic_predictor/attribution.py
+import numpy as np
+
+UNKNOWN = -1
+
+
+# --- Activity Attribution ---
+class ActivityAttributor:
+    # Array-backed "likely cause" lookup, built once per data refresh from a
+    # RiskTable. A supplied activity tag wins; otherwise the cause is the
+    # activity with the highest panic rate at that hour of day, smoothed
+    # towards the activity's overall rate so sparse hours stay sensible.
+
+    def __init__(self, risk_table, prior_strength=10.0, seed=None):
+        self.activities = np.array(risk_table.activities, dtype=object)
+        self._codes = {a: i for i, a in enumerate(risk_table.activities)}
+        panics = risk_table.panics.astype(np.float64)
+        counts = risk_table.counts.astype(np.float64)
+        overall = np.divide(panics.sum(axis=0), counts.sum(axis=0), out=np.zeros(panics.shape[1]),
+                            where=counts.sum(axis=0) > 0)
+        self.activity_risk = overall * 100
+        smoothed = (panics + prior_strength * overall) / (counts + prior_strength)
+        self.hour_risk = smoothed * 100  # (24, n_activities)
+        self.by_hour = smoothed.argmax(axis=1) if len(self.activities) else np.full(24, UNKNOWN)
+        # Hour-conditional share of panics, for seeded simulation draws
+        weights = panics + (panics.sum(axis=1, keepdims=True) == 0) * overall
+        totals = weights.sum(axis=1, keepdims=True)
+        self.hour_weights = np.divide(weights, totals, out=np.zeros_like(weights), where=totals > 0)
+        self._rng = np.random.default_rng(seed)
+
+    def seed(self, seed):
+        self._rng = np.random.default_rng(seed)
+
+    def codes(self, tags):
+        # Activity labels (or None) to codes; unknown labels map to UNKNOWN
+        return np.fromiter((self._codes.get(tag, UNKNOWN) for tag in tags), dtype=np.int64, count=len(tags))
+
+    def attribute(self, hours, codes=None):
+        hours = np.asarray(hours, dtype=np.int64)
+        inferred = self.by_hour[hours]
+        if codes is None:
+            return inferred
+        codes = np.asarray(codes, dtype=np.int64)
+        return np.where(codes >= 0, codes, inferred)
+
+    def sample(self, hours):
+        # Draws from each hour's panic-weighted activity mix; reproducible via seed
+        hours = np.asarray(hours, dtype=np.int64)
+        cumulative = self.hour_weights.cumsum(axis=1)[hours]
+        draws = self._rng.random(len(hours))[:, None]
+        return np.minimum((draws > cumulative).sum(axis=1), len(self.activities) - 1)
+
+    def names(self, codes):
+        codes = np.asarray(codes, dtype=np.int64)
+        names = np.full(len(codes), None, dtype=object)
+        known = codes >= 0
+        names[known] = self.activities[codes[known]]
+        return names
+
+    def likely_cause(self, hour, tag=None):
+        code = self.attribute([hour], self.codes([tag]))[0]
+        return self.activities[code] if code >= 0 else None
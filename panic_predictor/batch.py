@@ -0,0 +1,123 @@
+# panic_predictor/batch.py
+# Offline batch scoring / backtesting over historical CSVs.
+#   python -m panic_predictor.batch panic_attack_data.csv more.csv --out-dir scores --jobs 4
+# Each file is one wearer's stream. Features use the same 10-sample rolling
+# window as the app, computed with vectorized windows chunk by chunk, and every
+# chunk is scored in one call. Files are spread over worker processes.
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .features import FEATURES, WINDOW, rolling_features
+
+DEFAULT_THRESHOLD = 0.3
+
+_forest = None
+
+
+def _load_forest(artifact, model_path, scaler_path):
+    global _forest
+    if _forest is None:
+        from .artifact import load_or_export
+        _forest, _ = load_or_export(artifact, model_path, scaler_path)
+    return _forest
+
+
+def build_features(chunk, carry=None):
+    timestamps = pd.to_datetime(chunk['timestamp'])
+    heart_rate = chunk['heart_rate'].to_numpy(dtype=np.float64)
+    mean, std, change = rolling_features(heart_rate, WINDOW, carry)
+    X = np.column_stack([
+        heart_rate, timestamps.dt.hour.to_numpy(), timestamps.dt.minute.to_numpy(), mean, std, change
+    ])
+    return X
+
+
+def score_file(path, out_dir, threshold=DEFAULT_THRESHOLD, chunksize=500_000, artifact='panic_attack_model',
+               model_path='panic_attack_rf_model.pkl', scaler_path='scaler.pkl'):
+    forest = _load_forest(artifact, model_path, scaler_path)
+    start = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    name = os.path.splitext(os.path.basename(path))[0]
+    out_path = os.path.join(out_dir, f'{name}_scores.csv')
+
+    header = pd.read_csv(path, nrows=0).columns
+    labelled = 'panic_attack' in header
+    usecols = ['timestamp', 'heart_rate'] + (['panic_attack'] if labelled else [])
+    carry = np.empty(0)
+    rows = tp = fp = fn = 0
+    for i, chunk in enumerate(pd.read_csv(path, usecols=usecols, chunksize=chunksize)):
+        X = build_features(chunk, carry)
+        carry = np.concatenate([carry, X[:, 0]])[-(WINDOW - 1):]
+        proba = forest.predict_proba(X)[:, 1]
+        prediction = (proba >= threshold).astype(np.int8)
+        out = pd.DataFrame({'timestamp': chunk['timestamp'], 'heart_rate': X[:, 0]})
+        for j, feature in enumerate(FEATURES[3:], start=3):
+            out[feature] = X[:, j]
+        out['probability'] = proba
+        out['prediction'] = prediction
+        if labelled:
+            label = chunk['panic_attack'].to_numpy() > 0
+            out['panic_attack'] = label.astype(np.int8)
+            tp += int((prediction & label).sum())
+            fp += int((prediction & ~label).sum())
+            fn += int((~prediction.astype(bool) & label).sum())
+        out.to_csv(out_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+        rows += len(chunk)
+
+    summary = {'file': path, 'output': out_path, 'rows': rows, 'threshold': threshold,
+               'seconds': round(time.perf_counter() - start, 3)}
+    if labelled:
+        summary.update({
+            'true_positives': tp, 'false_positives': fp, 'false_negatives': fn,
+            'precision': tp / (tp + fp) if tp + fp else 0.0,
+            'recall': tp / (tp + fn) if tp + fn else 0.0,
+        })
+    return summary
+
+
+def score_files(paths, out_dir, jobs=None, **kwargs):
+    jobs = min(jobs or os.cpu_count() or 1, len(paths))
+    if jobs <= 1:
+        return [score_file(path, out_dir, **kwargs) for path in paths]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(score_file, path, out_dir, **kwargs) for path in paths]
+        return [future.result() for future in futures]
+
+
+# --- Command Line ---
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Score historical heart-rate CSVs in batch")
+    parser.add_argument('paths', nargs='+', help="CSV files with timestamp, heart_rate[, panic_attack]")
+    parser.add_argument('--out-dir', default='scores')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--chunksize', type=int, default=500_000)
+    parser.add_argument('--jobs', type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument('--artifact', default='panic_attack_model')
+    parser.add_argument('--model', default='panic_attack_rf_model.pkl')
+    parser.add_argument('--scaler', default='scaler.pkl')
+    args = parser.parse_args(argv)
+
+    # Export the artifact once up front rather than racing in every worker
+    _load_forest(args.artifact, args.model, args.scaler)
+    summaries = score_files(
+        args.paths, args.out_dir, args.jobs, threshold=args.threshold, chunksize=args.chunksize,
+        artifact=args.artifact, model_path=args.model, scaler_path=args.scaler
+    )
+    for summary in summaries:
+        line = f"{summary['file']}: {summary['rows']:,} rows in {summary['seconds']:.2f}s"
+        if 'precision' in summary:
+            line += f" | precision {summary['precision']:.3f} recall {summary['recall']:.3f}"
+        print(line)
+    with open(os.path.join(args.out_dir, 'summary.json'), 'w') as f:
+        json.dump(summaries, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
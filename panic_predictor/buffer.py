@@ -0,0 +1,102 @@
+# panic_predictor/buffer.py
+import os
+
+import numpy as np
+
+RECORD_DTYPE = np.dtype([
+    ('seq', np.int64),
+    ('timestamp', np.int64),   # epoch milliseconds
+    ('hr', np.float32),
+    ('proba', np.float32),
+    ('hrv', np.float32),
+    ('activity', np.uint8),
+])
+NO_ACTIVITY = 255
+
+
+# --- Session Ring Buffer ---
+class SessionBuffer:
+    # Fixed-size ring of real-time readings in one NumPy record array. Every
+    # record is written twice, at i and i + capacity, so the newest `capacity`
+    # records are always one contiguous slice: view() is zero-copy and memory
+    # per session is exactly 2 * capacity * RECORD_DTYPE.itemsize bytes.
+    # Activities are stored as uint8 codes into a small per-buffer vocabulary.
+    # With `spill_path` every record is also appended to a flat file of the
+    # same dtype, which history() memory-maps for long look-backs.
+
+    def __init__(self, capacity=10, spill_path=None):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._data = np.zeros(2 * capacity, dtype=RECORD_DTYPE)
+        self._head = 0     # next write slot in [0, capacity)
+        self._size = 0
+        self.activities = []
+        self._activity_codes = {}
+        self.spill_path = spill_path
+        self._spill = open(spill_path, 'ab') if spill_path else None
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        return self._data.nbytes
+
+    def activity_code(self, activity):
+        if activity is None:
+            return NO_ACTIVITY
+        code = self._activity_codes.get(activity)
+        if code is None:
+            if len(self.activities) >= NO_ACTIVITY:
+                raise ValueError("too many distinct activities for a uint8 code")
+            code = self._activity_codes[activity] = len(self.activities)
+            self.activities.append(activity)
+        return code
+
+    def append(self, seq, timestamp_ms, hr, proba, hrv, activity=None):
+        record = (seq, timestamp_ms, hr, proba, hrv, self.activity_code(activity))
+        head = self._head
+        self._data[head] = record
+        self._data[head + self.capacity] = record
+        self._head = (head + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        if self._spill is not None:
+            self._data[head:head + 1].tofile(self._spill)
+
+    def view(self):
+        # Oldest-to-newest records as a view into the ring. It is only valid
+        # until the next append; copy it if it has to outlive that.
+        end = self._head + self.capacity
+        return self._data[end - self._size:end]
+
+    def since(self, seq):
+        # Records with a sequence number above `seq`, still zero-copy
+        records = self.view()
+        return records[np.searchsorted(records['seq'], seq, side='right'):]
+
+    def last(self):
+        return self._data[self._head + self.capacity - 1] if self._size else None
+
+    def clear(self):
+        # Empties the ring; spilled history is kept
+        self._head = 0
+        self._size = 0
+
+    def names(self, codes):
+        lookup = np.array(self.activities + [None] * (NO_ACTIVITY + 1 - len(self.activities)), dtype=object)
+        return lookup[codes]
+
+    def history(self):
+        # Every spilled record, memory-mapped read-only
+        if self._spill is None:
+            return self.view()
+        self._spill.flush()
+        if os.path.getsize(self.spill_path) == 0:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        return np.memmap(self.spill_path, dtype=RECORD_DTYPE, mode='r')
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
@@ -0,0 +1,214 @@
+# panic_predictor/charts.py
+import os
+from datetime import datetime
+from functools import lru_cache
+
+import plotly.graph_objects as go
+
+from .metrics import timed
+
+RISK_COLOR = '#FF6B6B'
+SAFE_COLOR = '#4CAF50'
+COMPONENT_PATH = os.path.join(os.path.dirname(__file__), 'components', 'live_charts')
+
+BASE_LAYOUT = dict(
+    plot_bgcolor='rgba(255, 255, 255, 0.9)',
+    paper_bgcolor='rgba(0, 0, 0, 0)',
+    font=dict(color='#1A2E44'),
+    height=300,
+    transition={'duration': 600, 'easing': 'cubic-in-out'}
+)
+TIME_AXIS = dict(title="Time", type='date', tickformat='%H:%M:%S')
+
+
+# --- Figure Builders ---
+# x values are datetimes so sub-second readings do not collide on the axis
+
+def hr_figure(x=(), hr_data=()):
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=list(x),
+        y=list(hr_data),
+        mode='lines+markers',
+        name='Heart Rate',
+        line=dict(color='#6B9EFF', width=4),
+        marker=dict(size=12, color='#3F6DAA', line=dict(width=2, color='#1A2E44')),
+        opacity=0.8,
+        hoverinfo='y+text',
+        text=hr_text(hr_data)
+    ))
+    fig.update_layout(title="Heart Rate (BPM)", xaxis=TIME_AXIS, yaxis_title="BPM", **BASE_LAYOUT)
+    return fig
+
+
+def hrv_figure(x=(), hrv_data=()):
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=list(x),
+        y=list(hrv_data),
+        name='HRV',
+        marker_color='#5A89C2',
+        opacity=0.85,
+        hoverinfo='y+text',
+        text=hrv_text(hrv_data)
+    ))
+    fig.update_layout(title="Heart Rate Variability (Std Dev)", xaxis=TIME_AXIS, yaxis_title="HRV", **BASE_LAYOUT)
+    return fig
+
+
+def radial_figure(prediction_proba=0.0, prediction=0):
+    fig = go.Figure()
+    fig.add_trace(go.Barpolar(
+        r=[prediction_proba * 100],
+        theta=[0],
+        width=[360],
+        marker=dict(
+            color=[RISK_COLOR if prediction else SAFE_COLOR],
+            line=dict(color="#1A2E44", width=2)
+        ),
+        opacity=0.85,
+    ))
+    fig.update_layout(
+        title="Panic Risk (%)",
+        polar=dict(
+            radialaxis=dict(range=[0, 100], showticklabels=False),
+            angularaxis=dict(showticklabels=False)
+        ),
+        height=300,
+        showlegend=False,
+        transition={'duration': 600, 'easing': 'cubic-in-out'}
+    )
+    return fig
+
+
+def proba_trend_figure(x=(), proba_data=(), activity_data=(), prediction=0):
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=list(x),
+        y=list(proba_data),
+        mode='lines+markers',
+        name='Probability',
+        line=dict(color=RISK_COLOR if prediction else SAFE_COLOR, width=3),
+        marker=dict(size=10, color='#1A2E44'),
+        opacity=0.8,
+        hoverinfo='y+text',
+        text=proba_text(proba_data, activity_data)
+    ))
+    fig.update_layout(title="Panic Probability Trend (%)", xaxis=TIME_AXIS, yaxis_title="Probability", **BASE_LAYOUT)
+    return fig
+
+
+def hr_text(hr_data):
+    return [f"{hr:.1f} BPM" for hr in hr_data]
+
+
+def hrv_text(hrv_data):
+    return [f"{hrv:.2f}" for hrv in hrv_data]
+
+
+def proba_text(proba_data, activity_data):
+    return [f"{p:.1f}% ({act})" for p, act in zip(proba_data, activity_data)]
+
+
+@timed('chart')
+def build_realtime_figures(data, threshold):
+    # Full rebuild of the four real-time figures from a Monitor snapshot
+    x = [datetime.fromtimestamp(t / 1000) for t in data['timestamps']]
+    proba_data = [p * 100 for p in data['proba']]
+    prediction_proba = float(data['proba'][-1]) if len(data['proba']) else 0.0
+    prediction = 1 if prediction_proba >= threshold else 0
+    return (
+        hr_figure(x, data['hr']),
+        hrv_figure(x, data['hrv']),
+        radial_figure(prediction_proba, prediction),
+        proba_trend_figure(x, proba_data, data['activity'], prediction),
+    )
+
+
+@lru_cache(maxsize=1)
+def realtime_templates():
+    # Styled, empty figures serialized once per process
+    return [fig.to_json() for fig in (hr_figure(), hrv_figure(), radial_figure(), proba_trend_figure())]
+
+
+# --- Incremental Updates ---
+class LiveCharts:
+    # Per-session sender for the live_charts component. The first payload (and
+    # any after the frontend reports a gap or the monitor is cleared) carries
+    # the templates plus the buffered points; every other payload carries only
+    # the readings appended since the last one, so its size stays flat.
+
+    def __init__(self):
+        self.sent_seq = None
+        self.epoch = None
+        self.handled_request = None
+
+    @timed('chart')
+    def payload(self, monitor, ack, threshold):
+        request = ack.get('request') if ack else None
+        full = (
+            self.sent_seq is None
+            or self.epoch != monitor.epoch
+            or (request is not None and request != self.handled_request)
+        )
+        data = monitor.snapshot(since=None if full else self.sent_seq)
+        payload = {'capacity': monitor.capacity, 'base': -1 if full else self.sent_seq}
+        if full:
+            payload['templates'] = realtime_templates()
+            payload['plotlyjs'] = _plotlyjs_url()
+            self.handled_request = request
+            self.epoch = monitor.epoch
+        if len(data['seq']):
+            hr_data = data['hr'].tolist()
+            hrv_data = data['hrv'].tolist()
+            proba_data = (data['proba'] * 100).tolist()
+            prediction_proba = float(data['proba'][-1])
+            payload['points'] = {
+                'seq': int(data['seq'][-1]),
+                'x': data['timestamps'].tolist(),
+                'hr': hr_data,
+                'hr_text': hr_text(hr_data),
+                'hrv': hrv_data,
+                'hrv_text': hrv_text(hrv_data),
+                'proba': proba_data,
+                'proba_text': proba_text(proba_data, data['activity']),
+            }
+            payload['latest'] = {
+                'proba': prediction_proba * 100,
+                'color': RISK_COLOR if prediction_proba >= threshold else SAFE_COLOR,
+            }
+            self.sent_seq = int(data['seq'][-1])
+        elif full:
+            self.sent_seq = monitor.seq
+        payload['seq'] = self.sent_seq
+        return payload
+
+
+@lru_cache(maxsize=1)
+def _plotlyjs_url():
+    # The frontend loads plotly.js from the component directory (no CDN, so the
+    # dashboard works offline); the copy comes from the installed plotly
+    # package and is named by version so an upgrade never serves a stale file.
+    # The URL is relative to the component's index.html.
+    import shutil
+    import plotly
+    from plotly.offline import get_plotlyjs_version
+    name = f"plotly-{get_plotlyjs_version()}.min.js"
+    target = os.path.join(COMPONENT_PATH, name)
+    if not os.path.exists(target):
+        source = os.path.join(os.path.dirname(plotly.__file__), 'package_data', 'plotly.min.js')
+        tmp = f"{target}.{os.getpid()}.tmp"
+        shutil.copyfile(source, tmp)
+        os.replace(tmp, target)
+    return name
+
+
+@lru_cache(maxsize=1)
+def _component():
+    import streamlit.components.v1 as components
+    return components.declare_component('live_charts', path=COMPONENT_PATH)
+
+
+def live_charts(payload, key):
+    # Returns the frontend's last ack, e.g. {'request': n} when it needs a full resend
+    return _component()(payload=payload, key=key, default=None)
@@ -0,0 +1,175 @@
+# panic_predictor/engine.py
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from .features import FEATURES, WINDOW, RollingWindow, hour_minute, scale_features, scaler_params
+from .metrics import inc, timer
+
+
+# --- Batched Inference ---
+class InferenceEngine:
+    # Scores readings from many patients with one scale + predict_proba call.
+    # Rolling history is kept per patient in a 10-sample RollingWindow, the
+    # features the model was trained on. scaler=None means the model takes raw
+    # features, e.g. a FlatForest with the scaler folded in. With a
+    # ModelRegistry, each patient is scored by the model assigned to them.
+
+    def __init__(self, model, scaler, window=WINDOW, registry=None):
+        self.model = model
+        self.registry = registry
+        self.window = window
+        self.mean, self.scale = scaler_params(scaler) if scaler is not None else (None, None)
+        self.histories = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_files(cls, model_path='panic_attack_rf_model.pkl', scaler_path='scaler.pkl', **kwargs):
+        import joblib
+        return cls(joblib.load(model_path), joblib.load(scaler_path), **kwargs)
+
+    @classmethod
+    def from_artifact(cls, path, **kwargs):
+        from .artifact import load_artifact
+        forest, _ = load_artifact(path)
+        return cls(forest, None, **kwargs)
+
+    @classmethod
+    def from_registry(cls, registry, **kwargs):
+        return cls(None, None, registry=registry, **kwargs)
+
+    def build_features(self, patient_ids, heart_rates, timestamps=None):
+        with timer('features'):
+            return self._build_features(patient_ids, heart_rates, timestamps)
+
+    def _build_features(self, patient_ids, heart_rates, timestamps):
+        heart_rates = np.asarray(heart_rates, dtype=np.float64)
+        n = len(heart_rates)
+        if timestamps is None:
+            timestamps = np.full(n, time.time())
+        X = np.empty((n, len(FEATURES)), dtype=np.float64)
+        X[:, 0] = heart_rates
+        X[:, 1], X[:, 2] = hour_minute(timestamps)
+
+        # Readings are applied in order, so a patient may appear several times
+        with self._lock:
+            for i, (pid, hr) in enumerate(zip(patient_ids, heart_rates.tolist())):
+                history = self.histories.get(pid)
+                if history is None:
+                    history = self.histories[pid] = RollingWindow(self.window)
+                history.push(hr)
+                X[i, 3] = history.mean
+                X[i, 4] = history.std
+                X[i, 5] = history.change
+        return X
+
+    def predict_features(self, X, patient_id=None):
+        if len(X) == 0:
+            return np.empty(0)
+        inc('readings', len(X))
+        if self.mean is not None:
+            with timer('scale'):
+                X = scale_features(X, self.mean, self.scale)
+        model = self.model if self.registry is None else self.registry.get(patient_id).forest
+        with timer('predict'):
+            return model.predict_proba(X)[:, 1]
+
+    def predict_patients(self, patient_ids, X):
+        # One predict_proba call per distinct model among the patients
+        groups = {}
+        for i, pid in enumerate(patient_ids):
+            model = self.registry.get(pid)
+            groups.setdefault(model.name, (model, []))[1].append(i)
+        if len(groups) == 1:
+            return self.predict_features(X, patient_ids[0])
+        inc('readings', len(X))
+        proba = np.empty(len(X))
+        with timer('predict'):
+            for model, rows in groups.values():
+                proba[rows] = model.forest.predict_proba(X[rows])[:, 1]
+        return proba
+
+    def score(self, patient_ids, heart_rates, timestamps=None):
+        X = self.build_features(patient_ids, heart_rates, timestamps)
+        if self.registry is None or len(X) == 0:
+            return self.predict_features(X)
+        return self.predict_patients(list(patient_ids), X)
+
+    def reset(self, patient_id=None):
+        with self._lock:
+            if patient_id is None:
+                self.histories.clear()
+            else:
+                self.histories.pop(patient_id, None)
+
+
+# --- Micro-batching ---
+class MicroBatcher:
+    # Collects single readings for up to max_delay_ms (or max_batch readings)
+    # and scores them together on a background thread.
+
+    def __init__(self, engine, max_delay_ms=20, max_batch=4096):
+        self.engine = engine
+        self.max_delay = max_delay_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, patient_id, heart_rate, timestamp=None):
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        future = Future()
+        self._queue.put((patient_id, heart_rate, time.time() if timestamp is None else timestamp, future))
+        return future
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            stop = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+            if stop:
+                return
+
+    def _flush(self, batch):
+        patient_ids, heart_rates, timestamps, futures = zip(*batch)
+        try:
+            proba = self.engine.score(patient_ids, heart_rates, timestamps)
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        for future, p in zip(futures, proba.tolist()):
+            future.set_result(p)
@@ -0,0 +1,169 @@
+# panic_predictor/features.py
+import math
+import time
+from array import array
+
+import numpy as np
+
+# Column order the scaler and the forest were fitted on
+FEATURES = ['heart_rate', 'hour', 'minute', 'hr_rolling_mean', 'hr_rolling_std', 'hr_change']
+WINDOW = 10
+
+
+# --- Scaling ---
+def scaler_params(scaler):
+    # StandardScaler leaves mean_/scale_ as None when with_mean/with_std is off
+    n = len(FEATURES)
+    mean = getattr(scaler, 'mean_', None)
+    scale = getattr(scaler, 'scale_', None)
+    mean = np.zeros(n) if mean is None else np.asarray(mean, dtype=np.float64)
+    scale = np.ones(n) if scale is None else np.asarray(scale, dtype=np.float64)
+    return mean, scale
+
+
+def scale_features(X, mean, scale):
+    # Same arithmetic as StandardScaler.transform, without the DataFrame round-trip
+    X = np.array(X, dtype=np.float64)
+    X -= mean
+    X /= scale
+    return X
+
+
+# --- Time of day ---
+# UTC offsets are whole quarter hours and change on quarter-hour instants, so
+# one localtime() per 15-minute bucket is exact, also across a DST change
+OFFSET_BUCKET = 900
+
+
+def utc_offsets(timestamps):
+    # Local UTC offset in seconds for each epoch second
+    ts = np.asarray(timestamps, dtype=np.float64)
+    if not ts.size:
+        return np.zeros(ts.shape, dtype=np.int64)
+    buckets = np.floor(ts / OFFSET_BUCKET).astype(np.int64)
+    first, last = int(buckets.min()), int(buckets.max())
+    if first == last:
+        return np.full(ts.shape, time.localtime(first * OFFSET_BUCKET).tm_gmtoff, dtype=np.int64)
+    unique, inverse = np.unique(buckets, return_inverse=True)
+    offsets = np.array([time.localtime(b * OFFSET_BUCKET).tm_gmtoff for b in unique.tolist()], dtype=np.int64)
+    return offsets[inverse].reshape(ts.shape)
+
+
+def hour_minute(timestamps):
+    # Local wall-clock hour/minute for epoch seconds, like datetime.now() in the app
+    ts = np.asarray(timestamps, dtype=np.float64)
+    seconds = np.floor(ts).astype(np.int64) + utc_offsets(ts)
+    return (seconds // 3600) % 24, (seconds // 60) % 60
+
+
+def feature_row(current_hr, history, timestamp=None):
+    # One raw (unscaled) feature row, pushing current_hr into the RollingWindow
+    history.push(current_hr)
+    hour, minute = hour_minute([time.time() if timestamp is None else timestamp])
+    return np.array([[current_hr, hour[0], minute[0], history.mean, history.std, history.change]], dtype=np.float64)
+
+
+def rolling_features(heart_rates, window=WINDOW, carry=None):
+    # Vectorized hr_rolling_mean / hr_rolling_std / hr_change for a whole
+    # series, with the same semantics as pushing it through a RollingWindow.
+    # carry holds the readings just before this chunk so chunks join up.
+    hr = np.asarray(heart_rates, dtype=np.float64)
+    carry = np.empty(0) if carry is None else np.asarray(carry, dtype=np.float64)[-(window - 1):]
+    x = np.concatenate([carry, hr])
+    n, k = len(x), len(carry)
+    count = np.minimum(np.arange(1, n + 1), window)
+    total = np.zeros(n)
+    for lag in range(min(window, n)):
+        total[lag:] += x[:n - lag]
+    mean = total / count
+    # Two-pass variance over each window, as np.std does
+    squares = np.zeros(n)
+    for lag in range(min(window, n)):
+        d = x[:n - lag] - mean[lag:]
+        squares[lag:] += d * d
+    std = np.sqrt(squares / count)
+    change = np.zeros(n)
+    change[1:] = np.diff(x)
+    return mean[k:], std[k:], change[k:]
+
+
+# --- Rolling Window ---
+class RollingWindow:
+    # Fixed-size ring buffer with running mean and Welford-style M2, so each
+    # push updates hr_rolling_mean / hr_rolling_std / hr_change in O(1).
+    # Matches np.mean / np.std (ddof=0) over the last `size` readings.
+    __slots__ = ('size', '_buf', '_pos', '_count', '_mean', '_m2', '_last', '_previous', '_pushes')
+
+    # Re-derive mean/M2 from the buffer every so often to stop rounding drift
+    RESYNC_EVERY = 1024
+
+    def __init__(self, size=WINDOW):
+        self.size = size
+        self._buf = array('d', bytes(8 * size))
+        self.clear()
+
+    def clear(self):
+        self._pos = 0
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._last = 0.0
+        self._previous = 0.0
+        self._pushes = 0
+
+    def push(self, x):
+        x = float(x)
+        if self._count < self.size:
+            self._count += 1
+            delta = x - self._mean
+            self._mean += delta / self._count
+            self._m2 += delta * (x - self._mean)
+        else:
+            old = self._buf[self._pos]
+            mean = self._mean + (x - old) / self.size
+            self._m2 += (x - old) * (x - mean + old - self._mean)
+            self._mean = mean
+        self._buf[self._pos] = x
+        self._pos += 1
+        if self._pos == self.size:
+            self._pos = 0
+        self._previous = self._last if self._count > 1 else x
+        self._last = x
+        self._pushes += 1
+        if self._pushes >= self.RESYNC_EVERY:
+            self._resync()
+
+    def _resync(self):
+        self._pushes = 0
+        n = self._count
+        values = self._buf if n == self.size else self._buf[:n]
+        mean = math.fsum(values) / n
+        self._mean = mean
+        self._m2 = math.fsum((v - mean) * (v - mean) for v in values)
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def mean(self):
+        return self._mean
+
+    @property
+    def std(self):
+        if self._count < 2 or self._m2 <= 0.0:
+            return 0.0
+        return math.sqrt(self._m2 / self._count)
+
+    @property
+    def change(self):
+        return self._last - self._previous
+
+    @property
+    def last(self):
+        return self._last
+
+    def values(self):
+        # Oldest first, like the list history it replaces
+        if self._count < self.size:
+            return self._buf[:self._count].tolist()
+        return (self._buf[self._pos:] + self._buf[:self._pos]).tolist()
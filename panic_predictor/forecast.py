@@ -0,0 +1,391 @@
+# panic_predictor/forecast.py
+# Multi-horizon forecasting: P(panic within the next h minutes) for several
+# horizons at once. Every reading gets one feature vector, computed
+# incrementally per patient with StreamingFeatures or over a whole history
+# with window_features. A single multi-output Random Forest then predicts all
+# horizons from it, so an extra horizon costs one more output, not another
+# feature pass or model.
+#   python -m panic_predictor.forecast train panic_attack_data.csv --out panic_forecast.joblib
+#   python -m panic_predictor.forecast evaluate panic_attack_data.csv --model panic_forecast.joblib
+import math
+import threading
+import time
+from array import array
+
+import numpy as np
+
+from .features import utc_offsets
+
+HORIZONS = (5, 15, 30)        # minutes ahead
+WINDOWS = (10, 30, 60)        # readings
+RMSSD_WINDOWS = (10, 30)      # readings
+FORECAST_FEATURES = (
+    ['heart_rate']
+    + [f'hr_{stat}_{w}' for w in WINDOWS for stat in ('mean', 'std', 'slope')]
+    + [f'rmssd_{w}' for w in RMSSD_WINDOWS]
+    + ['hour_sin', 'hour_cos']
+)
+DEFAULT_THRESHOLD = 0.3
+
+
+def rr_interval_ms(heart_rates):
+    # Mean beat-to-beat interval implied by a BPM reading
+    return 60000.0 / np.maximum(np.asarray(heart_rates, dtype=np.float64), 1.0)
+
+
+def _time_of_day(fractional_hours):
+    angle = 2 * np.pi * np.asarray(fractional_hours, dtype=np.float64) / 24.0
+    return np.sin(angle), np.cos(angle)
+
+
+def _slope(n, s, t):
+    # Least-squares slope of values at positions 0..n-1, from S = sum(x) and
+    # T = sum(k * x); per reading
+    if n < 2:
+        return 0.0
+    sk = n * (n - 1) / 2.0
+    skk = (n - 1) * n * (2 * n - 1) / 6.0
+    return (n * t - sk * s) / (n * skk - sk * sk)
+
+
+# --- Offline (vectorized) features ---
+def _lag_sums(x, window, weights=False):
+    # Per-position sum over the last `window` values (fewer at the start) and,
+    # with weights=True, sum(lag * x) as well
+    n = len(x)
+    total = np.zeros(n)
+    lagged = np.zeros(n) if weights else None
+    for lag in range(min(window, n)):
+        total[lag:] += x[:n - lag]
+        if weights and lag:
+            lagged[lag:] += lag * x[:n - lag]
+    return total, lagged
+
+
+def window_features(heart_rates, fractional_hours):
+    # FORECAST_FEATURES for one stream, equal to pushing it through
+    # StreamingFeatures reading by reading
+    hr = np.asarray(heart_rates, dtype=np.float64)
+    n = len(hr)
+    X = np.empty((n, len(FORECAST_FEATURES)))
+    X[:, 0] = hr
+    col = 1
+    for w in WINDOWS:
+        count = np.minimum(np.arange(1, n + 1), w).astype(np.float64)
+        total, lagged = _lag_sums(hr, w, weights=True)
+        mean = total / count
+        squares = np.zeros(n)
+        for lag in range(min(w, n)):
+            d = hr[:n - lag] - mean[lag:]
+            squares[lag:] += d * d
+        # Position of x[t - lag] within its window is count - 1 - lag
+        t = (count - 1) * total - lagged
+        sk = count * (count - 1) / 2
+        skk = (count - 1) * count * (2 * count - 1) / 6
+        denom = count * skk - sk * sk
+        slope = np.divide(count * t - sk * total, denom, out=np.zeros(n), where=count >= 2)
+        X[:, col], X[:, col + 1], X[:, col + 2] = mean, np.sqrt(squares / count), slope
+        col += 3
+    rr = rr_interval_ms(hr)
+    sq_diff = np.zeros(n)
+    sq_diff[1:] = np.diff(rr) ** 2
+    for w in RMSSD_WINDOWS:
+        # A window of c readings holds c - 1 successive differences
+        total, _ = _lag_sums(sq_diff, w - 1)
+        diffs = np.minimum(np.arange(n), w - 1).astype(np.float64)
+        X[:, col] = np.sqrt(np.divide(total, diffs, out=np.zeros(n), where=diffs > 0))
+        col += 1
+    X[:, col], X[:, col + 1] = _time_of_day(fractional_hours)
+    return X
+
+
+def horizon_labels(timestamps_ns, panic_attacks, horizons=HORIZONS):
+    # y[i, j] = 1 if a panic is recorded in (t_i, t_i + horizons[j]] minutes.
+    # valid[i] is False where the longest horizon runs past the end of the data.
+    ts = np.asarray(timestamps_ns, dtype=np.int64)
+    panic = np.asarray(panic_attacks) > 0
+    cumulative = np.concatenate([[0], np.cumsum(panic)])
+    Y = np.empty((len(ts), len(horizons)), dtype=np.int8)
+    for j, h in enumerate(horizons):
+        end = np.searchsorted(ts, ts + int(h * 60e9), side='right')
+        Y[:, j] = (cumulative[end] - cumulative[np.arange(1, len(ts) + 1)]) > 0
+    valid = ts + int(max(horizons) * 60e9) <= ts[-1] if len(ts) else np.zeros(0, dtype=bool)
+    return Y, valid
+
+
+def frame_features(frame, horizons=HORIZONS):
+    # Features, labels and validity mask for a panic_attack_data.csv-style frame
+    import pandas as pd
+
+    timestamps = pd.to_datetime(frame['timestamp'])
+    hours = (timestamps.dt.hour + timestamps.dt.minute / 60 + timestamps.dt.second / 3600).to_numpy()
+    X = window_features(frame['heart_rate'].to_numpy(dtype=np.float64), hours)
+    if 'panic_attack' not in frame:
+        return X, None, None
+    Y, valid = horizon_labels(timestamps.to_numpy('datetime64[ns]').view(np.int64), frame['panic_attack'], horizons)
+    return X, Y, valid
+
+
+# --- Streaming features ---
+class StreamingFeatures:
+    # Incremental FORECAST_FEATURES for one stream. One ring of the last
+    # max(WINDOWS) readings (and squared RR differences) is shared by every
+    # window; each window keeps running sums S, Q and T = sum(position * x),
+    # so a push is O(number of windows). Sums are re-derived from the rings
+    # every RESYNC_EVERY pushes to stop rounding drift.
+    __slots__ = ('_size', '_hr', '_sq', '_pos', '_count', '_sums', '_rmssd', '_last_rr', '_pushes')
+
+    RESYNC_EVERY = 1024
+
+    def __init__(self):
+        self._size = max(WINDOWS + RMSSD_WINDOWS)
+        self._hr = array('d', bytes(8 * self._size))
+        self._sq = array('d', bytes(8 * self._size))
+        self._pos = 0
+        self._count = 0
+        self._sums = [[0.0, 0.0, 0.0] for _ in WINDOWS]   # S, Q, T per window
+        self._rmssd = [0.0 for _ in RMSSD_WINDOWS]        # sum of squared diffs
+        self._last_rr = None
+        self._pushes = 0
+
+    def _back(self, ring, k):
+        # Value pushed k readings ago (k=1 is the latest)
+        return ring[(self._pos - k) % self._size]
+
+    def push(self, heart_rate, fractional_hour):
+        x = float(heart_rate)
+        rr = 60000.0 / max(x, 1.0)
+        sq = 0.0 if self._last_rr is None else (rr - self._last_rr) ** 2
+        count = self._count + 1
+        for sums, w in zip(self._sums, WINDOWS):
+            if count <= w:
+                sums[2] += (count - 1) * x
+                sums[0] += x
+                sums[1] += x * x
+            else:
+                old = self._back(self._hr, w)
+                sums[2] += x * (w - 1) - (sums[0] - old)
+                sums[0] += x - old
+                sums[1] += x * x - old * old
+        for i, w in enumerate(RMSSD_WINDOWS):
+            self._rmssd[i] += sq
+            if count > w - 1 and count > 1:
+                # The difference leaving the window was pushed w - 1 readings ago
+                self._rmssd[i] -= self._back(self._sq, w - 1)
+        self._hr[self._pos] = x
+        self._sq[self._pos] = sq
+        self._pos = (self._pos + 1) % self._size
+        self._count = count
+        self._last_rr = rr
+        self._pushes += 1
+        if self._pushes >= self.RESYNC_EVERY:
+            self._resync()
+        return self.features(fractional_hour)
+
+    def _resync(self):
+        self._pushes = 0
+        for sums, w in zip(self._sums, WINDOWS):
+            n = min(self._count, w)
+            values = [self._back(self._hr, k) for k in range(n, 0, -1)]   # oldest first
+            sums[0] = math.fsum(values)
+            sums[1] = math.fsum(v * v for v in values)
+            sums[2] = math.fsum(k * v for k, v in enumerate(values))
+        for i, w in enumerate(RMSSD_WINDOWS):
+            n = min(self._count, w) - 1
+            self._rmssd[i] = math.fsum(self._back(self._sq, k) for k in range(1, n + 1)) if n > 0 else 0.0
+
+    def features(self, fractional_hour):
+        row = [self._back(self._hr, 1)]
+        for (s, q, t), w in zip(self._sums, WINDOWS):
+            n = min(self._count, w)
+            mean = s / n
+            # Two-pass-equivalent std; the running form can go slightly negative
+            variance = max(q / n - mean * mean, 0.0)
+            row += [mean, math.sqrt(variance), _slope(n, s, t)]
+        for total, w in zip(self._rmssd, RMSSD_WINDOWS):
+            diffs = min(self._count, w) - 1
+            row.append(math.sqrt(max(total, 0.0) / diffs) if diffs > 0 else 0.0)
+        angle = 2 * math.pi * fractional_hour / 24.0
+        row += [math.sin(angle), math.cos(angle)]
+        return row
+
+    def __len__(self):
+        return self._count
+
+
+# --- Model ---
+class ForecastModel:
+    # A multi-output RandomForestClassifier (one output per horizon) plus the
+    # horizons and feature layout it was trained with.
+
+    def __init__(self, forest, horizons=HORIZONS, features=FORECAST_FEATURES):
+        self.forest = forest
+        self.horizons = tuple(horizons)
+        self.features = list(features)
+
+    def predict_proba(self, X):
+        # (n, n_horizons) probabilities of a panic within each horizon
+        X = np.asarray(X, dtype=np.float64)
+        outputs = self.forest.predict_proba(X)
+        if len(self.horizons) == 1:
+            outputs = [outputs]
+        proba = np.zeros((len(X), len(self.horizons)))
+        for j, (p, classes) in enumerate(zip(outputs, self.forest.classes_ if len(self.horizons) > 1
+                                             else [self.forest.classes_])):
+            positive = np.flatnonzero(np.asarray(classes) == 1)
+            if positive.size:
+                proba[:, j] = p[:, positive[0]]
+        return proba
+
+    def save(self, path):
+        import joblib
+        joblib.dump({'forest': self.forest, 'horizons': self.horizons, 'features': self.features}, path)
+
+    @classmethod
+    def load(cls, path):
+        import joblib
+        state = joblib.load(path)
+        if state['features'] != FORECAST_FEATURES:
+            raise ValueError(f"{path} was trained with a different feature layout")
+        return cls(state['forest'], state['horizons'], state['features'])
+
+
+def train(frames, horizons=HORIZONS, n_estimators=100, max_depth=12, seed=42, n_jobs=None):
+    # Fits one multi-output forest on every frame (each frame one stream)
+    from sklearn.ensemble import RandomForestClassifier
+
+    X_parts, Y_parts = [], []
+    for frame in frames:
+        X, Y, valid = frame_features(frame, horizons)
+        X_parts.append(X[valid])
+        Y_parts.append(Y[valid])
+    X, Y = np.concatenate(X_parts), np.concatenate(Y_parts)
+    forest = RandomForestClassifier(
+        n_estimators=n_estimators, max_depth=max_depth, min_samples_leaf=5, class_weight='balanced',
+        random_state=seed, n_jobs=n_jobs,
+    )
+    forest.fit(X, Y if len(horizons) > 1 else Y[:, 0])
+    return ForecastModel(forest, horizons)
+
+
+def roc_auc(scores, labels):
+    # Rank-based (Mann-Whitney) AUC with average ranks for ties
+    labels = np.asarray(labels) > 0
+    positives = labels.sum()
+    negatives = len(labels) - positives
+    if positives == 0 or negatives == 0:
+        return float('nan')
+    order = np.argsort(scores, kind='mergesort')
+    sorted_scores = np.asarray(scores)[order]
+    ranks = np.empty(len(scores))
+    _, first, counts = np.unique(sorted_scores, return_index=True, return_counts=True)
+    ranks[order] = np.repeat(first + (counts + 1) / 2.0, counts)
+    return float((ranks[labels].sum() - positives * (positives + 1) / 2) / (positives * negatives))
+
+
+def evaluate(model, frame, threshold=DEFAULT_THRESHOLD):
+    # Per-horizon metrics over one labelled history
+    X, Y, valid = frame_features(frame, model.horizons)
+    X, Y = X[valid], Y[valid]
+    proba = model.predict_proba(X)
+    report = []
+    for j, h in enumerate(model.horizons):
+        y, p = Y[:, j] > 0, proba[:, j]
+        predicted = p >= threshold
+        tp = int((predicted & y).sum())
+        report.append({
+            'horizon_min': h,
+            'rows': int(len(y)),
+            'positive_rate': float(y.mean()) if len(y) else 0.0,
+            'auc': roc_auc(p, y),
+            'brier': float(np.mean((p - y) ** 2)) if len(y) else 0.0,
+            'precision': tp / int(predicted.sum()) if predicted.any() else 0.0,
+            'recall': tp / int(y.sum()) if y.any() else 0.0,
+        })
+    return report
+
+
+# --- Online scoring ---
+class Forecaster:
+    # Per-patient StreamingFeatures plus one ForecastModel call per batch
+
+    def __init__(self, model):
+        self.model = model
+        self.streams = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path):
+        return cls(ForecastModel.load(path))
+
+    @property
+    def horizons(self):
+        return self.model.horizons
+
+    def build_features(self, patient_ids, heart_rates, timestamps=None):
+        n = len(heart_rates)
+        ts = np.full(n, time.time()) if timestamps is None else np.asarray(timestamps, dtype=np.float64)
+        hours = ((ts + utc_offsets(ts)) % 86400) / 3600.0
+        rows = []
+        with self._lock:
+            for pid, hr, hour in zip(patient_ids, np.asarray(heart_rates, dtype=np.float64).tolist(), hours.tolist()):
+                stream = self.streams.get(pid)
+                if stream is None:
+                    stream = self.streams[pid] = StreamingFeatures()
+                rows.append(stream.push(hr, hour))
+        return np.array(rows, dtype=np.float64).reshape(n, len(FORECAST_FEATURES))
+
+    def score(self, patient_ids, heart_rates, timestamps=None):
+        # (n, n_horizons) probabilities
+        X = self.build_features(patient_ids, heart_rates, timestamps)
+        return self.model.predict_proba(X) if len(X) else np.empty((0, len(self.horizons)))
+
+    def reset(self, patient_id=None):
+        with self._lock:
+            if patient_id is None:
+                self.streams.clear()
+            else:
+                self.streams.pop(patient_id, None)
+
+
+# --- Command Line ---
+def main(argv=None):
+    import argparse
+    import json
+
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Train or evaluate the multi-horizon panic forecaster")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('train', help="train on the first part of each history, report on the rest")
+    p.add_argument('csv', nargs='+')
+    p.add_argument('--out', default='panic_forecast.joblib')
+    p.add_argument('--horizons', type=int, nargs='+', default=list(HORIZONS))
+    p.add_argument('--holdout', type=float, default=0.2, help="trailing fraction kept for evaluation")
+    p.add_argument('--trees', type=int, default=100)
+    p.add_argument('--jobs', type=int)
+    p = sub.add_parser('evaluate')
+    p.add_argument('csv', nargs='+')
+    p.add_argument('--model', default='panic_forecast.joblib')
+    p.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    frames = [pd.read_csv(path, usecols=['timestamp', 'heart_rate', 'panic_attack']) for path in args.csv]
+    for frame in frames:
+        frame['timestamp'] = pd.to_datetime(frame['timestamp'])
+    if args.command == 'train':
+        cut = [int(len(f) * (1 - args.holdout)) for f in frames]
+        start = time.perf_counter()
+        model = train([f.iloc[:c] for f, c in zip(frames, cut)], args.horizons, args.trees, n_jobs=args.jobs)
+        print(f"Trained on {sum(cut)} rows in {time.perf_counter() - start:.2f} s")
+        model.save(args.out)
+        holdout = [f.iloc[c:] for f, c in zip(frames, cut) if len(f) > c]
+    else:
+        model = ForecastModel.load(args.model)
+        holdout = frames
+    for frame in holdout:
+        print(json.dumps(evaluate(model, frame), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+# panic_predictor/forest.py
+# Flattened tree ensemble: every node of every tree in contiguous arrays,
+# evaluated for a whole batch at once with NumPy. Only needs NumPy at
+# prediction time; sklearn is only touched by from_sklearn().
+import numpy as np
+
+from .features import scaler_params
+
+
+class FlatForest:
+    # Nodes use doubled ids (2 * node): children[2 * node] holds the left
+    # child's doubled id and children[2 * node + 1] the right one, and
+    # feature/threshold are repeated per slot, so a traversal step is one add
+    # of the comparison result and one take. Leaves point back at themselves
+    # with an infinite threshold, so every sample takes exactly `depth` steps.
+
+    def __init__(self, children, feature, threshold, value, roots, depth, n_features, classes,
+                 input_mean=None, input_scale=None):
+        self.children = children
+        self.feature = feature
+        self.threshold = threshold
+        self.value = value  # (n_classes, n_nodes) leaf class probabilities
+        self.roots = roots  # doubled ids of the tree roots
+        self.depth = int(depth)
+        self.n_features = int(n_features)
+        self.classes = np.asarray(classes)
+        # Scaling applied before traversal when it was not folded into thresholds
+        self.input_mean = input_mean
+        self.input_scale = input_scale
+
+    @classmethod
+    def from_nodes(cls, feature, threshold, left, right, value, roots, depth, n_features, classes, **kwargs):
+        # Plain node arrays (value as (n_nodes, n_classes)) to the traversal layout
+        return cls(
+            (2 * np.column_stack([left, right]).ravel()).astype(np.intp),
+            np.repeat(np.asarray(feature, dtype=np.intp), 2),
+            np.repeat(np.asarray(threshold, dtype=np.float64), 2),
+            np.ascontiguousarray(np.asarray(value, dtype=np.float64).T),
+            (2 * np.asarray(roots)).astype(np.intp),
+            depth, n_features, classes, **kwargs
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature) // 2
+
+    @classmethod
+    def from_sklearn(cls, model, scaler=None, fold_scaler=True):
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        depth = 0
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            ids = np.arange(n, dtype=np.int32) + offset
+            leaf = tree.children_left == -1
+            features.append(np.where(leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(np.where(leaf, np.inf, tree.threshold))
+            lefts.append(np.where(leaf, ids, tree.children_left + offset).astype(np.int32))
+            rights.append(np.where(leaf, ids, tree.children_right + offset).astype(np.int32))
+            value = tree.value[:, 0, :]
+            values.append(value / value.sum(axis=1, keepdims=True))
+            roots.append(offset)
+            depth = max(depth, tree.max_depth)
+            offset += n
+
+        feature = np.concatenate(features)
+        threshold = np.concatenate(thresholds)
+        input_mean = input_scale = None
+        if scaler is not None:
+            mean, scale = scaler_params(scaler)
+            if fold_scaler:
+                threshold = fold_thresholds(threshold, mean[feature], scale[feature])
+            else:
+                input_mean, input_scale = mean, scale
+        return cls.from_nodes(
+            feature, threshold, np.concatenate(lefts), np.concatenate(rights),
+            np.concatenate(values), roots, depth, model.n_features_in_, model.classes_,
+            input_mean=input_mean, input_scale=input_scale
+        )
+
+    def _prepare(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"X has {X.shape[1]} features, but FlatForest expects {self.n_features}")
+        if self.input_mean is not None:
+            # sklearn's trees compare float32 inputs; match that when scaling here
+            X = ((X - self.input_mean) / self.input_scale).astype(np.float32)
+        return X
+
+    # Rows per traversal block, so the (rows x trees) work arrays stay in cache
+    BLOCK_ROWS = 512
+
+    def leaves(self, X):
+        X = self._prepare(X)
+        n = len(X)
+        out = np.empty((n, self.n_trees), dtype=np.intp)
+        for start in range(0, n, self.BLOCK_ROWS):
+            out[start:start + self.BLOCK_ROWS] = self._leaves_block(X[start:start + self.BLOCK_ROWS])
+        return out
+
+    def _leaves_block(self, X):
+        n = len(X)
+        flat = X.ravel()
+        base = (np.arange(n, dtype=np.intp) * self.n_features)[:, None]
+        node = np.broadcast_to(self.roots, (n, self.n_trees)).copy()
+        index = np.empty_like(node)
+        for _ in range(self.depth):
+            np.take(self.feature, node, out=index)
+            index += base
+            node += np.take(flat, index) > np.take(self.threshold, node)
+            np.take(self.children, node, out=node)
+        return node // 2
+
+    def predict_proba(self, X):
+        # Leaf values are summed block by block, so memory stays at one
+        # (BLOCK_ROWS x trees) leaf matrix however many rows are scored
+        X = self._prepare(X)
+        proba = np.empty((len(X), len(self.classes)))
+        for start in range(0, len(X), self.BLOCK_ROWS):
+            leaves = self._leaves_block(X[start:start + self.BLOCK_ROWS])
+            for c, column in enumerate(self.value):
+                np.take(column, leaves).sum(axis=1, out=proba[start:start + len(leaves), c])
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X):
+        return self.classes[self.predict_proba(X).argmax(axis=1)]
+
+    def arrays(self):
+        arrays = {
+            'children': self.children, 'feature': self.feature, 'threshold': self.threshold,
+            'value': self.value, 'roots': self.roots, 'classes': self.classes,
+        }
+        if self.input_mean is not None:
+            arrays['input_mean'] = self.input_mean
+            arrays['input_scale'] = self.input_scale
+        return arrays
+
+
+def _scaled32(x, mean, scale):
+    return ((x - mean) / scale).astype(np.float32)
+
+
+def fold_thresholds(threshold, mean, scale, iterations=80):
+    # sklearn tests float32((x - mean) / scale) <= t. That is monotone in x, so
+    # it holds exactly for x <= T for some raw threshold T near t * scale + mean.
+    # Bisect for T per node so raw inputs take the same branches bit for bit.
+    threshold = np.asarray(threshold, dtype=np.float64)
+    folded = threshold.copy()
+    split = np.isfinite(threshold)
+    t, mean, scale = threshold[split], mean[split], scale[split]
+    guess = t * scale + mean
+    width = (np.abs(guess) + np.abs(mean) + 1.0) * 1e-5
+    lo, hi = guess - width, guess + width
+    if not ((_scaled32(lo, mean, scale) <= t).all() and (_scaled32(hi, mean, scale) > t).all()):
+        raise ValueError("Could not bracket folded split thresholds")
+    for _ in range(iterations):
+        mid = lo + (hi - lo) / 2
+        below = _scaled32(mid, mean, scale) <= t
+        lo = np.where(below, mid, lo)
+        hi = np.where(below, hi, mid)
+    folded[split] = lo
+    return folded
@@ -0,0 +1,397 @@
+# panic_predictor/gateway.py
+# Headless gateway mode for edge boxes next to the ESP32s. Depends on NumPy
+# only: the model is the exported artifact (FlatForest with the scaler folded
+# in, memory-mapped), features come from the same per-device RollingWindow as
+# InferenceEngine, and alert state from AlertEngine. Results go
+# upstream as compact binary datagrams instead of JSON:
+#
+#   header  <2sBHI   magic b'PG', format version, record count, sequence
+#   record  29 bytes device (UTF-8, at most 16 bytes, NUL-padded), epoch ms (int64),
+#           heart rate (uint16, 0.1 BPM), risk (uint16, proba * 65535), flags
+#
+# Export the artifact once on a full install (python -m panic_predictor.artifact)
+# and copy panic_attack_model/ to the gateway, then install requirements-gateway.txt.
+#   python -m panic_predictor.gateway run --udp 9750 --upstream 10.0.0.2:9760
+#   python -m panic_predictor.gateway bench --budget-ms 2
+import json
+import socket
+import struct
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from .alerts import DEFAULT_RULES, AlertEngine
+from .artifact import load_artifact
+from .engine import InferenceEngine
+from .features import FEATURES
+from .ingest import Frame, parse_frame
+from .metrics import Histogram, rss_bytes
+
+MAGIC = b'PG'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<2sBHI')
+RESULT_DTYPE = np.dtype([('device', 'S16'), ('timestamp', '<i8'), ('heart_rate', '<u2'),
+                         ('risk', '<u2'), ('flags', 'u1')])
+# Device ids longer than this many UTF-8 bytes are rejected: truncating them
+# could merge two wearers or split a multi-byte character
+DEVICE_BYTES = RESULT_DTYPE['device'].itemsize
+# Keep datagrams under the IPv6 minimum MTU so they are never fragmented
+MAX_DATAGRAM = 1200
+RECORDS_PER_DATAGRAM = (MAX_DATAGRAM - HEADER.size) // RESULT_DTYPE.itemsize
+
+FLAG_SWITCH = 1     # joystick pressed on the wearer
+FLAG_HIGH = 2       # proba >= threshold for this reading
+FLAG_ALERT = 4      # patient is in an alert episode (AlertEngine state)
+
+# Modules the gateway must never pull in
+HEAVY_MODULES = ('pandas', 'sklearn', 'scipy', 'joblib', 'streamlit', 'plotly', 'matplotlib', 'tensorflow')
+
+
+# --- Wire Format ---
+def pack_results(results, sequence=0):
+    # Results array to a list of datagrams; sequence numbers the datagrams
+    datagrams = []
+    for start in range(0, len(results), RECORDS_PER_DATAGRAM):
+        chunk = results[start:start + RECORDS_PER_DATAGRAM]
+        datagrams.append(HEADER.pack(MAGIC, FORMAT_VERSION, len(chunk), sequence) + chunk.tobytes())
+        sequence = (sequence + 1) & 0xFFFFFFFF
+    return datagrams
+
+
+def unpack_results(data):
+    # One datagram back to (sequence, results array)
+    magic, version, count, sequence = HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"Not a gateway datagram (magic {magic!r}, version {version})")
+    end = HEADER.size + count * RESULT_DTYPE.itemsize
+    if len(data) < end:
+        raise ValueError(f"Truncated datagram: {len(data)} bytes for {count} records")
+    return sequence, np.frombuffer(data, RESULT_DTYPE, count, HEADER.size)
+
+
+def iter_results(data):
+    # Walks concatenated datagrams, e.g. a file written by FileUpstream
+    offset = 0
+    while offset < len(data):
+        sequence, results = unpack_results(data[offset:])
+        yield sequence, results
+        offset += HEADER.size + len(results) * RESULT_DTYPE.itemsize
+
+
+def decode(results):
+    # Results array to plain dicts with BPM, probability and epoch seconds
+    return [{
+        'device': device.decode(errors='replace'), 'timestamp': timestamp / 1000.0, 'heart_rate': heart_rate / 10.0,
+        'probability': risk / 65535.0, 'switch': bool(flags & FLAG_SWITCH), 'high': bool(flags & FLAG_HIGH),
+        'alert': bool(flags & FLAG_ALERT),
+    } for device, timestamp, heart_rate, risk, flags in results.tolist()]
+
+
+# --- Upstreams ---
+class UDPUpstream:
+    def __init__(self, host, port):
+        self.address = (host, port)
+        self.sequence = 0
+        self.stats = {'datagrams': 0, 'bytes': 0, 'errors': 0}
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def send(self, results):
+        datagrams = pack_results(results, self.sequence)
+        self.sequence = (self.sequence + len(datagrams)) & 0xFFFFFFFF
+        for datagram in datagrams:
+            try:
+                self._sock.sendto(datagram, self.address)
+            except OSError:
+                # Nothing listening upstream yet; scoring goes on regardless
+                self.stats['errors'] += 1
+                continue
+            self.stats['datagrams'] += 1
+            self.stats['bytes'] += len(datagram)
+
+    def close(self):
+        self._sock.close()
+
+
+class FileUpstream:
+    # Appends datagrams back to back; read them with iter_results()
+    def __init__(self, path):
+        self.sequence = 0
+        self._file = open(path, 'ab')
+
+    def send(self, results):
+        datagrams = pack_results(results, self.sequence)
+        self._file.write(b''.join(datagrams))
+        self._file.flush()
+        self.sequence = (self.sequence + len(datagrams)) & 0xFFFFFFFF
+
+    def close(self):
+        self._file.close()
+
+
+class TextUpstream:
+    # One readable line per result, for bench-top debugging
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, results):
+        for r in decode(results):
+            flags = ' ALERT' if r['alert'] else (' high' if r['high'] else '')
+            print(f"{r['device']} {r['heart_rate']:.1f} BPM risk {r['probability'] * 100:.1f}%{flags}",
+                  file=self.stream, flush=True)
+
+    def close(self):
+        pass
+
+
+# --- Gateway ---
+class Gateway:
+    # latency records, per reading, the time from handing a batch to score()
+    # until its packed results exist, in nanoseconds. Devices silent for
+    # idle_after seconds (reading time) lose their rolling window and alert
+    # slot, so wearers coming and going do not grow memory.
+
+    def __init__(self, artifact='panic_attack_model', threshold=0.3, rules=DEFAULT_RULES, verify=False,
+                 idle_after=3600.0):
+        forest, self.manifest = load_artifact(artifact, verify=verify)
+        if self.manifest.get('features') != FEATURES:
+            raise ValueError(f"Artifact {artifact} was built for features {self.manifest.get('features')}")
+        if not self.manifest.get('scaler_folded', True) and forest.input_mean is None:
+            raise ValueError(f"Artifact {artifact} has neither a folded nor an embedded scaler")
+        self.threshold = threshold
+        self.engine = InferenceEngine(forest, None)
+        self.alerts = AlertEngine(rules._replace(on_threshold=threshold,
+                                                 off_threshold=min(rules.off_threshold, threshold)))
+        self.latency = Histogram('gateway_reading')
+        self.idle_after = idle_after
+        self._next_eviction = -np.inf
+        self.stats = {'frames': 0, 'invalid': 0, 'long_ids': 0, 'batches': 0, 'evicted': 0}
+
+    def score(self, frames):
+        started = time.perf_counter_ns()
+        n = len(frames)
+        # str() also covers frames built by hand with numeric ids
+        device_ids = [str(f.device_id) for f in frames]
+        encoded = [d.encode() for d in device_ids]
+        if n and max(map(len, encoded)) > DEVICE_BYTES:
+            raise ValueError(f"Device ids are limited to {DEVICE_BYTES} UTF-8 bytes")
+        heart_rates = np.fromiter((f.heart_rate for f in frames), dtype=np.float64, count=n)
+        timestamps = np.fromiter((f.timestamp for f in frames), dtype=np.float64, count=n)
+        proba = self.engine.score(device_ids, heart_rates, timestamps)
+        slots = self.alerts.slots_for(device_ids)
+        self.alerts.evaluate_slots(slots, timestamps, proba)
+
+        results = np.empty(n, RESULT_DTYPE)
+        results['device'] = encoded
+        results['timestamp'] = np.round(timestamps * 1000)
+        results['heart_rate'] = np.clip(np.round(heart_rates * 10), 0, 0xFFFF)
+        results['risk'] = np.round(proba * 0xFFFF)
+        switch = np.fromiter((bool(f.switch) for f in frames), dtype=bool, count=n)
+        results['flags'] = (switch * FLAG_SWITCH | (proba >= self.threshold) * FLAG_HIGH
+                            | self.alerts.active[slots] * FLAG_ALERT)
+
+        elapsed = time.perf_counter_ns() - started
+        for _ in range(n):
+            self.latency.record(elapsed)
+        self.stats['frames'] += n
+        self.stats['batches'] += 1
+        if n and self.idle_after is not None:
+            self.evict_idle(float(timestamps.max()))
+        return results
+
+    def evict_idle(self, now):
+        # Runs at most every idle_after / 4 seconds of reading time
+        if now < self._next_eviction:
+            return
+        self._next_eviction = now + self.idle_after / 4
+        for device_id in self.alerts.evict_idle(now - self.idle_after):
+            self.engine.reset(device_id)
+            self.stats['evicted'] += 1
+
+    def score_lines(self, lines, received_at=None, default_device=None):
+        frames = []
+        for line in lines:
+            frame = parse_frame(line, received_at, default_device)
+            if frame is None:
+                self.stats['invalid'] += 1
+            elif len(str(frame.device_id).encode()) > DEVICE_BYTES:
+                self.stats['long_ids'] += 1
+            else:
+                frames.append(frame)
+        return self.score(frames) if frames else None
+
+    def latency_us(self):
+        return {f'p{q * 100:g}': round(self.latency.percentile(q) / 1e3, 1) for q in (0.5, 0.99)}
+
+
+# --- Sources ---
+# Each yields (lines, received_at, default_device) batches
+
+def stdin_source(stream=None):
+    for line in stream or sys.stdin.buffer:
+        yield [line], time.time(), None
+
+
+def udp_source(host, port, max_batch=256):
+    # Blocks for one datagram, then drains whatever else is already queued,
+    # so a burst from many wearers is scored in one predict call
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((host, port))
+    try:
+        while True:
+            sock.setblocking(True)
+            lines = sock.recv(65535).splitlines()
+            sock.setblocking(False)
+            while len(lines) < max_batch:
+                try:
+                    lines.extend(sock.recv(65535).splitlines())
+                except BlockingIOError:
+                    break
+            yield lines, time.time(), None
+    finally:
+        sock.close()
+
+
+def serial_source(port, baudrate=115200, device_id=None):
+    try:
+        import serial
+    except ImportError as e:
+        raise ImportError("Serial input requires pyserial (pip install pyserial)") from e
+    with serial.Serial(port, baudrate, timeout=1) as conn:
+        while True:
+            line = conn.readline()
+            if line:
+                yield [line], time.time(), device_id or port
+
+
+def run(gateway, source, upstreams):
+    try:
+        for lines, received_at, default_device in source:
+            results = gateway.score_lines(lines, received_at, default_device)
+            if results is not None:
+                for upstream in upstreams:
+                    upstream.send(results)
+    finally:
+        for upstream in upstreams:
+            upstream.close()
+
+
+# --- Measurements ---
+def synthetic_frames(readings, devices=16, seed=0, start=None):
+    # Resting heart rates with occasional spikes, spread over `devices` wearers
+    rng = np.random.default_rng(seed)
+    start = time.time() if start is None else start
+    heart_rate = rng.normal(75, 8, readings) + (rng.random(readings) < 0.05) * rng.uniform(30, 50, readings)
+    device = rng.integers(0, devices, readings)
+    return [Frame(f'gw-{d:04d}', start + i * 0.1, hr, 0)
+            for i, (d, hr) in enumerate(zip(device.tolist(), heart_rate.tolist()))]
+
+
+def probe(artifact):
+    # Cold-start work of a fresh gateway process: import, load, score one reading
+    gateway = Gateway(artifact)
+    gateway.score(synthetic_frames(1))
+    return {'rss_mb': round(rss_bytes() / 2**20, 1),
+            'heavy_modules': [m for m in HEAVY_MODULES if m in sys.modules]}
+
+
+def measure_startup(artifact, runs=3):
+    # Wall time of fresh interpreters running `probe`, including interpreter
+    # start and imports; the fastest run approximates a warm page cache
+    times, info = [], None
+    for _ in range(runs):
+        started = time.perf_counter()
+        out = subprocess.run([sys.executable, '-m', 'panic_predictor.gateway', '--artifact', artifact, 'probe'],
+                             check=True, capture_output=True, text=True).stdout
+        times.append(time.perf_counter() - started)
+        info = json.loads(out)
+    return dict(info, startup_s={'min': round(min(times), 3), 'max': round(max(times), 3)})
+
+
+def measure_latency(artifact, readings=5000, devices=16, batch=1):
+    gateway = Gateway(artifact)
+    frames = synthetic_frames(readings, devices)
+    # Warm up the rolling windows and code paths before timing
+    gateway.score(frames[:batch])
+    gateway.latency.reset()
+    started = time.perf_counter()
+    for i in range(0, readings, batch):
+        gateway.score(frames[i:i + batch])
+    elapsed = time.perf_counter() - started
+    return dict(gateway.latency_us(), max=round(gateway.latency.max / 1e3, 1),
+                readings_per_s=round(readings / elapsed))
+
+
+# --- Command Line ---
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="NumPy-only headless gateway scorer")
+    parser.add_argument('--artifact', default='panic_attack_model')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('run', help="score frames from stdin, UDP or serial and send results upstream")
+    p.add_argument('--udp', type=int, help="UDP port to listen on (default: read stdin)")
+    p.add_argument('--host', default='0.0.0.0')
+    p.add_argument('--serial', help="Serial port of a wearer, e.g. /dev/ttyUSB0 (needs pyserial)")
+    p.add_argument('--upstream', metavar='HOST:PORT', help="send binary result datagrams here over UDP")
+    p.add_argument('--out', help="append binary result datagrams to this file")
+    p.add_argument('--threshold', type=float, default=0.3)
+    p.add_argument('--idle-after', type=float, default=3600.0,
+                   help="seconds without readings before a device's state is dropped")
+    p = sub.add_parser('bench', help="measure cold start, memory and per-reading latency")
+    p.add_argument('--readings', type=int, default=5000)
+    p.add_argument('--devices', type=int, default=16)
+    p.add_argument('--budget-ms', type=float, default=2.0, help="p99 per-reading latency budget")
+    p.add_argument('--startup-budget-s', type=float, default=1.0)
+    sub.add_parser('probe', help="load, score one reading and print startup stats as JSON")
+    args = parser.parse_args(argv)
+
+    if args.command == 'probe':
+        print(json.dumps(probe(args.artifact)))
+        return
+
+    if args.command == 'bench':
+        startup = measure_startup(args.artifact)
+        report = {
+            'startup': startup,
+            'latency_us': measure_latency(args.artifact, args.readings, args.devices),
+            'batched_latency_us': measure_latency(args.artifact, args.readings, args.devices, batch=64),
+            'record_bytes': RESULT_DTYPE.itemsize,
+        }
+        print(json.dumps(report, indent=2))
+        failures = []
+        if startup['startup_s']['max'] > args.startup_budget_s:
+            failures.append(f"startup {startup['startup_s']['max']} s > {args.startup_budget_s} s")
+        if report['latency_us']['p99'] > args.budget_ms * 1000:
+            failures.append(f"p99 {report['latency_us']['p99']} us > {args.budget_ms} ms")
+        if startup['heavy_modules']:
+            failures.append(f"imported {', '.join(startup['heavy_modules'])}")
+        if failures:
+            sys.exit("Over budget: " + '; '.join(failures))
+        return
+
+    gateway = Gateway(args.artifact, args.threshold, idle_after=args.idle_after)
+    if args.serial:
+        source = serial_source(args.serial)
+    elif args.udp:
+        source = udp_source(args.host, args.udp)
+    else:
+        source = stdin_source()
+    upstreams = []
+    if args.upstream:
+        host, _, port = args.upstream.rpartition(':')
+        upstreams.append(UDPUpstream(host, int(port)))
+    if args.out:
+        upstreams.append(FileUpstream(args.out))
+    if not upstreams:
+        upstreams.append(TextUpstream())
+    try:
+        run(gateway, source, upstreams)
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(dict(gateway.stats, latency_us=gateway.latency_us())), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
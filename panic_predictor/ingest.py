@@ -0,0 +1,368 @@
+# panic_predictor/ingest.py
+import asyncio
+import json
+import math
+import re
+import time
+from collections import namedtuple
+
+import numpy as np
+
+# One heart-rate reading from a wearer. timestamp is epoch seconds.
+Frame = namedtuple('Frame', ['device_id', 'timestamp', 'heart_rate', 'switch'])
+
+FRAME_PREFIX = '$HR'
+# Timestamps below this are device uptime (ESP32 millis()), not epoch milliseconds
+MIN_EPOCH_MS = 1_000_000_000_000
+# Readings outside this range (or inf / nan) are sensor glitches; one of them
+# would poison the device's rolling mean and std
+MIN_BPM, MAX_BPM = 20.0, 300.0
+
+
+# --- Frame Parsing ---
+def parse_frame(line, received_at=None, default_device=None):
+    # Accepts "$HR,<device>,<ms>,<bpm>,<sw>" lines from the ESP32 sketch or
+    # {"device", "ts", "bpm", "sw"} JSON objects. Anything else (the sketch's
+    # debug prints, blank lines) yields None.
+    if isinstance(line, bytes):
+        line = line.decode('utf-8', 'replace')
+    line = line.strip()
+    try:
+        if line.startswith(FRAME_PREFIX + ','):
+            parts = line.split(',')
+            device_id, ts_ms, bpm = parts[1], float(parts[2]), float(parts[3])
+            switch = int(parts[4]) if len(parts) > 4 else 0
+        elif line.startswith('{'):
+            obj = json.loads(line)
+            device_id = obj.get('device', default_device)
+            ts_ms, bpm, switch = float(obj.get('ts', 0)), float(obj['bpm']), int(obj.get('sw', 0))
+        else:
+            return None
+    except (ValueError, IndexError, KeyError, TypeError, OverflowError):
+        return None
+    # JSON ids may be numbers; anything else (objects, lists, booleans) is malformed
+    if isinstance(device_id, bool) or not isinstance(device_id, (str, int)):
+        return None
+    device_id = str(device_id)
+    # The sensor reports 0 BPM when no finger is detected; that and glitches
+    # outside MIN_BPM..MAX_BPM are dropped, as are non-finite timestamps
+    if not device_id or not MIN_BPM <= bpm <= MAX_BPM or not math.isfinite(ts_ms):
+        return None
+    if ts_ms >= MIN_EPOCH_MS:
+        timestamp = ts_ms / 1000.0
+    else:
+        timestamp = time.time() if received_at is None else received_at
+    return Frame(device_id, timestamp, bpm, switch)
+
+
+def format_frame(device_id, timestamp, heart_rate, switch=0):
+    return f"{FRAME_PREFIX},{device_id},{int(timestamp * 1000)},{heart_rate:.1f},{switch}\n"
+
+
+# --- Local Broker ---
+def topic_regex(pattern):
+    # MQTT filter to a compiled regex: '+' is exactly one level and a trailing
+    # '#' is every level below (and the parent itself, as in MQTT)
+    levels = pattern.split('/')
+    if '#' in levels[:-1]:
+        raise ValueError(f"'#' must be the last level of a topic filter: {pattern!r}")
+    multi = levels[-1] == '#'
+    if multi:
+        levels = levels[:-1]
+    regex = '/'.join('[^/]+' if level == '+' else re.escape(level) for level in levels)
+    if multi:
+        regex = f'(?:{regex}(?:/.*)?)' if levels else '.*'
+    return re.compile(regex)
+
+
+class LocalBroker:
+    # In-process stand-in for an MQTT broker: topic strings with '+' (one
+    # level) and '#' (rest) wildcards, one bounded queue per subscription.
+    # publish() waits while a subscriber's queue is full, which is the
+    # backpressure a real broker applies through its in-flight window.
+
+    def __init__(self):
+        self._subscriptions = []
+
+    def subscribe(self, pattern, maxsize=10000):
+        queue = asyncio.Queue(maxsize)
+        self._subscriptions.append((topic_regex(pattern), queue))
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscriptions = [(r, q) for r, q in self._subscriptions if q is not queue]
+
+    async def publish(self, topic, payload):
+        for regex, queue in self._subscriptions:
+            if regex.fullmatch(topic):
+                await queue.put((topic, payload))
+
+
+# --- Transports ---
+# A transport feeds frames into an IngestService through feed(frame), which
+# waits for queue space, or offer(frame), which drops when the queue is full.
+
+class BrokerTransport:
+    def __init__(self, broker, pattern='devices/+/hr', maxsize=10000):
+        self.broker = broker
+        # Subscribe up front so nothing published before run() starts is lost
+        self.queue = broker.subscribe(pattern, maxsize)
+
+    async def run(self, service):
+        queue = self.queue
+        try:
+            while True:
+                topic, payload = await queue.get()
+                # devices/<id>/hr: the topic names the device if the frame does not
+                default_device = topic.split('/')[1] if topic.count('/') >= 2 else None
+                received_at = time.time()
+                for line in _lines(payload):
+                    await service.feed_line(line, received_at, default_device)
+        finally:
+            self.broker.unsubscribe(queue)
+
+
+class TCPTransport:
+    def __init__(self, host='127.0.0.1', port=9750):
+        self.host = host
+        self.port = port
+
+    async def run(self, service):
+        async def handle(reader, writer):
+            try:
+                # Not reading while feed() waits lets TCP flow control push back on the sender
+                while line := await reader.readline():
+                    await service.feed_line(line, time.time())
+            finally:
+                writer.close()
+
+        server = await asyncio.start_server(handle, self.host, self.port)
+        async with server:
+            await server.serve_forever()
+
+
+class UDPTransport:
+    def __init__(self, host='127.0.0.1', port=9750):
+        self.host = host
+        self.port = port
+
+    async def run(self, service):
+        # Datagrams cannot be pushed back on, so frames beyond the queue are dropped and counted
+        class Protocol(asyncio.DatagramProtocol):
+            def datagram_received(self, data, addr):
+                received_at = time.time()
+                for line in _lines(data):
+                    service.offer_line(line, received_at)
+
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(Protocol, local_addr=(self.host, self.port))
+        try:
+            await asyncio.Future()
+        finally:
+            transport.close()
+
+
+class SerialTransport:
+    # Reads the ESP32's USB serial port. Needs pyserial, which is imported lazily.
+    def __init__(self, port, baudrate=115200, device_id=None):
+        self.port = port
+        self.baudrate = baudrate
+        self.device_id = device_id or port
+
+    async def run(self, service):
+        try:
+            import serial
+        except ImportError as e:
+            raise ImportError("SerialTransport requires pyserial (pip install pyserial)") from e
+        loop = asyncio.get_running_loop()
+        conn = await loop.run_in_executor(None, lambda: serial.Serial(self.port, self.baudrate, timeout=1))
+        try:
+            while True:
+                line = await loop.run_in_executor(None, conn.readline)
+                if line:
+                    await service.feed_line(line, time.time(), self.device_id)
+        finally:
+            conn.close()
+
+
+def _lines(payload):
+    if isinstance(payload, bytes):
+        payload = payload.decode('utf-8', 'replace')
+    return payload.splitlines()
+
+
+# --- Ingestion Service ---
+class IngestService:
+    # Runs the transports, queues parsed frames in a bounded queue and scores
+    # them in micro-batches through an InferenceEngine, keyed by device id.
+    # on_result(frames, proba) is called for every scored batch. A batch whose
+    # scoring or on_result raises is counted in stats ('errors' batches,
+    # 'failed' frames that were never scored) and the service carries on.
+
+    def __init__(self, engine, transports, on_result=None, queue_size=10000, max_batch=4096, max_delay_ms=20):
+        self.engine = engine
+        self.transports = list(transports)
+        self.on_result = on_result
+        self.queue_size = queue_size
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000.0
+        self.stats = {'received': 0, 'invalid': 0, 'dropped': 0, 'scored': 0, 'batches': 0,
+                      'errors': 0, 'failed': 0}
+        self.last_error = None
+        self._queue = None
+
+    def _ensure_queue(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.queue_size)
+        return self._queue
+
+    async def feed(self, frame):
+        self.stats['received'] += 1
+        await self._ensure_queue().put(frame)
+
+    def offer(self, frame):
+        self.stats['received'] += 1
+        try:
+            self._ensure_queue().put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            self.stats['dropped'] += 1
+            return False
+
+    async def feed_line(self, line, received_at=None, default_device=None):
+        frame = parse_frame(line, received_at, default_device)
+        if frame is None:
+            self.stats['invalid'] += 1
+        else:
+            await self.feed(frame)
+
+    def offer_line(self, line, received_at=None, default_device=None):
+        frame = parse_frame(line, received_at, default_device)
+        if frame is None:
+            self.stats['invalid'] += 1
+            return False
+        return self.offer(frame)
+
+    async def _next_batch(self):
+        queue = self._ensure_queue()
+        batch = [await queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _score_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            frames = await self._next_batch()
+            device_ids = [f.device_id for f in frames]
+            heart_rates = np.fromiter((f.heart_rate for f in frames), dtype=np.float64, count=len(frames))
+            timestamps = np.fromiter((f.timestamp for f in frames), dtype=np.float64, count=len(frames))
+            try:
+                # Scoring releases the loop so transports keep reading meanwhile
+                proba = await loop.run_in_executor(None, self.engine.score, device_ids, heart_rates, timestamps)
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.stats['failed'] += len(frames)
+                self.last_error = e
+                continue
+            self.stats['scored'] += len(frames)
+            self.stats['batches'] += 1
+            if self.on_result is not None:
+                try:
+                    result = self.on_result(frames, proba)
+                    if asyncio.iscoroutine(result):
+                        await result
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    self.last_error = e
+
+    async def run(self):
+        self._ensure_queue()
+        tasks = [asyncio.create_task(self._score_loop())]
+        tasks += [asyncio.create_task(t.run(self)) for t in self.transports]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+# --- Command Line ---
+def main(argv=None):
+    import argparse
+    from .alerts import DEFAULT_RULES, AlertEngine, FileSink, StreamSink, WebhookSink
+    from .artifact import load_or_export
+    from .engine import InferenceEngine
+
+    parser = argparse.ArgumentParser(description="Ingest ESP32 heart-rate frames and score them")
+    parser.add_argument('--udp', type=int, help="UDP port to listen on")
+    parser.add_argument('--tcp', type=int, help="TCP port to listen on")
+    parser.add_argument('--serial', help="Serial port of a wearer, e.g. /dev/ttyUSB0")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--artifact', default='panic_attack_model')
+    parser.add_argument('--model', default='panic_attack_rf_model.pkl')
+    parser.add_argument('--scaler', default='scaler.pkl')
+    parser.add_argument('--threshold', type=float, default=0.3)
+    parser.add_argument('--queue-size', type=int, default=10000)
+    parser.add_argument('--max-delay-ms', type=float, default=20)
+    parser.add_argument('--alert-log', help="append alert/clear events to this JSON-lines file")
+    parser.add_argument('--webhook', help="POST alert/clear events to this URL")
+    parser.add_argument('--collect', metavar='LABELS',
+                        help="append readings and joystick-confirmed panics to per-device stores under "
+                             "this directory for retraining")
+    args = parser.parse_args(argv)
+
+    transports = []
+    if args.udp:
+        transports.append(UDPTransport(args.host, args.udp))
+    if args.tcp:
+        transports.append(TCPTransport(args.host, args.tcp))
+    if args.serial:
+        transports.append(SerialTransport(args.serial))
+    if not transports:
+        parser.error("at least one of --udp, --tcp or --serial is required")
+
+    collector = None
+    if args.collect:
+        from .retrain import LabelCollector
+        collector = LabelCollector(args.collect)
+
+    # One line per alert episode rather than per risky reading
+    sinks = [StreamSink()]
+    if args.alert_log:
+        sinks.append(FileSink(args.alert_log))
+    if args.webhook:
+        sinks.append(WebhookSink(args.webhook))
+    alerts = AlertEngine(DEFAULT_RULES._replace(on_threshold=args.threshold,
+                                                off_threshold=min(DEFAULT_RULES.off_threshold, args.threshold)), sinks)
+
+    def on_result(frames, proba):
+        if collector is not None:
+            collector.add_frames(frames)
+        alerts.evaluate([f.device_id for f in frames], [f.timestamp for f in frames], proba)
+
+    # Same memory-mapped artifact as the app, re-exported when the pickles change
+    forest, _ = load_or_export(args.artifact, args.model, args.scaler)
+    engine = InferenceEngine(forest, None)
+    service = IngestService(engine, transports, on_result, args.queue_size, max_delay_ms=args.max_delay_ms)
+    try:
+        asyncio.run(service.run())
+    except KeyboardInterrupt:
+        pass
+    if collector is not None:
+        collector.flush(force=True)
+    print(service.stats)
+
+
+if __name__ == '__main__':
+    main()
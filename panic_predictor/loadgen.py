@@ -0,0 +1,112 @@
+# panic_predictor/loadgen.py
+# Vectorized synthetic fleet: N virtual wearers whose heart rate follows a
+# personal baseline, a circadian curve, the current activity (a Markov chain
+# over the same activities as generate_synthetic_data) and panic episodes that
+# are likelier during risky activities. One tick() advances every wearer with
+# a handful of array operations, so a single process can drive tens of
+# thousands of devices.
+import time
+
+import numpy as np
+
+from .analytics import ACTIVITIES, ACTIVITY_WEIGHTS, RISKY_ACTIVITIES
+from .ingest import Frame, format_frame
+
+# Heart-rate offset (BPM) while doing each activity, in ACTIVITIES order
+ACTIVITY_HR = np.array([8.0, 10.0, 5.0, -2.0, -8.0])
+# Mean minutes spent in an activity before switching
+ACTIVITY_MINUTES = 20.0
+PANIC_HAZARD_PER_MIN = 0.002          # baseline episode onset rate
+RISKY_HAZARD_MULTIPLIER = 4.0
+PANIC_MINUTES = (3.0, 15.0)
+PANIC_HR = (25.0, 50.0)
+
+
+# --- Fleet ---
+class VirtualFleet:
+    # tick_seconds is simulated time per tick; it may differ from wall time
+    # so a soak run can cover days of wearer behaviour in minutes.
+
+    def __init__(self, devices=1000, seed=None, tick_seconds=1.0, start=None):
+        rng = self.rng = np.random.default_rng(seed)
+        self.n = devices
+        self.device_ids = [f'sim-{i:06d}' for i in range(devices)]
+        self.tick_seconds = tick_seconds
+        self.clock = time.time() if start is None else start
+        # Per-wearer physiology
+        self.baseline = rng.normal(72, 6, devices)
+        self.circadian_amplitude = rng.uniform(4, 10, devices)
+        self.circadian_peak_hour = rng.normal(16, 1.5, devices)
+        self.noise_scale = rng.uniform(2, 5, devices)
+        self.noise = np.zeros(devices)
+        # Current activity and panic episode
+        self.activity = rng.choice(len(ACTIVITIES), devices, p=ACTIVITY_WEIGHTS)
+        self.risky = np.isin(np.arange(len(ACTIVITIES)), [ACTIVITIES.index(a) for a in RISKY_ACTIVITIES])
+        self.panic_remaining = np.zeros(devices)      # seconds left in the episode
+        self.panic_length = np.ones(devices)
+        self.panic_intensity = np.zeros(devices)
+        self.ticks = 0
+
+    def _hours(self):
+        offset = time.localtime(self.clock).tm_gmtoff
+        return ((self.clock + offset) % 86400) / 3600.0
+
+    def tick(self):
+        # Advances every wearer by tick_seconds; returns (heart_rate, panic,
+        # activity code, switch) arrays. switch is the joystick press that
+        # confirms an episode, sent once at its start.
+        rng, n, dt = self.rng, self.n, self.tick_seconds
+        minutes = dt / 60.0
+        self.clock += dt
+        self.ticks += 1
+
+        # Activity Markov chain: leave the current activity at rate 1/ACTIVITY_MINUTES
+        switching = rng.random(n) < 1 - np.exp(-minutes / ACTIVITY_MINUTES)
+        if switching.any():
+            self.activity[switching] = rng.choice(len(ACTIVITIES), int(switching.sum()), p=ACTIVITY_WEIGHTS)
+
+        # Panic onset: Poisson hazard, raised during risky activities
+        idle = self.panic_remaining <= 0
+        hazard = PANIC_HAZARD_PER_MIN * np.where(self.risky[self.activity], RISKY_HAZARD_MULTIPLIER, 1.0)
+        onset = idle & (rng.random(n) < 1 - np.exp(-hazard * minutes))
+        k = int(onset.sum())
+        if k:
+            self.panic_length[onset] = rng.uniform(*PANIC_MINUTES, k) * 60
+            self.panic_remaining[onset] = self.panic_length[onset]
+            self.panic_intensity[onset] = rng.uniform(*PANIC_HR, k)
+        panic = self.panic_remaining > 0
+        # Episodes ramp up over their first quarter and back down over the rest
+        progress = np.where(panic, 1 - self.panic_remaining / self.panic_length, 0.0)
+        shape = np.where(progress < 0.25, progress / 0.25, (1 - progress) / 0.75)
+        self.panic_remaining = np.maximum(self.panic_remaining - dt, 0)
+
+        # AR(1) noise keeps consecutive readings correlated
+        phi = np.exp(-dt / 30.0)
+        self.noise = phi * self.noise + np.sqrt(1 - phi * phi) * self.noise_scale * rng.standard_normal(n)
+        circadian = self.circadian_amplitude * np.cos(2 * np.pi * (self._hours() - self.circadian_peak_hour) / 24)
+        heart_rate = (self.baseline + circadian + ACTIVITY_HR[self.activity] + self.noise
+                      + panic * shape * self.panic_intensity)
+        return np.clip(heart_rate, 40, 180), panic, self.activity.copy(), onset
+
+    def frames(self):
+        # One tick as ingest Frames stamped with the simulated clock
+        heart_rate, _, _, switch = self.tick()
+        return [Frame(d, self.clock, hr, int(s))
+                for d, hr, s in zip(self.device_ids, heart_rate.tolist(), switch.tolist())]
+
+    def lines(self, now=None):
+        # One tick as "$HR,..." wire lines, stamped with `now` (wall time by default)
+        heart_rate, _, _, switch = self.tick()
+        now = time.time() if now is None else now
+        return [(d, format_frame(d, now, hr, int(s)))
+                for d, hr, s in zip(self.device_ids, heart_rate.tolist(), switch.tolist())]
+
+    def history(self, ticks):
+        # A ticks x devices simulation as arrays, e.g. for offline tests
+        shape = (ticks, self.n)
+        heart_rate, panic, activity = np.empty(shape), np.empty(shape, dtype=bool), np.empty(shape, dtype=np.int64)
+        timestamps = np.empty(ticks)
+        for t in range(ticks):
+            heart_rate[t], panic[t], activity[t], _ = self.tick()
+            timestamps[t] = self.clock
+        return timestamps, heart_rate, panic, activity
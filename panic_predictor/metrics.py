@@ -0,0 +1,256 @@
+# panic_predictor/metrics.py
+# Low-overhead stage timers and counters for the scoring hot path, with a
+# Prometheus text exporter. Stages record into a process-wide REGISTRY:
+#
+#     with timer('predict'):
+#         ...
+#
+#     @timed('features')
+#     def build(...): ...
+#
+# Set PANIC_METRICS=0 to turn recording off entirely.
+import functools
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SUB_BITS = 5           # 32 sub-buckets per power of two: edges ~3% apart
+BUCKETS = 38 << SUB_BITS  # up to 2**42 ns (~73 minutes); slower stages clamp
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+# --- Histograms ---
+class Histogram:
+    # HDR-style log-linear latency histogram over integer nanoseconds. Values
+    # below 64 ns get exact buckets; above that each power of two is split
+    # into 32 equal buckets, so any value is reported within ~3% at any
+    # magnitude, in fixed memory. Recording takes no lock: under concurrent
+    # writers an increment can occasionally be lost, which percentiles
+    # tolerate and which keeps the hot path to a few hundred nanoseconds.
+
+    __slots__ = ('name', 'counts', 'total', 'max')
+
+    def __init__(self, name):
+        self.name = name
+        self.counts = [0] * BUCKETS
+        self.total = 0
+        self.max = 0
+
+    def record(self, value_ns):
+        shift = value_ns.bit_length() - SUB_BITS - 1
+        index = value_ns if shift <= 0 else (shift << SUB_BITS) + (value_ns >> shift)
+        self.counts[index if index < BUCKETS else BUCKETS - 1] += 1
+        self.total += value_ns
+        if value_ns > self.max:
+            self.max = value_ns
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    @staticmethod
+    def bucket_value(index):
+        # Midpoint of a bucket, in nanoseconds
+        shift = (index >> SUB_BITS) - 1
+        if shift <= 0:
+            return float(index)
+        low = (index - (shift << SUB_BITS)) << shift
+        return low + (1 << shift) / 2
+
+    def percentile(self, q):
+        counts = list(self.counts)
+        count = sum(counts)
+        if count == 0:
+            return 0.0
+        rank = max(1, math.ceil(q * count))
+        seen = 0
+        for index, n in enumerate(counts):
+            seen += n
+            if seen >= rank:
+                return min(self.bucket_value(index), self.max)
+        return float(self.max)
+
+    def reset(self):
+        self.counts = [0] * BUCKETS
+        self.total = self.max = 0
+
+
+class Counter:
+    __slots__ = ('name', 'value')
+
+    def __init__(self, name):
+        self.name = name
+        self.value = 0
+
+    def inc(self, n=1):
+        self.value += n
+
+    def reset(self):
+        self.value = 0
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.record(time.perf_counter_ns() - self.start)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+# --- Registry ---
+class Registry:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram(name))
+        return histogram
+
+    def counter(self, name):
+        counter = self.counters.get(name)
+        if counter is None:
+            with self._lock:
+                counter = self.counters.setdefault(name, Counter(name))
+        return counter
+
+    def timer(self, stage):
+        # Context manager timing one pass through `stage`
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self.histogram(stage))
+
+    def timed(self, stage):
+        # Decorator form of timer()
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter_ns()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.histogram(stage).record(time.perf_counter_ns() - start)
+            return wrapper
+        return decorate
+
+    def inc(self, name, n=1):
+        if self.enabled:
+            self.counter(name).inc(n)
+
+    def summary(self):
+        # One row per stage, latencies in milliseconds
+        rows = []
+        for name, histogram in sorted(self.histograms.items()):
+            count = histogram.count
+            if count == 0:
+                continue
+            rows.append({
+                'stage': name,
+                'count': count,
+                'p50_ms': histogram.percentile(0.5) / 1e6,
+                'p99_ms': histogram.percentile(0.99) / 1e6,
+                'max_ms': histogram.max / 1e6,
+                'mean_ms': histogram.total / count / 1e6,
+            })
+        return rows
+
+    def reset(self):
+        for histogram in list(self.histograms.values()):
+            histogram.reset()
+        for counter in list(self.counters.values()):
+            counter.reset()
+
+    def render_prometheus(self, prefix='panic'):
+        lines = [
+            f'# HELP {prefix}_stage_latency_seconds Wall time per hot-path stage.',
+            f'# TYPE {prefix}_stage_latency_seconds summary',
+        ]
+        for name, histogram in sorted(self.histograms.items()):
+            for q in QUANTILES:
+                value = histogram.percentile(q) / 1e9
+                lines.append(f'{prefix}_stage_latency_seconds{{stage="{name}",quantile="{q}"}} {value:.9f}')
+            lines.append(f'{prefix}_stage_latency_seconds_sum{{stage="{name}"}} {histogram.total / 1e9:.9f}')
+            lines.append(f'{prefix}_stage_latency_seconds_count{{stage="{name}"}} {histogram.count}')
+        for name, counter in sorted(self.counters.items()):
+            lines.append(f'# TYPE {prefix}_{name}_total counter')
+            lines.append(f'{prefix}_{name}_total {counter.value}')
+        return '\n'.join(lines) + '\n'
+
+
+def rss_bytes():
+    # Current resident set size; falls back to the peak where /proc is missing
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+
+REGISTRY = Registry(enabled=os.environ.get('PANIC_METRICS', '1') != '0')
+timer = REGISTRY.timer
+timed = REGISTRY.timed
+inc = REGISTRY.inc
+
+
+# --- Prometheus Endpoint ---
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def write_metrics(handler, registry=REGISTRY):
+    # Answers a BaseHTTPRequestHandler GET with the registry in Prometheus text
+    data = registry.render_prometheus().encode()
+    handler.send_response(200)
+    handler.send_header('Content-Type', PROMETHEUS_CONTENT_TYPE)
+    handler.send_header('Content-Length', str(len(data)))
+    handler.end_headers()
+    handler.wfile.write(data)
+
+
+def metrics_handler(registry=REGISTRY):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            write_metrics(self, registry)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve_metrics(port=9108, host='127.0.0.1', registry=REGISTRY):
+    # Serves GET /metrics from a daemon thread; returns the server
+    httpd = ThreadingHTTPServer((host, port), metrics_handler(registry))
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, name='metrics-http', daemon=True).start()
+    return httpd
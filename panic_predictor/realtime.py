@@ -0,0 +1,218 @@
+# panic_predictor/realtime.py
+import threading
+import time
+import weakref
+
+import numpy as np
+
+from .buffer import SessionBuffer
+from .features import RollingWindow, hour_minute
+
+
+# --- Simulated Heart Rate ---
+def get_heart_rate():
+    hr = np.random.normal(80, 15)
+    return max(40, min(160, hr))
+
+
+# --- Monitors ---
+class Monitor:
+    # One simulated wearer stream, owned by a browser session. The shared
+    # MonitorScheduler ticks it; the UI only reads snapshot().
+
+    def __init__(self, monitor_id, interval=5.0, capacity=10, source=get_heart_rate, activity_tag=None,
+                 spill_path=None):
+        self.monitor_id = monitor_id
+        self.interval = interval
+        self.source = source
+        # What the wearer is doing, when known; otherwise the attributor infers it
+        self.activity_tag = activity_tag
+        # Optional retrain.LabelCollector that also receives every reading,
+        # with activity_tag rather than the attributed activity
+        self.collector = None
+        # Latest {horizon_minutes: probability} when the scheduler has a forecaster
+        self.forecast = None
+        # Hysteresis alert state when the scheduler has an AlertEngine
+        self.alerting = False
+        self.state = 'stopped'
+        self.next_due = 0.0
+        self.hrv_window = RollingWindow()
+        self.seq = 0
+        self.epoch = 0  # bumped whenever the buffer is cleared
+        self.capacity = capacity
+        self._records = SessionBuffer(capacity, spill_path)
+        self._lock = threading.Lock()
+        self._scheduler = None
+
+    @property
+    def running(self):
+        return self.state == 'running'
+
+    def start(self):
+        self.state = 'running'
+        self.next_due = time.monotonic()
+        self._wake()
+
+    def pause(self):
+        if self.state == 'running':
+            self.state = 'paused'
+
+    def stop(self):
+        self.state = 'stopped'
+        with self._lock:
+            self._records.clear()
+            self.hrv_window.clear()
+            self.forecast = None
+            self.alerting = False
+            self.epoch += 1
+
+    def set_interval(self, interval):
+        self.interval = interval
+        self.next_due = min(self.next_due, time.monotonic() + interval)
+        self._wake()
+
+    def _wake(self):
+        if self._scheduler is not None:
+            self._scheduler.wake()
+
+    def record(self, timestamp, hr, proba, activity):
+        with self._lock:
+            self.hrv_window.push(hr)
+            self.seq += 1
+            self._records.append(self.seq, int(timestamp * 1000), hr, proba, self.hrv_window.std, activity)
+        if self.collector is not None:
+            self.collector.add(self.monitor_id, timestamp, hr, self.activity_tag)
+
+    def snapshot(self, since=None):
+        # Columns as arrays (timestamps in epoch ms). Every reading carries a
+        # sequence number; `since` returns only newer ones. The records are
+        # copied under the lock because the scheduler keeps writing the ring.
+        with self._lock:
+            records = (self._records.view() if since is None else self._records.since(since)).copy()
+            activity = self._records.names(records['activity'])
+        return {
+            'seq': records['seq'],
+            'timestamps': records['timestamp'],
+            'hr': records['hr'],
+            'proba': records['proba'],
+            'hrv': records['hrv'],
+            'activity': activity,
+        }
+
+    def history(self):
+        # Spilled records (or the ring when spilling is off), memory-mapped
+        with self._lock:
+            return self._records.history()
+
+    def latest(self):
+        with self._lock:
+            record = self._records.last()
+            if record is None:
+                return None
+            return {
+                'seq': int(record['seq']),
+                'timestamp': int(record['timestamp']),
+                'hr': float(record['hr']),
+                'proba': float(record['proba']),
+                'hrv': float(record['hrv']),
+                'activity': self._records.names(record['activity']),
+            }
+
+    def __len__(self):
+        return len(self._records)
+
+
+class MonitorScheduler:
+    # One background thread for every session's monitor. Monitors that are due
+    # on the same wake-up are scored with a single InferenceEngine call and
+    # attributed with a single ActivityAttributor lookup.
+    # Monitors are held weakly, so a closed session's monitor simply drops out.
+
+    def __init__(self, engine, attributor=None, min_sleep=0.01, forecaster=None, alerts=None):
+        self.engine = engine
+        self.attributor = attributor
+        self.forecaster = forecaster
+        self.alerts = alerts
+        self.min_sleep = min_sleep
+        self._monitors = weakref.WeakSet()
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self.last_error = None
+        self._thread = threading.Thread(target=self._run, name='monitor-scheduler', daemon=True)
+        self._thread.start()
+
+    def add(self, monitor):
+        with self._lock:
+            self._monitors.add(monitor)
+        monitor._scheduler = self
+        # Forget the rolling histories once the session is gone
+        weakref.finalize(monitor, self._forget, monitor.monitor_id)
+        self.wake()
+        return monitor
+
+    def wake(self):
+        self._wakeup.set()
+
+    def _forget(self, monitor_id):
+        self.engine.reset(monitor_id)
+        if self.forecaster is not None:
+            self.forecaster.reset(monitor_id)
+        if self.alerts is not None:
+            self.alerts.forget(monitor_id)
+
+    def _run(self):
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                running = [m for m in self._monitors if m.running]
+            due = [m for m in running if m.next_due <= now]
+            if due:
+                try:
+                    self._tick(due, now)
+                except Exception as e:
+                    # Keep the shared thread alive whatever a source, model,
+                    # forecaster, alert sink or attributor raised; the
+                    # monitors retry on their next tick
+                    self.last_error = e
+                self._advance(due, now)
+            with self._lock:
+                pending = [m.next_due for m in self._monitors if m.running]
+            timeout = max(min(pending) - time.monotonic(), self.min_sleep) if pending else None
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+    def _tick(self, due, now):
+        hrs = np.array([m.source() for m in due], dtype=np.float64)
+        timestamp = time.time()
+        timestamps = np.full(len(due), timestamp)
+        proba = self.engine.score([m.monitor_id for m in due], hrs, timestamps)
+        forecaster = self.forecaster
+        forecast = None
+        if forecaster is not None:
+            forecast = forecaster.score([m.monitor_id for m in due], hrs, timestamps)
+        alerts = self.alerts
+        if alerts is not None:
+            ids = [m.monitor_id for m in due]
+            alerts.evaluate(ids, timestamps, proba)
+            alerting = [alerts.is_active(pid) for pid in ids]
+        tags = [m.activity_tag for m in due]
+        attributor = self.attributor
+        if attributor is not None:
+            hours, _ = hour_minute(timestamps)
+            activities = attributor.names(attributor.attribute(hours, attributor.codes(tags)))
+        else:
+            activities = tags
+        for i, m in enumerate(due):
+            if alerts is not None:
+                m.alerting = alerting[i]
+            if forecast is not None:
+                m.forecast = dict(zip(forecaster.horizons, forecast[i].tolist()))
+            m.record(timestamp, float(hrs[i]), float(proba[i]), activities[i])
+
+    def _advance(self, due, now):
+        # Runs even when the tick failed, so a failing monitor waits its
+        # interval instead of spinning the thread
+        for m in due:
+            m.next_due += m.interval
+            if m.next_due <= now:
+                m.next_due = now + m.interval
@@ -0,0 +1,312 @@
+# panic_predictor/registry.py
+# Per-patient / per-cohort model registry on local disk:
+#
+#   <root>/assignments.json          patient id -> model name
+#   <root>/models/<name>/CURRENT     version currently served for <name>
+#   <root>/models/<name>/<version>/  one model artifact (see artifact.py)
+#
+# Publishing writes a new version directory, then swaps CURRENT with
+# os.replace, so readers see either the old or the new version, never a mix.
+# Loaded forests sit in a bounded LRU cache; misses are loaded on a
+# background thread while the request is served by the default model.
+import json
+import os
+import queue
+import re
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .artifact import export_artifact, load_artifact
+from .metrics import inc, timer
+
+DEFAULT_MODEL = 'default'
+ASSIGNMENTS = 'assignments.json'
+POINTER = 'CURRENT'
+_NAME = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]*$')
+
+LoadedModel = namedtuple('LoadedModel', ['name', 'version', 'forest', 'nbytes'])
+
+
+def _write_atomic(path, text):
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp, 'w') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _check_name(name):
+    if not _NAME.match(name):
+        raise ValueError(f"Invalid model name or version: {name!r}")
+    return name
+
+
+def forest_nbytes(forest):
+    return sum(np.asarray(a).nbytes for a in forest.arrays().values())
+
+
+# --- Registry ---
+class ModelRegistry:
+    # max_models / max_bytes bound the in-memory cache; the default model is
+    # pinned and never evicted. stats counts hits, misses, evictions, loads
+    # and swaps; the same events also go to the metrics registry.
+
+    def __init__(self, root, default_model=DEFAULT_MODEL, max_models=32, max_bytes=None):
+        self.root = root
+        self.default_model = default_model
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'loads': 0, 'swaps': 0, 'load_errors': 0}
+        self._cache = OrderedDict()   # name -> LoadedModel, least recently used first
+        self._bytes = 0
+        self._assignments = {}
+        self._current = {}            # name -> version named by CURRENT
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._queue = queue.SimpleQueue()
+        self._loader = None
+        os.makedirs(os.path.join(root, 'models'), exist_ok=True)
+        self.refresh()
+
+    # --- On-disk layout ---
+    def _model_dir(self, name):
+        return os.path.join(self.root, 'models', _check_name(name))
+
+    def _version_dir(self, name, version):
+        return os.path.join(self._model_dir(name), _check_name(version))
+
+    def models(self):
+        models_dir = os.path.join(self.root, 'models')
+        return sorted(n for n in os.listdir(models_dir) if os.path.exists(os.path.join(models_dir, n, POINTER)))
+
+    def versions(self, name):
+        model_dir = self._model_dir(name)
+        if not os.path.isdir(model_dir):
+            return []
+        return sorted(v for v in os.listdir(model_dir) if os.path.isdir(os.path.join(model_dir, v)))
+
+    def current_version(self, name):
+        return self._current.get(name)
+
+    def refresh(self):
+        # Re-reads assignments and CURRENT pointers, e.g. after another
+        # process published; changed versions are reloaded in the background
+        try:
+            with open(os.path.join(self.root, ASSIGNMENTS)) as f:
+                assignments = json.load(f)
+        except FileNotFoundError:
+            assignments = {}
+        current = {}
+        for name in self.models():
+            with open(os.path.join(self._model_dir(name), POINTER)) as f:
+                current[name] = f.read().strip()
+        with self._lock:
+            self._assignments = assignments
+            self._current = current
+            stale = [name for name, model in self._cache.items() if current.get(name) != model.version]
+        for name in stale:
+            self._schedule(name)
+
+    # --- Publishing ---
+    def publish(self, name, forest, version=None, scaler_mean=None, scaler_scale=None, source=None):
+        version = version or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+        path = self._version_dir(name, version)
+        if os.path.exists(path):
+            raise ValueError(f"Model {name} already has a version {version}")
+        export_artifact(forest, path, scaler_mean, scaler_scale, version, source)
+        self.activate(name, version)
+        return version
+
+    def activate(self, name, version):
+        # Atomic pointer swap; also used to roll back to an older version
+        if not os.path.isdir(self._version_dir(name, version)):
+            raise FileNotFoundError(f"No version {version} of model {name}")
+        _write_atomic(os.path.join(self._model_dir(name), POINTER), version + '\n')
+        with self._lock:
+            self._current[name] = version
+            cached = name in self._cache
+        if cached:
+            self._schedule(name)
+
+    def assign(self, patient_id, name):
+        with self._lock:
+            self._assignments[str(patient_id)] = _check_name(name)
+            text = json.dumps(self._assignments, indent=2, sort_keys=True)
+        _write_atomic(os.path.join(self.root, ASSIGNMENTS), text)
+
+    def unassign(self, patient_id):
+        with self._lock:
+            self._assignments.pop(str(patient_id), None)
+            text = json.dumps(self._assignments, indent=2, sort_keys=True)
+        _write_atomic(os.path.join(self.root, ASSIGNMENTS), text)
+
+    def model_for(self, patient_id):
+        if patient_id is None:
+            return self.default_model
+        return self._assignments.get(str(patient_id), self.default_model)
+
+    # --- Serving ---
+    def get(self, patient_id, block=False):
+        # Never waits on disk unless block=True or nothing at all is loaded:
+        # a miss queues a background load and falls back to the default model
+        name = self.model_for(patient_id)
+        with self._lock:
+            model = self._cache.get(name)
+            if model is not None:
+                self._cache.move_to_end(name)
+                self.stats['hits'] += 1
+            else:
+                self.stats['misses'] += 1
+        if model is not None:
+            inc('model_cache_hits')
+            return model
+        inc('model_cache_misses')
+        if block or name == self.default_model:
+            return self.load(name)
+        self._schedule(name)
+        default = self._cache.get(self.default_model)
+        return default if default is not None else self.load(self.default_model)
+
+    def load(self, name):
+        # Synchronous load of the current version, then insert into the cache
+        version = self._current.get(name)
+        if version is None:
+            raise KeyError(f"Unknown model {name!r}")
+        with timer('model_load'):
+            forest, _ = load_artifact(self._version_dir(name, version))
+            # Touch the pages now rather than on the first real request
+            forest.predict_proba(np.zeros((1, forest.n_features)))
+        model = LoadedModel(name, version, forest, forest_nbytes(forest))
+        self._insert(model)
+        return model
+
+    def _insert(self, model):
+        evicted = 0
+        with self._lock:
+            old = self._cache.pop(model.name, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+                if old.version != model.version:
+                    self.stats['swaps'] += 1
+            self._cache[model.name] = model
+            self._bytes += model.nbytes
+            self.stats['loads'] += 1
+            for name in list(self._cache):
+                over = len(self._cache) > self.max_models or (
+                    self.max_bytes is not None and self._bytes > self.max_bytes)
+                if not over:
+                    break
+                if name in (self.default_model, model.name):
+                    continue
+                self._bytes -= self._cache.pop(name).nbytes
+                evicted += 1
+            self.stats['evictions'] += evicted
+        if evicted:
+            inc('model_cache_evictions', evicted)
+
+    def evict(self, name):
+        with self._lock:
+            model = self._cache.pop(name, None)
+            if model is not None:
+                self._bytes -= model.nbytes
+
+    def cached(self):
+        with self._lock:
+            return [(m.name, m.version, m.nbytes) for m in self._cache.values()]
+
+    @property
+    def cached_bytes(self):
+        return self._bytes
+
+    # --- Background loading ---
+    def warmup(self, names=None):
+        # Queues the default model plus every assigned (or listed) model
+        if names is None:
+            names = [self.default_model] + sorted(set(self._assignments.values()))
+        for name in names:
+            self._schedule(name)
+
+    def wait(self, timeout=None):
+        # Blocks until the background queue is drained; mainly for tests/CLI
+        done = threading.Event()
+        self._queue.put(done)
+        self._ensure_loader()
+        return done.wait(timeout)
+
+    def _schedule(self, name):
+        with self._lock:
+            if name in self._pending or name not in self._current:
+                return
+            self._pending.add(name)
+        self._ensure_loader()
+        self._queue.put(name)
+
+    def _ensure_loader(self):
+        with self._lock:
+            if self._loader is None:
+                self._loader = threading.Thread(target=self._load_loop, name='model-loader', daemon=True)
+                self._loader.start()
+
+    def _load_loop(self):
+        while True:
+            name = self._queue.get()
+            if isinstance(name, threading.Event):
+                name.set()
+                continue
+            try:
+                self.load(name)
+            except (OSError, KeyError, ValueError):
+                # Keep serving whatever is cached; the next get() retries
+                self.stats['load_errors'] += 1
+            finally:
+                with self._lock:
+                    self._pending.discard(name)
+
+
+# --- Command Line ---
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the per-patient model registry")
+    parser.add_argument('--root', default='panic_attack_models')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('publish', help="publish pickled model + scaler as a new version")
+    p.add_argument('name')
+    p.add_argument('--model', default='panic_attack_rf_model.pkl')
+    p.add_argument('--scaler', default='scaler.pkl')
+    p.add_argument('--version')
+    p = sub.add_parser('activate', help="point a model at an existing version")
+    p.add_argument('name')
+    p.add_argument('version')
+    p = sub.add_parser('assign', help="serve a patient from a model")
+    p.add_argument('patient_id')
+    p.add_argument('name')
+    sub.add_parser('list')
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.root)
+    if args.command == 'publish':
+        import joblib
+        from .artifact import file_sha256
+        from .features import scaler_params
+        from .forest import FlatForest
+
+        scaler = joblib.load(args.scaler)
+        forest = FlatForest.from_sklearn(joblib.load(args.model), scaler)
+        mean, scale = scaler_params(scaler)
+        source = {'model': os.path.basename(args.model), 'model_sha256': file_sha256(args.model)}
+        version = registry.publish(args.name, forest, args.version, mean, scale, source)
+        print(f"Published {args.name} version {version}")
+    elif args.command == 'activate':
+        registry.activate(args.name, args.version)
+    elif args.command == 'assign':
+        registry.assign(args.patient_id, args.name)
+    else:
+        for name in registry.models():
+            print(name, registry.current_version(name), ' '.join(registry.versions(name)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+# panic_predictor/replay.py
+# Replays panic_attack_data.csv as a fleet of synthetic ESP32 wearers, either
+# into an in-process LocalBroker + IngestService or over UDP/TCP to a running
+# `python -m panic_predictor.ingest`.
+import asyncio
+import socket
+import time
+
+import numpy as np
+import pandas as pd
+
+from .ingest import IngestService, BrokerTransport, LocalBroker, format_frame
+
+
+# --- Fleet ---
+class FleetReplay:
+    # Every virtual device walks the recorded heart-rate series from its own
+    # random offset, one reading per tick.
+
+    def __init__(self, heart_rates, devices=100, seed=None):
+        rng = np.random.default_rng(seed)
+        self.heart_rates = np.asarray(heart_rates, dtype=np.float64)
+        self.device_ids = [f'replay-{i:05d}' for i in range(devices)]
+        self.offsets = rng.integers(0, len(self.heart_rates), devices)
+        self.step = 0
+
+    @classmethod
+    def from_csv(cls, path='panic_attack_data.csv', **kwargs):
+        return cls(pd.read_csv(path, usecols=['heart_rate'])['heart_rate'].to_numpy(), **kwargs)
+
+    def tick(self, now=None):
+        now = time.time() if now is None else now
+        hr = self.heart_rates[(self.offsets + self.step) % len(self.heart_rates)]
+        self.step += 1
+        return [(device_id, format_frame(device_id, now, value)) for device_id, value in zip(self.device_ids, hr.tolist())]
+
+
+async def _paced(fleet, rate, duration, send):
+    # Keeps `rate` ticks per second; when behind schedule, ticks go out back to back
+    start = time.monotonic()
+    sent = 0
+    tick = 0
+    while time.monotonic() - start < duration:
+        for device_id, line in fleet.tick():
+            await send(device_id, line)
+        sent += len(fleet.device_ids)
+        tick += 1
+        delay = start + tick / rate - time.monotonic()
+        await asyncio.sleep(max(delay, 0))
+    return sent, time.monotonic() - start
+
+
+async def replay_broker(fleet, engine, rate, duration, threshold=0.3):
+    broker = LocalBroker()
+    alerts = 0
+
+    def on_result(frames, proba):
+        nonlocal alerts
+        alerts += int((proba >= threshold).sum())
+
+    service = IngestService(engine, [BrokerTransport(broker)], on_result)
+    task = asyncio.create_task(service.run())
+    await asyncio.sleep(0)
+    start = time.monotonic()
+    sent, elapsed = await _paced(fleet, rate, duration, lambda device_id, line: broker.publish(f'devices/{device_id}/hr', line))
+    # Let the pipeline drain before reporting
+    while service.stats['scored'] + service.stats['invalid'] + service.stats['failed'] < sent:
+        await asyncio.sleep(0.01)
+    drained = time.monotonic() - start
+    task.cancel()
+    return {'sent': sent, 'elapsed': elapsed, 'drained': drained, 'alerts': alerts, **service.stats}
+
+
+async def replay_socket(fleet, rate, duration, host, port, protocol='udp'):
+    if protocol == 'udp':
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+
+        async def send(device_id, line):
+            sock.sendto(line.encode(), (host, port))
+    else:
+        _, writer = await asyncio.open_connection(host, port)
+
+        async def send(device_id, line):
+            writer.write(line.encode())
+            await writer.drain()
+    try:
+        sent, elapsed = await _paced(fleet, rate, duration, send)
+    finally:
+        if protocol == 'udp':
+            sock.close()
+        else:
+            writer.close()
+    return {'sent': sent, 'elapsed': elapsed}
+
+
+# --- Command Line ---
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay panic_attack_data.csv as a synthetic device fleet")
+    parser.add_argument('--csv', default='panic_attack_data.csv')
+    parser.add_argument('--devices', type=int, default=100)
+    parser.add_argument('--rate', type=float, default=10.0, help="readings per second per device")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds")
+    parser.add_argument('--transport', choices=['broker', 'udp', 'tcp'], default='broker')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9750)
+    parser.add_argument('--model', default='panic_attack_rf_model.pkl')
+    parser.add_argument('--scaler', default='scaler.pkl')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args(argv)
+
+    fleet = FleetReplay.from_csv(args.csv, devices=args.devices, seed=args.seed)
+    if args.transport == 'broker':
+        from .engine import InferenceEngine
+        engine = InferenceEngine.from_files(args.model, args.scaler)
+        result = asyncio.run(replay_broker(fleet, engine, args.rate, args.duration))
+    else:
+        result = asyncio.run(replay_socket(fleet, args.rate, args.duration, args.host, args.port, args.transport))
+    rate = result['sent'] / result['elapsed'] if result['elapsed'] else 0.0
+    print(f"Sent {result['sent']} frames in {result['elapsed']:.2f}s ({rate:,.0f} frames/s)")
+    print(result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,354 @@
+# panic_predictor/retrain.py
+# Online retraining from labelled readings.
+#
+# LabelCollector appends readings to one ColumnStore per patient under a
+# labels root, once their label is final: a panic confirmed by the ESP32
+# joystick switch or the app's "Report Panic" button marks that patient's
+# readings of the preceding label_window seconds as panic_attack=1.
+# retrain_once() then grows the Random Forest with warm_start: the new trees
+# are fitted on the rows added since the last round only, with features
+# vectorized over just those rows, per patient store so rolling windows never
+# span two wearers. A candidate that validates on held-out new rows is
+# published to the ModelRegistry, and running apps pick it up with
+# registry.refresh().
+#   python -m panic_predictor.retrain --labels panic_attack_labels --registry panic_attack_models
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+from .features import WINDOW, rolling_features, scale_features, scaler_params, utc_offsets
+from .metrics import inc
+from .store import NS_PER_HOUR, ColumnStore
+
+NS_PER_MINUTE = 60_000_000_000
+DEFAULT_THRESHOLD = 0.3
+STATE_FILE = 'state.json'
+MODEL_FILE = 'model.pkl'
+
+
+def local_ns(timestamps):
+    # Epoch seconds to the store's naive local wall-clock nanoseconds
+    ts = np.asarray(timestamps, dtype=np.float64)
+    return ((ts + utc_offsets(ts)) * 1e9).astype(np.int64).view('datetime64[ns]')
+
+
+# --- Label Collection ---
+def patient_dir(patient_id):
+    # Patient id to a store directory name; reversible with unquote()
+    return quote(str(patient_id), safe='').replace('.', '%2E')
+
+
+def patient_stores(root):
+    # (patient id, store path) for every patient store under a labels root
+    if not os.path.isdir(root):
+        return []
+    return [(unquote(name), os.path.join(root, name)) for name in sorted(os.listdir(root))
+            if os.path.exists(os.path.join(root, name, 'manifest.json'))]
+
+
+class LabelCollector:
+    # Holds each patient's readings for label_window seconds so a late
+    # confirmation can still label them, then appends them to that patient's
+    # store under root in batches of flush_rows.
+
+    # activity is what the wearer entered, never an attributor guess, so the
+    # model's own output does not feed back into its training data; rows
+    # without one are stored with no activity and stay out of the RiskTable.
+
+    def __init__(self, root, label_window=120.0, flush_rows=32):
+        self.root = root
+        self.label_window = label_window
+        self.flush_rows = flush_rows
+        self.stats = {'collected': 0, 'confirmed': 0, 'stored': 0}
+        self._pending = {}   # patient id -> deque of [timestamp, heart_rate, activity, label]
+        self._stores = {}
+        self._lock = threading.Lock()
+
+    def store_for(self, patient_id):
+        with self._lock:
+            store = self._stores.get(patient_id)
+            if store is None:
+                store = self._stores[patient_id] = ColumnStore(os.path.join(self.root, patient_dir(patient_id)))
+            return store
+
+    def add(self, patient_id, timestamp, heart_rate, activity=None, switch=0):
+        with self._lock:
+            pending = self._pending.get(patient_id)
+            if pending is None:
+                pending = self._pending[patient_id] = deque()
+            pending.append([timestamp, heart_rate, activity, 0])
+            self.stats['collected'] += 1
+        if switch:
+            self.confirm(patient_id, timestamp)
+        else:
+            self.flush(timestamp, patient_id=patient_id)
+
+    def add_frames(self, frames):
+        # IngestService on_result adapter; the joystick switch confirms a panic
+        for frame in frames:
+            self.add(frame.device_id, frame.timestamp, frame.heart_rate, switch=frame.switch)
+
+    def confirm(self, patient_id, timestamp=None):
+        # Labels the patient's pending readings from the last label_window seconds
+        timestamp = time.time() if timestamp is None else timestamp
+        labelled = 0
+        with self._lock:
+            for row in reversed(self._pending.get(patient_id, ())):
+                if row[0] < timestamp - self.label_window:
+                    break
+                if row[0] <= timestamp and not row[3]:
+                    row[3] = 1
+                    labelled += 1
+            self.stats['confirmed'] += 1
+        inc('panic_confirmations')
+        return labelled
+
+    def flush(self, now=None, force=False, patient_id=None):
+        # Stores readings older than label_window (all of them with force=True),
+        # for one patient or for all of them
+        cutoff = (time.time() if now is None else now) - self.label_window
+        stored = 0
+        for pid in ([patient_id] if patient_id is not None else list(self._pending)):
+            with self._lock:
+                pending = self._pending.get(pid)
+                if not pending:
+                    continue
+                if force:
+                    ready = len(pending)
+                else:
+                    # Readings arrive in time order, so counting stops at the
+                    # first one still inside the window
+                    ready = 0
+                    for row in pending:
+                        if row[0] >= cutoff:
+                            break
+                        ready += 1
+                if not ready or (ready < self.flush_rows and not force):
+                    continue
+                rows = [pending.popleft() for _ in range(ready)]
+            timestamps, heart_rates, activities, labels = zip(*rows)
+            self.store_for(pid).append(local_ns(timestamps), heart_rates, labels, activities)
+            self.stats['stored'] += len(rows)
+            stored += len(rows)
+        return stored
+
+    def forget(self, patient_id):
+        # Stores what the patient still has pending and drops their buffer and
+        # store handle, e.g. once an app session is gone
+        self.flush(force=True, patient_id=patient_id)
+        with self._lock:
+            self._pending.pop(patient_id, None)
+            self._stores.pop(patient_id, None)
+
+
+# --- Features ---
+def store_features(store, start, stop):
+    # Raw feature rows and labels for store rows [start, stop). Only the
+    # WINDOW - 1 readings before `start` are read back, to seed the windows.
+    heart_rate = np.asarray(store.column('heart_rate')[start:stop], dtype=np.float64)
+    carry = np.asarray(store.column('heart_rate')[max(0, start - WINDOW + 1):start], dtype=np.float64)
+    ns = np.asarray(store.column('timestamp')[start:stop])
+    mean, std, change = rolling_features(heart_rate, WINDOW, carry)
+    X = np.column_stack([heart_rate, (ns // NS_PER_HOUR) % 24, (ns // NS_PER_MINUTE) % 60, mean, std, change])
+    y = np.asarray(store.column('panic_attack')[start:stop], dtype=np.int64)
+    return X, y
+
+
+def brier_score(proba, y):
+    return float(np.mean((proba - y) ** 2))
+
+
+def recall_at(proba, y, threshold=DEFAULT_THRESHOLD):
+    positives = y > 0
+    return float((proba[positives] >= threshold).mean()) if positives.any() else 0.0
+
+
+# --- Retraining ---
+def _read_state(state_dir):
+    try:
+        with open(os.path.join(state_dir, STATE_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_state(state_dir, state):
+    tmp = os.path.join(state_dir, STATE_FILE + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, os.path.join(state_dir, STATE_FILE))
+
+
+def retrain_once(labels_root, state_dir, registry_root, model_name='default',
+                 base_model='panic_attack_rf_model.pkl', scaler_path='scaler.pkl',
+                 trees_per_round=10, max_trees=200, min_rows=500, min_positives=5,
+                 validation_fraction=0.2, tolerance=0.005, threshold=DEFAULT_THRESHOLD):
+    # One round over the rows stored in every patient store under labels_root
+    # since the previous round. Returns a summary dict; status is 'waiting',
+    # 'rejected' or 'published'.
+    import joblib
+    from .forest import FlatForest
+    from .registry import ModelRegistry
+
+    os.makedirs(state_dir, exist_ok=True)
+    state = _read_state(state_dir) or {'trained_rows': {}, 'rounds': 0, 'published': None}
+    ranges = []
+    for patient_id, path in patient_stores(labels_root):
+        store = ColumnStore(path, readonly=True)
+        start, stop = state['trained_rows'].get(patient_id, 0), len(store)
+        if stop > start:
+            ranges.append((patient_id, store, start, stop))
+    new_rows = sum(stop - start for _, _, start, stop in ranges)
+    summary = {'new_rows': new_rows, 'patients': len(ranges)}
+    if new_rows < min_rows:
+        return dict(summary, status='waiting')
+
+    started = time.perf_counter()
+    # Features per patient store; each patient's newest rows are held out
+    consumed, train, val = {}, [], []
+    for patient_id, store, start, stop in ranges:
+        X, y = store_features(store, start, stop)
+        split = int(len(X) * (1 - validation_fraction))
+        consumed[patient_id] = start + split
+        train.append((X[:split], y[:split]))
+        val.append((X[split:], y[split:]))
+    X_train, y_train = np.concatenate([x for x, _ in train]), np.concatenate([y for _, y in train])
+    X_val, y_val = np.concatenate([x for x, _ in val]), np.concatenate([y for _, y in val])
+    raw_val = X_val
+    train_positives = int(y_train.sum())
+    if train_positives < min_positives or train_positives == len(y_train) or not y_val.any():
+        return dict(summary, status='waiting', positives=train_positives + int(y_val.sum()))
+
+    model_path = os.path.join(state_dir, MODEL_FILE)
+    model = joblib.load(model_path if os.path.exists(model_path) else base_model)
+    scaler = joblib.load(scaler_path)
+    mean, scale = scaler_params(scaler)
+    X_train, X_val = scale_features(X_train, mean, scale), scale_features(X_val, mean, scale)
+
+    current = model.predict_proba(X_val)[:, 1]
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + trees_per_round)
+    model.fit(X_train, y_train)
+    if len(model.estimators_) > max_trees:
+        # Oldest trees age out so the forest tracks recent physiology
+        model.estimators_ = model.estimators_[-max_trees:]
+        model.n_estimators = max_trees
+    candidate = model.predict_proba(X_val)[:, 1]
+
+    summary.update({
+        'train_rows': len(X_train), 'validation_rows': len(X_val), 'trees': len(model.estimators_),
+        'brier_current': brier_score(current, y_val), 'brier_candidate': brier_score(candidate, y_val),
+        'recall_current': recall_at(current, y_val, threshold),
+        'recall_candidate': recall_at(candidate, y_val, threshold),
+    })
+    state['rounds'] += 1
+    if summary['brier_candidate'] > summary['brier_current'] + tolerance:
+        _write_state(state_dir, state)
+        return dict(summary, status='rejected', seconds=round(time.perf_counter() - started, 3))
+
+    forest = FlatForest.from_sklearn(model, scaler)
+    if not np.allclose(forest.predict_proba(raw_val)[:, 1], candidate):
+        raise ValueError("Flattened forest does not match the retrained model")
+    tmp = model_path + '.tmp'
+    joblib.dump(model, tmp)
+    os.replace(tmp, model_path)
+    registry = ModelRegistry(registry_root)
+    version = registry.publish(model_name, forest, scaler_mean=mean, scaler_scale=scale,
+                               source={'retrain_round': state['rounds'], 'new_rows': new_rows})
+    state['published'] = version
+    # Rows count as trained only once their trees are published; validation
+    # rows are trained on in the next round. A rejected round leaves
+    # trained_rows alone, so its rows are retried with the next ones.
+    state['trained_rows'].update(consumed)
+    _write_state(state_dir, state)
+    return dict(summary, status='published', version=version, seconds=round(time.perf_counter() - started, 3))
+
+
+class Retrainer:
+    # Runs retrain_once every `interval` seconds in a separate (spawned)
+    # process, so fitting never competes with scoring for the GIL, and
+    # refreshes the in-process registry when a new version is published.
+
+    def __init__(self, registry, labels_root, state_dir, interval=3600.0, **options):
+        self.registry = registry
+        self.labels_root = labels_root
+        self.state_dir = state_dir
+        self.interval = interval
+        self.options = options
+        self.last_result = None
+        self.last_error = None
+        self._executor = None
+        self._running = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _pool(self):
+        if self._executor is None:
+            import multiprocessing
+            self._executor = ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def run_now(self):
+        # Returns the round's Future; a round already in flight is reused
+        if self._running is None or self._running.done():
+            self._running = self._pool().submit(
+                retrain_once, self.labels_root, self.state_dir, self.registry.root, **self.options
+            )
+            self._running.add_done_callback(self._done)
+        return self._running
+
+    def _done(self, future):
+        try:
+            self.last_result = future.result()
+        except Exception as e:
+            self.last_error = e
+            return
+        if self.last_result['status'] == 'published':
+            self.registry.refresh()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='retrainer', daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_now()
+
+    def close(self):
+        self._stop.set()
+        if self._executor is not None:
+            # At most one round is queued; cancel it by hand (shutdown's
+            # cancel_futures needs Python 3.9)
+            if self._running is not None:
+                self._running.cancel()
+            self._executor.shutdown(wait=False)
+
+
+# --- Command Line ---
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Retrain the forest on newly labelled readings")
+    parser.add_argument('--labels', default='panic_attack_labels', help="root of the per-patient label stores")
+    parser.add_argument('--registry', default='panic_attack_models')
+    parser.add_argument('--state-dir', default=os.path.join('panic_attack_models', 'retrain'))
+    parser.add_argument('--model-name', default='default')
+    parser.add_argument('--trees-per-round', type=int, default=10)
+    parser.add_argument('--max-trees', type=int, default=200)
+    parser.add_argument('--min-rows', type=int, default=500)
+    args = parser.parse_args(argv)
+    print(json.dumps(retrain_once(
+        args.labels, args.state_dir, args.registry, args.model_name,
+        trees_per_round=args.trees_per_round, max_trees=args.max_trees, min_rows=args.min_rows,
+    ), indent=2))
+
+
+if __name__ == '__main__':
+    main()
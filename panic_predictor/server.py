@@ -0,0 +1,391 @@
+# panic_predictor/server.py
+# Standalone scoring server: a pre-forked pool of worker processes behind a
+# small HTTP API. The flattened forest lives once in shared memory and every
+# worker maps it; readings are routed by patient id, so each patient's rolling
+# window always lives in the same worker.
+#   python -m panic_predictor.server --workers 4 --port 8765
+import http.client
+import json
+import multiprocessing
+import os
+import signal
+import threading
+import zlib
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import shared_memory
+from urllib.parse import urlparse
+
+import numpy as np
+
+from .artifact import forest_from_arrays
+from .engine import InferenceEngine
+from .metrics import timer, write_metrics
+
+
+# --- Shared Model ---
+def share_forest(forest):
+    # Copy every forest array into one SharedMemory block; the spec is what a
+    # worker needs to map them again (block name, offsets, dtypes, shapes) and
+    # doubles as the manifest for artifact.forest_from_arrays
+    arrays = {name: np.ascontiguousarray(a) for name, a in forest.arrays().items()}
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        offset = (offset + 63) // 64 * 64
+        layout[name] = (offset, array.dtype.str, array.shape)
+        offset += array.nbytes
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for name, array in arrays.items():
+        start = layout[name][0]
+        shm.buf[start:start + array.nbytes] = array.tobytes()
+    spec = {'name': shm.name, 'layout': layout, 'depth': forest.depth, 'n_features': forest.n_features}
+    return shm, spec
+
+
+def attach_forest(spec):
+    # Workers share the parent's resource tracker, so attaching does not
+    # change who unlinks the block
+    shm = shared_memory.SharedMemory(name=spec['name'])
+    arrays = {}
+    for name, (offset, dtype, shape) in spec['layout'].items():
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+        array.flags.writeable = False
+        arrays[name] = array
+    return shm, forest_from_arrays(arrays, spec)
+
+
+# --- Workers ---
+def _worker_main(spec, conn):
+    # Ctrl-C is handled by the parent, which then closes the pipes
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    shm, forest = attach_forest(spec)
+    engine = InferenceEngine(forest, None)
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            if message is None:
+                break
+            request_id, kind, payload = message
+            try:
+                if kind == 'score':
+                    result = engine.score(*payload)
+                elif kind == 'predict':
+                    result = engine.predict_features(payload)
+                elif kind == 'reset':
+                    result = engine.reset(payload)
+                else:
+                    raise ValueError(f"Unknown request kind: {kind}")
+                conn.send((request_id, True, result))
+            except Exception as e:
+                conn.send((request_id, False, repr(e)))
+    finally:
+        del forest, engine
+        shm.close()
+
+
+class _WorkerHandle:
+    # A worker that died (crash, OOM kill) fails its pending and later
+    # requests instead of leaving them hanging; the server respawns it.
+
+    def __init__(self, ctx, spec):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(spec, child_conn), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.pending = {}
+        self.next_id = 0
+        self.dead = False
+        self.lock = threading.Lock()
+        self.reader = threading.Thread(target=self._read, daemon=True)
+        self.reader.start()
+
+    def submit(self, kind, payload):
+        future = Future()
+        with self.lock:
+            if self.dead:
+                future.set_exception(RuntimeError("Scoring worker exited"))
+                return future
+            request_id = self.next_id
+            self.next_id += 1
+            self.pending[request_id] = future
+            try:
+                self.conn.send((request_id, kind, payload))
+            except OSError:
+                # BrokenPipeError and friends: the worker is gone
+                del self.pending[request_id]
+                self.dead = True
+                future.set_exception(RuntimeError("Scoring worker exited"))
+        return future
+
+    @property
+    def alive(self):
+        return not self.dead and self.process.is_alive()
+
+    def _read(self):
+        while True:
+            try:
+                request_id, ok, result = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            with self.lock:
+                future = self.pending.pop(request_id)
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(RuntimeError(result))
+        with self.lock:
+            self.dead = True
+            pending, self.pending = self.pending, {}
+        for future in pending.values():
+            future.set_exception(RuntimeError("Scoring worker exited"))
+
+    def close(self):
+        try:
+            with self.lock:
+                self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=5)
+        self.conn.close()
+
+
+# --- Server ---
+class ScoringServer:
+    def __init__(self, forest, workers=None, host='127.0.0.1', port=8765):
+        self.forest = forest
+        self.n_workers = workers or os.cpu_count() or 1
+        self.host = host
+        self.port = port
+        self.workers = []
+        self.restarts = 0
+        self._shm = None
+        self._spec = None
+        self._ctx = None
+        self._httpd = None
+        self._round_robin = 0
+        self._respawn_lock = threading.Lock()
+
+    def start(self):
+        methods = multiprocessing.get_all_start_methods()
+        self._ctx = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+        self._shm, self._spec = share_forest(self.forest)
+        self.workers = [_WorkerHandle(self._ctx, self._spec) for _ in range(self.n_workers)]
+        return self
+
+    def worker(self, index):
+        # A dead worker is replaced on the next request routed to it; the
+        # patients it held start new rolling windows
+        handle = self.workers[index]
+        if handle.alive:
+            return handle
+        with self._respawn_lock:
+            handle = self.workers[index]
+            if not handle.alive:
+                handle.close()
+                handle = self.workers[index] = _WorkerHandle(self._ctx, self._spec)
+                self.restarts += 1
+        return handle
+
+    def health(self):
+        alive = sum(w.alive for w in self.workers)
+        return {'status': 'ok' if alive == self.n_workers else 'degraded', 'workers': self.n_workers,
+                'alive': alive, 'restarts': self.restarts}
+
+    def route(self, patient_ids):
+        # crc32 rather than hash(): stable across processes and restarts
+        return np.fromiter(
+            (zlib.crc32(str(pid).encode()) % self.n_workers for pid in patient_ids),
+            dtype=np.int64, count=len(patient_ids)
+        )
+
+    def score(self, patient_ids, heart_rates, timestamps=None):
+        heart_rates = np.asarray(heart_rates, dtype=np.float64)
+        timestamps = None if timestamps is None else np.asarray(timestamps, dtype=np.float64)
+        if len(patient_ids) != len(heart_rates) or (timestamps is not None and len(timestamps) != len(heart_rates)):
+            raise ValueError("patient_ids, heart_rates and timestamps must have the same length")
+        worker_of = self.route(patient_ids)
+        ids = np.asarray(patient_ids, dtype=object)
+        parts = []
+        for w in np.unique(worker_of):
+            rows = np.flatnonzero(worker_of == w)
+            ts = None if timestamps is None else timestamps[rows]
+            parts.append((rows, self.worker(w).submit('score', (ids[rows].tolist(), heart_rates[rows], ts))))
+        proba = np.empty(len(heart_rates))
+        for rows, future in parts:
+            proba[rows] = future.result()
+        return proba
+
+    def predict_features(self, X):
+        self._round_robin = (self._round_robin + 1) % self.n_workers
+        return self.worker(self._round_robin).submit('predict', np.asarray(X, dtype=np.float64)).result()
+
+    def reset(self, patient_id=None):
+        # None resets every patient on every worker, like InferenceEngine.reset
+        if patient_id is None:
+            futures = [self.worker(w).submit('reset', None) for w in range(self.n_workers)]
+        else:
+            futures = [self.worker(self.route([patient_id])[0]).submit('reset', patient_id)]
+        for future in futures:
+            future.result()
+
+    def serve_forever(self):
+        self._httpd = ThreadingHTTPServer((self.host, self.port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self._httpd.serve_forever()
+
+    def shutdown(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+        self.workers = []
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+        if self._httpd is not None:
+            self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _make_handler(server):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _reply(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._reply(200, server.health())
+            elif self.path == '/metrics':
+                # Router-side timings; scoring inside the workers is not included
+                write_metrics(self)
+            else:
+                self._reply(404, {'error': 'not found'})
+
+        def do_POST(self):
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                if self.path == '/score':
+                    with timer('server_score'):
+                        proba = server.score(body['patient_ids'], body['heart_rates'], body.get('timestamps'))
+                elif self.path == '/predict':
+                    proba = server.predict_features(body['features'])
+                elif self.path == '/reset':
+                    # {"patient_id": null} resets every patient
+                    server.reset(body['patient_id'])
+                    proba = np.empty(0)
+                else:
+                    return self._reply(404, {'error': 'not found'})
+            except (KeyError, TypeError, ValueError, IndexError) as e:
+                return self._reply(400, {'error': str(e)})
+            except RuntimeError as e:
+                return self._reply(500, {'error': str(e)})
+            self._reply(200, {'proba': proba.tolist()})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+# --- Client ---
+class ScoringClient:
+    # Drop-in for InferenceEngine.score / predict_features backed by a ScoringServer
+    def __init__(self, url='http://127.0.0.1:8765', timeout=10):
+        parsed = urlparse(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _request(self, path, body, retry=True):
+        # retry=False for requests that change state (/score pushes readings
+        # into rolling windows): the server may have applied it before the
+        # connection failed, so it is never sent twice
+        data = json.dumps(body).encode()
+        for attempt in range(2 if retry else 1):
+            conn = getattr(self._local, 'conn', None)
+            if conn is None:
+                conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                conn.request('POST', path, data, {'Content-Type': 'application/json'})
+                response = conn.getresponse()
+                result = json.loads(response.read())
+            except (http.client.HTTPException, ConnectionError):
+                # Keep-alive connection went stale; reconnect once
+                conn.close()
+                self._local.conn = None
+                if attempt or not retry:
+                    raise
+                continue
+            if response.status != 200:
+                raise RuntimeError(f"Scoring server error {response.status}: {result.get('error')}")
+            return result
+
+    def score(self, patient_ids, heart_rates, timestamps=None):
+        body = {
+            'patient_ids': [str(pid) for pid in patient_ids],
+            'heart_rates': np.asarray(heart_rates, dtype=np.float64).tolist(),
+        }
+        if timestamps is not None:
+            body['timestamps'] = np.asarray(timestamps, dtype=np.float64).tolist()
+        return np.asarray(self._request('/score', body, retry=False)['proba'])
+
+    def predict_features(self, X):
+        return np.asarray(self._request('/predict', {'features': np.asarray(X, dtype=np.float64).tolist()})['proba'])
+
+    def reset(self, patient_id=None):
+        # None resets every patient's rolling window, as InferenceEngine.reset does
+        self._request('/reset', {'patient_id': None if patient_id is None else str(patient_id)})
+
+
+# --- Command Line ---
+def main(argv=None):
+    import argparse
+    from .artifact import load_or_export
+
+    parser = argparse.ArgumentParser(description="Serve panic risk scoring from a pool of worker processes")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--artifact', default='panic_attack_model')
+    parser.add_argument('--model', default='panic_attack_rf_model.pkl')
+    parser.add_argument('--scaler', default='scaler.pkl')
+    args = parser.parse_args(argv)
+
+    forest, manifest = load_or_export(args.artifact, args.model, args.scaler)
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    # SIGTERM takes the same path as Ctrl-C so the shared memory block is unlinked
+    signal.signal(signal.SIGTERM, stop)
+    with ScoringServer(forest, args.workers, args.host, args.port) as server:
+        print(f"Scoring model {manifest['model_version']} on http://{args.host}:{args.port} "
+              f"with {server.n_workers} workers", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
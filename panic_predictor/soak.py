@@ -0,0 +1,200 @@
+# panic_predictor/soak.py
+# End-to-end soak test: a VirtualFleet publishes "$HR" lines into the local
+# broker and the real pipeline (IngestService -> rolling features -> FlatForest
+# scoring -> AlertEngine) consumes them, all in one process with no network.
+# Every report interval prints throughput, end-to-end latency percentiles
+# (publish to alert evaluation) and resident memory; the final summary adds
+# the memory growth slope, which should stay flat once every device is known.
+#   python -m panic_predictor.soak --devices 2000 --rate 1 --duration 3600
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from .alerts import DEFAULT_RULES, AlertEngine
+from .ingest import BrokerTransport, IngestService, LocalBroker, format_frame
+from .loadgen import VirtualFleet
+from .metrics import REGISTRY, Histogram, rss_bytes
+
+MB = 1024 * 1024
+
+
+def growth_per_hour(samples):
+    # Least-squares slope of (seconds, bytes) samples, in MB per hour
+    if len(samples) < 2:
+        return 0.0
+    t, rss = np.array(samples, dtype=np.float64).T
+    if np.ptp(t) == 0:
+        return 0.0
+    return float(np.polyfit(t, rss, 1)[0]) * 3600 / MB
+
+
+# --- Soak Run ---
+class SoakRun:
+    # Wires the fleet to the pipeline and keeps the counters a report needs.
+    # Frames carry the fleet's simulated clock, the same time the physiology
+    # and the alert rules run on. Latency is measured in wall time from when a
+    # tick was published to the end of alert evaluation; published_at maps
+    # each tick's sequence number to [publish time_ns, frames not yet seen].
+    # The broker path neither drops nor reorders a device's frames, so the
+    # n-th result for a device belongs to tick n, however close the stamps.
+    # Alerts are only counted: keeping every event would show up as growth.
+
+    def __init__(self, engine, devices=1000, rate=1.0, seed=None, rules=DEFAULT_RULES,
+                 tick_seconds=None, queue_size=10000, max_delay_ms=20):
+        self.fleet = VirtualFleet(devices, seed, tick_seconds=tick_seconds or 1.0 / rate)
+        self.rate = rate
+        self.engine = engine
+        self.broker = LocalBroker()
+        self.alerts = AlertEngine(rules, capacity=devices)
+        self.service = IngestService(engine, [BrokerTransport(self.broker, maxsize=queue_size)],
+                                     self.on_result, queue_size, max_delay_ms=max_delay_ms)
+        self.latency = Histogram('soak_latency')       # whole run
+        self.interval_latency = Histogram('soak_latency_interval')
+        self.stats = {'published': 0, 'ticks': 0, 'late_ticks': 0, 'episodes': 0, 'alerts': 0, 'clears': 0}
+        self.memory = []                                # (elapsed seconds, rss bytes)
+        self.published_at = {}
+        self._device_index = {d: i for i, d in enumerate(self.fleet.device_ids)}
+        self._frames_seen = [0] * self.fleet.n          # per device
+        self.reports = []
+
+    def on_result(self, frames, proba):
+        events = self.alerts.evaluate([f.device_id for f in frames], [f.timestamp for f in frames], proba)
+        for e in events:
+            self.stats['alerts' if e.kind == 'alert' else 'clears'] += 1
+        now_ns = time.time_ns()
+        published_at, index, seen = self.published_at, self._device_index, self._frames_seen
+        for f in frames:
+            i = index[f.device_id]
+            seq = seen[i]
+            seen[i] += 1
+            tick = published_at[seq]
+            value = now_ns - tick[0]
+            self.latency.record(value)
+            self.interval_latency.record(value)
+            tick[1] -= 1
+            if not tick[1]:
+                del published_at[seq]
+
+    async def _publish(self, duration, started):
+        fleet, publish = self.fleet, self.broker.publish
+        while time.monotonic() - started < duration:
+            heart_rate, _, _, onset = fleet.tick()
+            self.stats['episodes'] += int(onset.sum())
+            clock = fleet.clock
+            self.published_at[self.stats['ticks']] = [time.time_ns(), fleet.n]
+            for device_id, hr, switch in zip(fleet.device_ids, heart_rate.tolist(), onset.tolist()):
+                await publish(f'devices/{device_id}/hr', format_frame(device_id, clock, hr, int(switch)))
+            self.stats['published'] += fleet.n
+            self.stats['ticks'] += 1
+            delay = started + self.stats['ticks'] / self.rate - time.monotonic()
+            if delay < 0:
+                self.stats['late_ticks'] += 1
+            await asyncio.sleep(max(delay, 0))
+
+    def report(self, elapsed, interval):
+        scored = self.service.stats['scored']
+        row = {
+            'elapsed_s': round(elapsed, 1),
+            'published': self.stats['published'],
+            'scored': scored,
+            'throughput': round((scored - (self.reports[-1]['scored'] if self.reports else 0)) / interval, 1),
+            'backlog': self.stats['published'] - scored - self.service.stats['invalid'] - self.service.stats['failed'],
+            'p50_ms': round(self.interval_latency.percentile(0.5) / 1e6, 3),
+            'p99_ms': round(self.interval_latency.percentile(0.99) / 1e6, 3),
+            'max_ms': round(self.interval_latency.max / 1e6, 3),
+            'rss_mb': round(rss_bytes() / MB, 1),
+            'histories': len(self.engine.histories),
+            'active_alerts': len(self.alerts.active_alerts()),
+        }
+        self.interval_latency.reset()
+        self.memory.append((elapsed, row['rss_mb'] * MB))
+        self.reports.append(row)
+        return row
+
+    async def run(self, duration, report_every=10.0, on_report=None, drain_timeout=30.0):
+        task = asyncio.create_task(self.service.run())
+        await asyncio.sleep(0)
+        started = time.monotonic()
+        self.memory.append((0.0, rss_bytes()))
+        publisher = asyncio.create_task(self._publish(duration, started))
+        last = started
+        while not publisher.done():
+            await asyncio.wait([publisher], timeout=max(last + report_every - time.monotonic(), 0))
+            now = time.monotonic()
+            if now - last >= report_every or publisher.done():
+                row = self.report(now - started, now - last)
+                last = now
+                if on_report is not None:
+                    on_report(row)
+        publisher.result()
+        elapsed = time.monotonic() - started
+        # Let the pipeline drain before the final numbers
+        deadline = time.monotonic() + drain_timeout
+        stats = self.service.stats
+        while (stats['scored'] + stats['invalid'] + stats['failed'] < self.stats['published']
+               and time.monotonic() < deadline):
+            await asyncio.sleep(0.01)
+        drained = time.monotonic() - started
+        task.cancel()
+        return self.summary(elapsed, drained)
+
+    def summary(self, elapsed, drained):
+        # The first report interval includes warm-up (new devices, first
+        # allocations), so growth is measured from the first report on
+        steady = self.memory[1:] if len(self.memory) > 2 else self.memory
+        return {
+            'devices': self.fleet.n,
+            'rate': self.rate,
+            'elapsed_s': round(elapsed, 2),
+            'drained_s': round(drained, 2),
+            **self.stats,
+            **{k: v for k, v in self.service.stats.items() if k != 'received'},
+            'throughput': round(self.service.stats['scored'] / drained, 1) if drained else 0.0,
+            'latency_ms': dict({f'p{q * 100:g}': round(self.latency.percentile(q) / 1e6, 3)
+                                for q in (0.5, 0.9, 0.99, 0.999)}, max=round(self.latency.max / 1e6, 3)),
+            'rss_mb': {'start': round(self.memory[0][1] / MB, 1), 'end': round(self.memory[-1][1] / MB, 1),
+                       'peak': round(max(r for _, r in self.memory) / MB, 1)},
+            'rss_growth_mb_per_hour': round(growth_per_hour(steady), 2),
+            'stages': REGISTRY.summary(),
+        }
+
+
+# --- Command Line ---
+def main(argv=None):
+    import argparse
+    from .artifact import load_or_export
+    from .engine import InferenceEngine
+
+    parser = argparse.ArgumentParser(description="Soak the ingest -> scoring -> alerts pipeline with a synthetic fleet")
+    parser.add_argument('--devices', type=int, default=1000)
+    parser.add_argument('--rate', type=float, default=1.0, help="readings per second per device")
+    parser.add_argument('--duration', type=float, default=60.0, help="seconds")
+    parser.add_argument('--report-every', type=float, default=10.0, help="seconds between report lines")
+    parser.add_argument('--tick-seconds', type=float,
+                        help="simulated seconds per reading (default 1/rate; larger values age the fleet faster)")
+    parser.add_argument('--artifact', default='panic_attack_model')
+    parser.add_argument('--model', default='panic_attack_rf_model.pkl')
+    parser.add_argument('--scaler', default='scaler.pkl')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="also write the final summary to this file")
+    args = parser.parse_args(argv)
+
+    forest, _ = load_or_export(args.artifact, args.model, args.scaler)
+    run = SoakRun(InferenceEngine(forest, None), args.devices, args.rate, args.seed, tick_seconds=args.tick_seconds)
+
+    def on_report(row):
+        print(f"[{row['elapsed_s']:>7.1f}s] {row['throughput']:>9,.0f} readings/s  backlog {row['backlog']:>6}  "
+              f"p50 {row['p50_ms']:.2f} ms  p99 {row['p99_ms']:.2f} ms  rss {row['rss_mb']:.1f} MB  "
+              f"alerts {row['active_alerts']}", flush=True)
+
+    summary = asyncio.run(run.run(args.duration, args.report_every, on_report))
+    print(json.dumps(summary, indent=2))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+# panic_predictor/store.py
+import json
+import os
+import threading
+
+import numpy as np
+
+from .analytics import EXPECTED_COLUMNS, RiskTable
+
+STORE_VERSION = 1
+COLUMNS = {
+    'timestamp': np.dtype('<i8'),  # nanoseconds since epoch, wall clock as in the CSV
+    'heart_rate': np.dtype('<f4'),
+    'panic_attack': np.dtype('u1'),
+    'activity': np.dtype('u1'),  # index into manifest['activities'], or NO_ACTIVITY
+}
+# Rows whose activity is unknown; they are stored but not counted in the RiskTable
+NO_ACTIVITY = 255
+NS_PER_HOUR = 3_600_000_000_000
+
+
+# --- Columnar Store ---
+class ColumnStore:
+    # Append-only store of raw little-endian column files plus a JSON manifest.
+    # The manifest carries the committed row count and the RiskTable counters,
+    # so opening the store costs the same no matter how much history it holds.
+    # readonly=True opens a store another process is appending to: only rows
+    # committed in the manifest are visible and nothing on disk is touched.
+
+    def __init__(self, path, readonly=False):
+        self.path = path
+        self.readonly = readonly
+        self._lock = threading.Lock()
+        manifest_path = os.path.join(path, 'manifest.json')
+        if readonly:
+            if not os.path.exists(manifest_path):
+                raise FileNotFoundError(f"No store manifest at {manifest_path}")
+        else:
+            os.makedirs(path, exist_ok=True)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get('version') != STORE_VERSION:
+                raise ValueError(f"Unsupported store version: {manifest.get('version')}")
+            self.rows = manifest['rows']
+            self.risk = RiskTable(manifest['activities'])
+            self.risk.panics[:] = manifest['panics']
+            self.risk.counts[:] = manifest['counts']
+        else:
+            self.rows = 0
+            self.risk = RiskTable()
+            self._write_manifest()
+        if not readonly:
+            self._truncate_uncommitted()
+
+    @property
+    def activities(self):
+        return self.risk.activities
+
+    def _column_path(self, name):
+        return os.path.join(self.path, f'{name}.bin')
+
+    def _truncate_uncommitted(self):
+        # Rows written after the last manifest commit (e.g. a crash mid-append) are dropped
+        for name, dtype in COLUMNS.items():
+            path = self._column_path(name)
+            size = self.rows * dtype.itemsize
+            if not os.path.exists(path):
+                if self.rows:
+                    raise ValueError(f"Store column missing: {path}")
+                open(path, 'wb').close()
+            elif os.path.getsize(path) > size:
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+
+    def _write_manifest(self):
+        manifest = {
+            'version': STORE_VERSION,
+            'rows': self.rows,
+            'columns': {name: dtype.str for name, dtype in COLUMNS.items()},
+            'activities': self.risk.activities,
+            'panics': self.risk.panics.tolist(),
+            'counts': self.risk.counts.tolist(),
+        }
+        tmp = os.path.join(self.path, 'manifest.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp, os.path.join(self.path, 'manifest.json'))
+
+    def append(self, timestamps, heart_rates, panic_attacks, activities):
+        import pandas as pd
+
+        timestamps = pd.to_datetime(pd.Series(timestamps)).to_numpy('datetime64[ns]').view(np.int64)
+        n = len(timestamps)
+        if n == 0:
+            return
+        if self.readonly:
+            raise ValueError("ColumnStore was opened read-only")
+        with self._lock:
+            codes = self.risk.activity_codes(activities)
+            if len(self.risk.activities) > NO_ACTIVITY:
+                raise ValueError(f"ColumnStore supports at most {NO_ACTIVITY} activity categories")
+            panic_attacks = np.asarray(panic_attacks, dtype=np.int64)
+            values = {
+                'timestamp': timestamps,
+                'heart_rate': np.asarray(heart_rates),
+                'panic_attack': panic_attacks,
+                'activity': np.where(codes < 0, NO_ACTIVITY, codes),
+            }
+            for name, dtype in COLUMNS.items():
+                column = np.ascontiguousarray(values[name], dtype=dtype)
+                if len(column) != n:
+                    raise ValueError(f"Column '{name}' has {len(column)} rows, expected {n}")
+                with open(self._column_path(name), 'ab') as f:
+                    f.write(column.tobytes())
+            known = codes >= 0
+            self.risk.add(((timestamps // NS_PER_HOUR) % 24)[known], codes[known], panic_attacks[known])
+            self.rows += n
+            self._write_manifest()
+
+    def append_frame(self, frame):
+        self.append(frame['timestamp'], frame['heart_rate'], frame['panic_attack'], frame['activity'])
+
+    def column(self, name):
+        # Read-only memory map over the committed rows
+        dtype = COLUMNS[name]
+        if self.rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._column_path(name), dtype=dtype, mode='r', shape=(self.rows,))
+
+    def read_frame(self, start=0, stop=None):
+        import pandas as pd
+
+        stop = self.rows if stop is None else min(stop, self.rows)
+        codes = np.array(self.column('activity')[start:stop], dtype=np.int64)
+        return pd.DataFrame({
+            'timestamp': pd.to_datetime(np.array(self.column('timestamp')[start:stop])),
+            'heart_rate': np.array(self.column('heart_rate')[start:stop], dtype=np.float64),
+            'panic_attack': np.array(self.column('panic_attack')[start:stop], dtype=np.int64),
+            'activity': pd.Categorical.from_codes(
+                np.where(codes == NO_ACTIVITY, -1, codes), categories=self.activities
+            ),
+        })
+
+    def hourly_risk(self):
+        return self.risk.hourly_risk()
+
+    def activity_risk(self):
+        return self.risk.activity_risk()
+
+    def __len__(self):
+        return self.rows
+
+    @classmethod
+    def import_csv(cls, csv_path, path, chunksize=1_000_000):
+        import pandas as pd
+
+        header = pd.read_csv(csv_path, nrows=0).columns
+        missing = [col for col in EXPECTED_COLUMNS if col not in header]
+        if missing:
+            raise ValueError(f"CSV missing required columns: {missing}")
+        store = cls(path)
+        for chunk in pd.read_csv(csv_path, usecols=EXPECTED_COLUMNS, chunksize=chunksize):
+            store.append_frame(chunk)
+        return store
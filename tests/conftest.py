@@ -0,0 +1,39 @@
+# tests/conftest.py
+# Correctness tests: each fast path is checked against the straightforward
+# implementation it replaces. Headless, like the benchmarks.
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SEED = 42
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(SEED)
+
+
+@pytest.fixture(scope='session')
+def rf_model():
+    import joblib
+    return joblib.load(os.path.join(ROOT, 'panic_attack_rf_model.pkl'))
+
+
+@pytest.fixture(scope='session')
+def scaler():
+    import joblib
+    return joblib.load(os.path.join(ROOT, 'scaler.pkl'))
+
+
+@pytest.fixture(scope='session')
+def artifact(tmp_path_factory):
+    # The shipped pickles exported once per session, as the gateway loads them
+    from panic_predictor.artifact import export_from_pickles
+    path = str(tmp_path_factory.mktemp('artifact') / 'panic_attack_model')
+    export_from_pickles(os.path.join(ROOT, 'panic_attack_rf_model.pkl'), os.path.join(ROOT, 'scaler.pkl'), path)
+    return path
@@ -0,0 +1,110 @@
+# tests/test_alerts.py
+import math
+
+import numpy as np
+import pytest
+
+from panic_predictor.alerts import DEFAULT_RULES, AlertEngine, AlertRules
+
+
+class ScalarAlerts:
+    # The state machine from alerts.py written out reading by reading, as the
+    # reference for the vectorized engine
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.state = {}
+
+    def push(self, pid, t, p):
+        rules = self.rules
+        s = self.state.setdefault(pid, {'active': False, 'above': None, 'below': None,
+                                        'cooldown_until': -math.inf, 'started': None, 'peak': 0.0})
+        if p >= rules.on_threshold:
+            s['above'] = t if s['above'] is None else s['above']
+        else:
+            s['above'] = None
+        if s['active'] and p < rules.off_threshold:
+            s['below'] = t if s['below'] is None else s['below']
+        else:
+            s['below'] = None
+
+        if not s['active']:
+            if s['above'] is not None and t - s['above'] >= rules.min_duration and t >= s['cooldown_until']:
+                s.update(active=True, started=t, peak=p, above=None, below=None)
+                return ('alert', pid, t, p, t, 0.0)
+            return None
+        s['peak'] = max(s['peak'], p)
+        if s['below'] is not None and t - s['below'] >= rules.clear_after:
+            s.update(active=False, cooldown_until=t + rules.cooldown, above=None, below=None)
+            return ('clear', pid, t, s['peak'], s['started'], t - s['started'])
+        return None
+
+
+def readings(rng, patients, seconds):
+    # Slow risk waves plus noise, one reading a second with jitter, so every
+    # patient crosses both thresholds many times
+    ids, times, proba = [], [], []
+    for i in range(patients):
+        t = np.arange(seconds) + rng.uniform(0, 0.5, seconds)
+        wave = 0.25 + 0.2 * np.sin(2 * np.pi * t / rng.uniform(60, 400) + rng.uniform(0, 6))
+        ids += [f'p{i}'] * seconds
+        times.append(t)
+        proba.append(np.clip(wave + rng.normal(0, 0.06, seconds), 0, 1))
+    times, proba = np.concatenate(times), np.concatenate(proba)
+    order = np.argsort(times, kind='stable')
+    return np.array(ids, dtype=object)[order], times[order], proba[order]
+
+
+def by_patient(events):
+    out = {}
+    for e in events:
+        out.setdefault(e[1], []).append(tuple(e))
+    return out
+
+
+@pytest.mark.parametrize('rules', [
+    DEFAULT_RULES,
+    AlertRules(on_threshold=0.3, off_threshold=0.3, min_duration=0.0, clear_after=0.0, cooldown=0.0),
+])
+def test_matches_scalar_state_machine(rng, rules):
+    ids, times, proba = readings(rng, 25, 1500)
+    reference = ScalarAlerts(rules)
+    expected = [e for e in map(reference.push, ids, times.tolist(), proba.tolist()) if e is not None]
+
+    engine = AlertEngine(rules, capacity=4)   # grows while evaluating
+    events = []
+    # Uneven batches, several readings per patient in most of them
+    bounds = np.unique(np.r_[0, rng.integers(0, len(ids), 300), len(ids)])
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        events += engine.evaluate(ids[start:stop].tolist(), times[start:stop], proba[start:stop])
+
+    assert len(expected) > 100
+    assert by_patient(events) == by_patient(expected)
+    active = sorted(pid for pid, s in reference.state.items() if s['active'])
+    assert sorted(engine.active_alerts()) == active
+
+
+def test_forget_resets_one_patient(rng):
+    engine = AlertEngine(AlertRules(0.3, 0.2, 0.0, 0.0, 0.0))
+    engine.evaluate(['a', 'b'], [0.0, 0.0], [0.9, 0.9])
+    engine.forget('a')
+    assert engine.active_alerts() == ['b']
+    assert [e.kind for e in engine.evaluate(['a'], [1.0], [0.9])] == ['alert']
+
+
+def test_forget_and_evict_idle_reuse_slots():
+    engine = AlertEngine(AlertRules(0.3, 0.2, 0.0, 0.0, 0.0), capacity=4)
+    for i in range(100):
+        engine.evaluate([f'd{i}', 'stay'], [float(i), float(i)], [0.1, 0.9])
+        engine.forget(f'd{i}')
+    assert len(engine.patient_ids) == 2 and len(engine.active) == 4
+    assert engine.active_alerts() == ['stay']
+
+    engine.evaluate(['x', 'y'], [200.0, 200.0], [0.1, 0.1])
+    engine.evaluate(['x'], [300.0], [0.1])
+    # 'stay' is idle but still alerting, so only 'y' goes
+    assert engine.evict_idle(250.0) == ['y']
+    assert sorted(engine.slots) == ['stay', 'x']
+    assert [e.kind for e in engine.evaluate(['y'], [301.0], [0.9])] == ['alert']
+    assert len(engine.patient_ids) == 3
+
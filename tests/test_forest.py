@@ -0,0 +1,71 @@
+# tests/test_forest.py
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from panic_predictor.forest import FlatForest
+
+
+def raw_rows(rng, n):
+    # Unscaled feature rows in realistic ranges, as the app builds them
+    hr = rng.normal(80, 15, n).clip(40, 160)
+    return np.column_stack([
+        hr,
+        rng.integers(0, 24, n),
+        rng.integers(0, 60, n),
+        hr + rng.normal(0, 3, n),
+        rng.gamma(2.0, 4.0, n),
+        rng.normal(0, 10, n),
+    ])
+
+
+def on_thresholds(model, scaler, rng, n):
+    # Rows whose values sit exactly on (and one ulp either side of) the raw
+    # split points, where a folded threshold would first go wrong
+    X = raw_rows(rng, n)
+    for estimator in model.estimators_[:5]:
+        tree = estimator.tree_
+        for node in np.flatnonzero(tree.children_left != -1)[:50]:
+            f = tree.feature[node]
+            raw = tree.threshold[node] * scaler.scale_[f] + scaler.mean_[f]
+            rows = rng.integers(0, n, 3)
+            X[rows, f] = [np.nextafter(raw, -np.inf), raw, np.nextafter(raw, np.inf)]
+    return X
+
+
+def offsets(model):
+    return np.cumsum([0] + [e.tree_.node_count for e in model.estimators_[:-1]])
+
+
+@pytest.mark.parametrize('fold_scaler', [True, False])
+def test_matches_sklearn(rf_model, scaler, rng, fold_scaler):
+    forest = FlatForest.from_sklearn(rf_model, scaler, fold_scaler=fold_scaler)
+    # More rows than one block, so block boundaries are covered too
+    X = on_thresholds(rf_model, scaler, rng, 3 * FlatForest.BLOCK_ROWS + 7)
+    scaled = scaler.transform(X)
+    # Same leaf in every tree, not just close probabilities
+    np.testing.assert_array_equal(forest.leaves(X) - offsets(rf_model), rf_model.apply(scaled))
+    np.testing.assert_allclose(forest.predict_proba(X), rf_model.predict_proba(scaled), rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(forest.predict(X), rf_model.predict(scaled))
+
+
+def test_multiclass_without_scaler(rng):
+    X = raw_rows(rng, 2000)
+    y = np.digitize(X[:, 0] + rng.normal(0, 5, len(X)), [70, 90])
+    model = RandomForestClassifier(n_estimators=20, max_depth=8, random_state=0).fit(X, y)
+    forest = FlatForest.from_sklearn(model)
+    np.testing.assert_allclose(forest.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(forest.classes, model.classes_)
+
+
+def test_single_row_and_shape_check(rng):
+    X = raw_rows(rng, 500)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(scaler.transform(X), X[:, 0] > 80)
+    forest = FlatForest.from_sklearn(model, scaler)
+    row = X[3]
+    np.testing.assert_allclose(forest.predict_proba(row), model.predict_proba(scaler.transform(row[None, :])),
+                               rtol=0, atol=1e-12)
+    with pytest.raises(ValueError):
+        forest.predict_proba(X[:, :4])
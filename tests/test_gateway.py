@@ -0,0 +1,40 @@
+# tests/test_gateway.py
+import io
+
+from panic_predictor.gateway import FileUpstream, Gateway, decode, iter_results, run, stdin_source
+from panic_predictor.ingest import Frame
+
+
+def test_numeric_and_long_device_ids_from_stdin(artifact, tmp_path):
+    gateway = Gateway(artifact)
+    lines = b''.join([
+        b'{"device": 7, "bpm": 80}\n',
+        b'$HR,dev-1,1700000000000,82,0\n',
+        b'$HR,' + b'x' * 17 + b',1700000000000,80,0\n',
+        b'{"device": {"id": 1}, "bpm": 80}\n',
+        b'$HR,dev-1,1700000000000,inf,0\n',
+    ])
+    out = tmp_path / 'results.bin'
+    run(gateway, stdin_source(io.BytesIO(lines)), [FileUpstream(str(out))])
+    devices = [r['device'] for _, results in iter_results(out.read_bytes()) for r in decode(results)]
+    assert devices == ['7', 'dev-1']
+    assert gateway.stats['long_ids'] == 1 and gateway.stats['invalid'] == 2
+
+
+def test_score_accepts_hand_built_numeric_ids(artifact):
+    results = Gateway(artifact).score([Frame(7, 1700000000.0, 80.0, 0)])
+    assert decode(results)[0]['device'] == '7'
+
+
+def test_decode_replaces_bad_bytes(artifact):
+    results = Gateway(artifact).score([Frame('dev', 1700000000.0, 80.0, 0)])
+    results['device'][0] = 'é'.encode() * 7 + b'\xc3'
+    assert decode(results)[0]['device'].endswith('�')
+
+
+def test_gateway_evicts_idle_devices(artifact):
+    gateway = Gateway(artifact, idle_after=60.0)
+    gateway.score([Frame(f'dev-{i}', 1000.0, 80.0, 0) for i in range(50)])
+    gateway.score([Frame('dev-0', 1100.0, 80.0, 0)])
+    assert gateway.stats['evicted'] == 49
+    assert list(gateway.engine.histories) == ['dev-0'] and list(gateway.alerts.slots) == ['dev-0']
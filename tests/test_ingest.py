@@ -0,0 +1,72 @@
+# tests/test_ingest.py
+import asyncio
+import json
+import math
+
+import pytest
+
+from panic_predictor.ingest import MIN_EPOCH_MS, LocalBroker, parse_frame, topic_regex
+
+
+def test_parses_wire_and_json_frames():
+    frame = parse_frame('$HR,dev-1,1700000000000,81.5,1\r\n')
+    assert frame == ('dev-1', 1700000000.0, 81.5, 1)
+    frame = parse_frame(json.dumps({'device': 'dev-2', 'ts': 1700000000500, 'bpm': 72, 'sw': 0}))
+    assert frame == ('dev-2', 1700000000.5, 72.0, 0)
+    # Uptime milliseconds fall back to the receive time
+    assert parse_frame('$HR,dev-1,1234,80,0', received_at=5.0).timestamp == 5.0
+    assert MIN_EPOCH_MS > 1234
+
+
+@pytest.mark.parametrize('bpm', ['inf', '-inf', 'nan', '0', '19.9', '300.1', '1e308'])
+def test_rejects_implausible_heart_rates(bpm):
+    assert parse_frame(f'$HR,dev-1,1700000000000,{bpm},0') is None
+
+
+def test_rejects_non_finite_json_values():
+    # json.loads accepts Infinity / NaN, and 1e999 parses as inf
+    assert parse_frame('{"device": "a", "bpm": Infinity}') is None
+    assert parse_frame('{"device": "a", "bpm": NaN}') is None
+    assert parse_frame('{"device": "a", "bpm": 80, "ts": 1e999}') is None
+    assert parse_frame('{"device": "a", "bpm": 80, "sw": 1e999}') is None
+
+
+def test_device_ids_are_strings():
+    frame = parse_frame('{"device": 7, "bpm": 80}')
+    assert frame.device_id == '7' and isinstance(frame.device_id, str)
+    assert parse_frame('{"bpm": 80}', default_device='topic-id').device_id == 'topic-id'
+    for device in ('true', '[1]', '{"a": 1}', 'null', '""'):
+        assert parse_frame(f'{{"device": {device}, "bpm": 80}}') is None
+
+
+def test_plausible_range_is_inclusive():
+    assert math.isclose(parse_frame('$HR,d,1700000000000,20,0').heart_rate, 20.0)
+    assert math.isclose(parse_frame('$HR,d,1700000000000,300,0').heart_rate, 300.0)
+
+
+@pytest.mark.parametrize('pattern, topic, matches', [
+    ('hr/+', 'hr/a', True),
+    ('hr/+', 'hr/a/b', False),
+    ('hr/+', 'hr/', False),
+    ('devices/+/hr', 'devices/sim-1/hr', True),
+    ('devices/+/hr', 'devices/a/b/hr', False),
+    ('devices/#', 'devices/a/b/hr', True),
+    ('devices/#', 'devices', True),
+    ('devices/#', 'devicesX/a', False),
+    ('#', 'any/topic', True),
+    ('a.b/+', 'aXb/c', False),
+])
+def test_topic_filters_follow_mqtt(pattern, topic, matches):
+    assert bool(topic_regex(pattern).fullmatch(topic)) is matches
+
+
+def test_hash_must_be_last():
+    with pytest.raises(ValueError):
+        topic_regex('a/#/b')
+
+
+def test_broker_routes_single_level():
+    broker = LocalBroker()
+    one, many = broker.subscribe('hr/+'), broker.subscribe('hr/#')
+    asyncio.run(broker.publish('hr/a/b', 'x'))
+    assert one.empty() and many.get_nowait() == ('hr/a/b', 'x')
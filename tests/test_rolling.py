@@ -0,0 +1,47 @@
+# tests/test_rolling.py
+import numpy as np
+import pytest
+
+from panic_predictor import RollingWindow
+
+
+@pytest.mark.parametrize('size', [1, 2, 10, 60])
+def test_rolling_window_matches_list_history(rng, size):
+    # Reference: the list + np.mean / np.std code RollingWindow replaced, over
+    # more readings than RESYNC_EVERY so the periodic resync is crossed too
+    values = rng.normal(80, 15, 2 * RollingWindow.RESYNC_EVERY + 37)
+    window = RollingWindow(size)
+    for i, x in enumerate(values):
+        window.push(x)
+        recent = values[max(i + 1 - size, 0):i + 1]
+        assert len(window) == len(recent)
+        assert window.values() == recent.tolist()
+        assert window.mean == pytest.approx(np.mean(recent), rel=1e-12)
+        assert window.std == pytest.approx(np.std(recent), rel=1e-9, abs=1e-9)
+        assert window.last == x
+        assert window.change == (x - recent[-2] if len(recent) > 1 else 0.0)
+
+
+def test_rolling_window_glitches_and_flat_runs(rng):
+    # Sensor glitches (0 / 255 bpm) next to long flat stretches are where a
+    # running M2 loses precision or goes negative
+    values = np.r_[rng.normal(80, 15, 300), np.tile([255.0, 0.0], 50), np.full(500, 72.0),
+                   rng.choice([0.0, 255.0, 72.0], 1500, p=[0.05, 0.05, 0.9])]
+    window = RollingWindow(10)
+    for i, x in enumerate(values):
+        window.push(x)
+        recent = values[max(i - 9, 0):i + 1]
+        assert window.mean == pytest.approx(np.mean(recent), rel=1e-12, abs=1e-12)
+        # Cancellation leaves M2 off by about 255^2 * eps per glitch until
+        # the next resync, i.e. a few 1e-6 bpm of std
+        assert window.std == pytest.approx(np.std(recent), rel=1e-9, abs=1e-5)
+
+
+def test_rolling_window_clear(rng):
+    window = RollingWindow(5)
+    for x in rng.normal(80, 15, 12):
+        window.push(x)
+    window.clear()
+    assert len(window) == 0 and window.values() == []
+    window.push(70.0)
+    assert (window.mean, window.std, window.change) == (70.0, 0.0, 0.0)
@@ -0,0 +1,67 @@
+# tests/test_server.py
+import os
+import signal
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from panic_predictor.artifact import load_artifact
+from panic_predictor.engine import InferenceEngine
+from panic_predictor.server import ScoringClient, ScoringServer
+
+
+@pytest.fixture
+def served(artifact):
+    forest, _ = load_artifact(artifact)
+    server = ScoringServer(forest, workers=2, port=0).start()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    while server._httpd is None:
+        time.sleep(0.01)
+    yield server, ScoringClient(f'http://127.0.0.1:{server._httpd.server_address[1]}'), forest
+    server.shutdown()
+    server.close()
+
+
+def test_matches_in_process_engine(served):
+    server, client, forest = served
+    ids = [f'p{i % 7}' for i in range(60)]
+    hrs = np.random.default_rng(0).normal(80, 15, 60)
+    ts = 1.7e9 + np.arange(60.0)
+    np.testing.assert_allclose(client.score(ids, hrs, ts), InferenceEngine(forest, None).score(ids, hrs, ts))
+
+
+def test_reset_all_clears_every_window(served):
+    server, client, forest = served
+    ids = [f'p{i}' for i in range(20)]
+    first = client.score(ids, np.full(20, 70.0), np.full(20, 1.7e9))
+    client.score(ids, np.full(20, 150.0), np.full(20, 1.7e9 + 1))
+    client.reset()
+    np.testing.assert_allclose(client.score(ids, np.full(20, 70.0), np.full(20, 1.7e9)), first)
+
+
+def test_dead_worker_is_reported_and_respawned(served):
+    server, client, forest = served
+    victim = server.workers[0].process
+    os.kill(victim.pid, signal.SIGKILL)
+    victim.join(5)
+    assert server.health()['status'] == 'degraded'
+    # Every patient routes to a live (or freshly respawned) worker
+    ids = [f'p{i}' for i in range(40)]
+    assert len(client.score(ids, np.full(40, 80.0), np.full(40, 1.7e9))) == 40
+    health = server.health()
+    assert health['status'] == 'ok' and health['restarts'] == 1
+
+
+def test_request_in_flight_to_dead_worker_fails_cleanly(served):
+    server, client, forest = served
+    handle = server.workers[1]
+    os.kill(handle.process.pid, signal.SIGKILL)
+    handle.process.join(5)
+    deadline = time.monotonic() + 5
+    while not handle.dead and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # Submitting to the stale handle fails the future instead of raising BrokenPipeError
+    with pytest.raises(RuntimeError):
+        handle.submit('reset', None).result(5)
@@ -0,0 +1,17 @@
+# tests/test_soak.py
+import asyncio
+
+from panic_predictor.engine import InferenceEngine
+from panic_predictor.soak import SoakRun
+
+
+def test_latency_is_matched_per_frame_when_ticks_share_a_millisecond(artifact):
+    from panic_predictor.artifact import load_artifact
+
+    forest, _ = load_artifact(artifact)
+    # Ten ticks per simulated millisecond: every stamp repeats across ticks
+    run = SoakRun(InferenceEngine(forest, None), devices=20, rate=200, seed=0, tick_seconds=1e-4)
+    summary = asyncio.run(run.run(0.5, report_every=0.25))
+    assert summary['published'] == summary['scored'] == 20 * summary['ticks'] > 0
+    assert run.latency.count == summary['scored']
+    assert run.published_at == {}
@@ -0,0 +1,41 @@
+# tests/test_time_of_day.py
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from panic_predictor.features import hour_minute, utc_offsets
+from panic_predictor.retrain import local_ns
+
+# Local time just before each zone's 2024 spring-forward change
+SPRING_FORWARD = {'Europe/Berlin': datetime(2024, 3, 31, 1, 30), 'America/St_Johns': datetime(2024, 3, 10, 1, 30)}
+
+
+@pytest.fixture(params=sorted(SPRING_FORWARD))
+def zone(request, monkeypatch):
+    monkeypatch.setenv('TZ', request.param)
+    time.tzset()
+    yield request.param
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_batch_across_dst_changes_uses_each_readings_offset(zone, rng):
+    # Two hours either side of spring forward, plus readings all over 2024
+    spring = SPRING_FORWARD[zone].timestamp()
+    ts = np.r_[spring + np.arange(-7200, 7200, 37.5), rng.uniform(1704067200, 1735689600, 500)]
+    expected = [datetime.fromtimestamp(t) for t in ts.tolist()]
+    assert len(set(utc_offsets(ts).tolist())) == 2
+
+    hour, minute = hour_minute(ts)
+    assert hour.tolist() == [d.hour for d in expected]
+    assert minute.tolist() == [d.minute for d in expected]
+    naive = np.array([d.replace(microsecond=0) for d in expected], dtype='datetime64[s]')
+    assert (local_ns(ts).astype('datetime64[s]') == naive).all()
+
+
+def test_utc_offsets_single_and_empty():
+    now = time.time()
+    assert utc_offsets([now]).tolist() == [time.localtime(now).tm_gmtoff]
+    assert utc_offsets([]).shape == (0,)